@@ -0,0 +1,190 @@
+"""
+Benchmark and quality suite for GroupForming.
+
+Runs every divide() method on synthetic cohorts, using plain objects instead of the Student/Group models,
+so no database is needed. For each run it reports wall time, peak memory (tracemalloc) and the intra-group
+variance of motivation, preparation and score, and it compares the balanced clustering to the greedy
+similarity grouping. Results are compared to a JSON baseline; a regression makes
+the run fail (exit code 1).
+
+Usage (from the repository root):
+    python -m benchmarks.group_forming                    # run and compare to benchmarks/baseline.json
+    python -m benchmarks.group_forming --update-baseline  # run and store the results as new baseline
+    python -m benchmarks.group_forming --sizes 30 300     # only some cohort sizes
+    python -m benchmarks.group_forming --refine-ms 100    # with 100 ms of local search after each method
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from statistics import mean, pvariance
+
+# Importing GroupForming does not create the app, so no configuration or database is needed
+from interact.lib.group_forming import GroupForming
+# GroupForming imports its NumPy engines on first use; import them here, so the timings measure grouping, not imports
+import interact.lib.similarity, interact.lib.clustering, interact.lib.refinement
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+METHODS = {0: "random", 1: "mix-level", 2: "same-level", 3: "similarity", 4: "balanced", 5: "dissimilarity"}
+SIZES = [30, 300, 3000, 10000]
+NR_PER_GROUP = [2, 3, 5]
+ATTRIBUTES = ["motivation", "preparation", "score"]
+
+# Quality objective per method and attribute: -1 = lower intra-group variance is better (homogeneous groups),
+# 1 = higher is better (heterogeneous groups). Random grouping has no objective.
+OBJECTIVE = {
+    "random": {},
+    "mix-level": {"score": 1},
+    "same-level": {"score": -1},
+    "similarity": {"motivation": -1, "preparation": -1, "score": -1},
+    "balanced": {"motivation": -1, "preparation": -1, "score": -1},
+    "dissimilarity": {"motivation": 1, "preparation": 1, "score": 1},
+}
+
+# Allowed slack before a result counts as a regression
+TIME_FACTOR = 1.5
+TIME_SLACK = 0.05 # seconds
+MEMORY_FACTOR = 1.25
+MEMORY_SLACK = 1024 * 1024 # bytes
+QUALITY_SLACK = 0.01
+
+class BenchStudent():
+    def __init__(self, id, motivation, preparation, score):
+        self.id = id
+        self.motivation = motivation
+        self.preparation = preparation
+        self.score = score
+        self.group_id = None
+
+class BenchGroup():
+    def __init__(self, id, number):
+        self.id = id
+        self.number = number
+
+def make_cohort(nr_students, nr_questions=10, seed=0):
+    rng = random.Random(seed)
+    return [BenchStudent(i, rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, nr_questions)) for i in range(1, nr_students+1)]
+
+def intra_group_variance(students):
+    """Mean (over groups) of the population variance of each attribute within a group."""
+    groups = {}
+    for student in students:
+        groups.setdefault(student.group_id, []).append(student)
+    result = {}
+    for attribute in ATTRIBUTES:
+        result[attribute] = mean(pvariance([getattr(s, attribute) for s in members]) for members in groups.values())
+    return result
+
+def run_case(method, nr_students, nr_per_group, seed=0, refine_ms=0):
+    students = make_cohort(nr_students, seed=seed)
+    nr_groups = -(-nr_students // nr_per_group) # rounded-up integer division
+    groups = [BenchGroup(n, n) for n in range(1, nr_groups+1)]
+    random.seed(seed) # divide_random() uses the global random module
+    tracemalloc.start()
+    start = time.perf_counter()
+    gf = GroupForming(nr_per_group, students, groups, refine_ms)
+    gf.divide(method)
+    wall_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    variance = intra_group_variance(gf.get_students())
+    return {
+        "method": METHODS[method],
+        "nr_students": nr_students,
+        "nr_per_group": nr_per_group,
+        "refine_ms": refine_ms,
+        "wall_time": round(wall_time, 4),
+        "peak_memory": peak_memory,
+        "variance": {k: round(v, 4) for k, v in variance.items()},
+    }
+
+def case_key(result):
+    key = f"{result['method']}/{result['nr_students']}/{result['nr_per_group']}"
+    if result.get("refine_ms"):
+        key += f"+refine{result['refine_ms']}"
+    return key
+
+def compare(result, baseline):
+    """Returns a list of regression messages for one result compared to its baseline entry."""
+    problems = []
+    if result["wall_time"] > baseline["wall_time"] * TIME_FACTOR + TIME_SLACK:
+        problems.append(f"wall time {result['wall_time']:.3f}s > baseline {baseline['wall_time']:.3f}s")
+    if result["peak_memory"] > baseline["peak_memory"] * MEMORY_FACTOR + MEMORY_SLACK:
+        problems.append(f"peak memory {result['peak_memory']} > baseline {baseline['peak_memory']}")
+    for attribute, direction in OBJECTIVE[result["method"]].items():
+        delta = (result["variance"][attribute] - baseline["variance"][attribute]) * direction
+        if delta < -QUALITY_SLACK:
+            problems.append(f"{attribute} variance {result['variance'][attribute]} worse than baseline {baseline['variance'][attribute]}")
+    return problems
+
+def print_comparison(results):
+    """Quality and speed of the balanced clustering relative to the greedy similarity grouping, per case."""
+    pairs = [(key, key.replace("similarity/", "balanced/", 1)) for key in results if key.startswith("similarity/")]
+    pairs = [(greedy, balanced) for greedy, balanced in pairs if balanced in results]
+    if not pairs:
+        return
+    print()
+    print(f"{'balanced vs. similarity':<32}{'speedup':>10}{'variance ratio (1 = same, < 1 = better)':>42}")
+    for greedy, balanced in pairs:
+        greedy_variance = sum(results[greedy]["variance"].values())
+        balanced_variance = sum(results[balanced]["variance"].values())
+        ratio = balanced_variance / greedy_variance if greedy_variance > 0 else float("inf")
+        speedup = results[greedy]["wall_time"] / max(results[balanced]["wall_time"], 1e-4)
+        print(f"{greedy.split('/', 1)[1]:<32}{speedup:>9.1f}x{ratio:>42.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GroupForming benchmark and quality suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--nr-per-group", type=int, nargs="+", default=NR_PER_GROUP)
+    parser.add_argument("--methods", type=int, nargs="+", default=list(METHODS), choices=list(METHODS))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--refine-ms", type=int, default=0,
+                        help="time budget of the local search refinement (default 0: the methods on their own)")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<32}{'time (s)':>10}{'peak (MB)':>11}{'var mot':>9}{'var prep':>10}{'var score':>11}")
+    for nr_students in args.sizes:
+        for nr_per_group in args.nr_per_group:
+            for method in args.methods:
+                result = run_case(method, nr_students, nr_per_group, args.seed, args.refine_ms)
+                key = case_key(result)
+                results[key] = result
+                variance = result["variance"]
+                status = ""
+                if not args.update_baseline and key in baseline:
+                    problems = compare(result, baseline[key])
+                    if problems:
+                        regressions.append((key, problems))
+                        status = "  REGRESSION"
+                print(f"{key:<32}{result['wall_time']:>10.3f}{result['peak_memory'] / 2**20:>11.2f}"
+                      f"{variance['motivation']:>9.3f}{variance['preparation']:>10.3f}{variance['score']:>11.3f}{status}")
+
+    print_comparison(results)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    for key, problems in regressions:
+        for problem in problems:
+            print(f"Regression in {key}: {problem}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Classroom load simulator.
+
+Creates a synthetic seminar (question slides, a group forming slide and a closing text slide) and drives N
+virtual students through the real students blueprint with the Flask test client, one thread per student:
+enter the code, join, answer the questions, wait on the group forming slide (reloading the page every
+--poll-interval seconds, like the 5 second fallback polling in the browser) and finish the seminar. Meanwhile a
+virtual teacher polls the dashboard. Reports throughput and p50/p95/p99 latency per endpoint, and the number of
+SQL statements and "database is locked" errors per request.
+
+Usage (from the repository root):
+    python -m benchmarks.load                                  # 300 students, temporary SQLite database
+    python -m benchmarks.load --students 50 --poll-interval 1  # quicker run
+    python -m benchmarks.load --database postgresql://...      # against another (empty) database
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The app is configured on import, so the database has to be chosen before interact is imported (see main())
+ANSWER_PATTERN = re.compile(r'name="answer" value="(\d+)"')
+NR_ANSWERS = 4
+
+class Metrics():
+    """Per-request measurements, grouped by endpoint. SQL statements and lock errors are counted per thread."""
+    def __init__(self, engine):
+        self.lock = threading.Lock()
+        self.requests = {} # endpoint -> list of (latency, nr_statements, nr_lock_errors, status_code)
+        self.local = threading.local()
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            self.local.statements = getattr(self.local, "statements", 0) + 1
+
+        @event.listens_for(engine, "handle_error")
+        def count_lock_error(context):
+            if "locked" in str(context.original_exception):
+                self.local.lock_errors = getattr(self.local, "lock_errors", 0) + 1
+
+    def start(self):
+        self.local.statements = 0
+        self.local.lock_errors = 0
+        return time.perf_counter()
+
+    def stop(self, endpoint, started, status_code):
+        latency = time.perf_counter() - started
+        with self.lock:
+            self.requests.setdefault(endpoint, []).append((latency, self.local.statements, self.local.lock_errors, status_code))
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))]
+
+class Simulation():
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.urls = app.url_map.bind("localhost")
+        from interact import db
+        with app.app_context():
+            self.metrics = Metrics(db.engine)
+        self.finished = threading.Event()
+        self.nr_done = 0
+        self.nr_timeouts = 0
+        self.done_lock = threading.Lock()
+
+    def request(self, client, method, url, **kwargs):
+        try:
+            endpoint = self.urls.match(url.split("?")[0], method=method)[0]
+        except Exception:
+            endpoint = url
+        started = self.metrics.start()
+        try:
+            response = client.open(url, method=method, **kwargs)
+            status_code = response.status_code
+        except Exception:
+            response = None
+            status_code = 599 # the request raised
+        self.metrics.stop(f"{method} {endpoint}", started, status_code)
+        return response
+
+    def think(self, rng):
+        if self.args.think_time > 0:
+            time.sleep(rng.uniform(0, self.args.think_time))
+
+    def setup(self):
+        """Creates a teacher and an active seminar with the enrolled students, returns (seminar id, code, student ids)."""
+        from werkzeug.security import generate_password_hash
+        from interact import db
+        from interact.models import User, Seminar, Slide, Answer, Student
+        from interact.lib.enrollment import enroll_students
+        args = self.args
+        with self.app.app_context():
+            teacher = User(f"load-teacher-{int(time.time())}", generate_password_hash("load"))
+            db.session.add(teacher)
+            db.session.flush()
+            seminar = Seminar("Load simulation", args.students, teacher.id)
+            seminar.active = True
+            db.session.add(seminar)
+            db.session.flush()
+            for order in range(1, args.questions + 1):
+                slide = Slide(0, f"Question {order}", order, seminar.id)
+                db.session.add(slide)
+                db.session.flush()
+                db.session.add_all([Answer(f"Answer {i}", i == 0, slide.id) for i in range(NR_ANSWERS)])
+            gf_slide = Slide(2, "Group forming", args.questions + 1, seminar.id)
+            gf_slide.gf_type = args.gf_type
+            gf_slide.gf_nr_per_group = args.nr_per_group
+            db.session.add(gf_slide)
+            db.session.add(Slide(1, "Discuss in your group", args.questions + 2, seminar.id, "Thank you"))
+            db.session.commit()
+            enroll_students(seminar.id, (f"Student {i}" for i in range(1, args.students + 1)))
+            student_ids = db.session.scalars(db.select(Student.id).where(Student.seminar_id == seminar.id).order_by(Student.id)).all()
+            self.teacher_name = teacher.username
+            return seminar.id, seminar.code, student_ids
+
+    def run_student(self, seminar_id, code, student_id, deadline):
+        rng = random.Random(self.args.seed * 100003 + student_id)
+        client = self.app.test_client()
+        self.think(rng)
+        self.request(client, "POST", "/students/", data={"code": code})
+        self.request(client, "GET", f"/students/join/{seminar_id}")
+        self.think(rng)
+        self.request(client, "POST", f"/students/join/{seminar_id}",
+                     data={"name": student_id, "motivation": rng.randint(0, 5), "preparation": rng.randint(0, 5)})
+        while True:
+            response = self.request(client, "GET", "/students/seminar")
+            if response is None or response.status_code != 200:
+                break # completed (redirect to the start page) or failed
+            html = response.get_data(as_text=True)
+            if "Please wait" in html:
+                if time.monotonic() > deadline:
+                    with self.done_lock:
+                        self.nr_timeouts += 1
+                    return
+                time.sleep(self.args.poll_interval)
+                continue
+            self.think(rng)
+            answers = ANSWER_PATTERN.findall(html)
+            data = {"answer": rng.choice(answers)} if answers else {}
+            self.request(client, "POST", "/students/seminar", data=data)
+        with self.done_lock:
+            self.nr_done += 1
+
+    def run_teacher(self, seminar_id):
+        client = self.app.test_client()
+        self.request(client, "POST", "/auth/login", data={"username": self.teacher_name, "password": "load"})
+        while not self.finished.is_set():
+            self.request(client, "GET", f"/teachers/dashboard/{seminar_id}/content")
+            self.request(client, "GET", f"/teachers/api/dashboard/{seminar_id}")
+            self.finished.wait(self.args.poll_interval)
+
+    def run(self):
+        seminar_id, code, student_ids = self.setup()
+        deadline = time.monotonic() + self.args.timeout
+        started = time.perf_counter()
+        teacher = None
+        if not self.args.no_teacher:
+            teacher = threading.Thread(target=self.run_teacher, args=(seminar_id,), daemon=True)
+            teacher.start()
+        with ThreadPoolExecutor(max_workers=len(student_ids)) as pool:
+            for student_id in student_ids:
+                pool.submit(self.run_student, seminar_id, code, student_id, deadline)
+        self.finished.set()
+        if teacher is not None:
+            teacher.join()
+        return time.perf_counter() - started
+
+    def report(self, duration):
+        rows = []
+        for endpoint, measurements in sorted(self.metrics.requests.items()):
+            latencies = sorted(m[0] for m in measurements)
+            statements = [m[1] for m in measurements]
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(measurements),
+                "throughput": len(measurements) / duration,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "sql_per_request": sum(statements) / len(statements),
+                "sql_max": max(statements),
+                "lock_errors": sum(m[2] for m in measurements),
+                "errors": sum(1 for m in measurements if m[3] >= 500),
+            })
+        nr_requests = sum(row["requests"] for row in rows)
+        return {
+            "students": self.args.students,
+            "finished": self.nr_done,
+            "timeouts": self.nr_timeouts,
+            "duration": duration,
+            "requests": nr_requests,
+            "throughput": nr_requests / duration,
+            "endpoints": rows,
+        }
+
+def print_report(report):
+    print(f"{report['finished']}/{report['students']} students finished ({report['timeouts']} timed out) in {report['duration']:.1f}s, "
+          f"{report['requests']} requests, {report['throughput']:.1f} req/s")
+    print(f"{'endpoint':<42}{'requests':>9}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL/req':>9}{'SQL max':>9}{'locked':>8}{'5xx':>6}")
+    for row in report["endpoints"]:
+        print(f"{row['endpoint']:<42}{row['requests']:>9}{row['throughput']:>8.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['sql_per_request']:>9.1f}{row['sql_max']:>9}{row['lock_errors']:>8}{row['errors']:>6}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classroom load simulator")
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=5, help="number of question slides before group forming")
+    parser.add_argument("--gf-type", type=int, default=3, help="group forming method (see Slide.gf_type)")
+    parser.add_argument("--nr-per-group", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=1.0, help="max. seconds a student waits before a click")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="seconds between reloads of the waiting page")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds after which waiting students give up")
+    parser.add_argument("--no-teacher", action="store_true", help="don't simulate a teacher polling the dashboard")
+    parser.add_argument("--database", help="database URI (default: a temporary SQLite database)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.database is None:
+        args.database = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='interact-load-'), 'load.sqlite')}"
+    os.environ["FLASK_SQLALCHEMY_DATABASE_URI"] = args.database
+    os.environ["FLASK_WTF_CSRF_ENABLED"] = "false"
+    os.environ.setdefault("FLASK_SECRET_KEY", "load-simulation")
+    from interact import app, db
+    with app.app_context():
+        db.create_all()
+
+    simulation = Simulation(app, args)
+    report = simulation.report(simulation.run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+    failed = report["timeouts"] > 0 or any(row["errors"] or row["lock_errors"] for row in report["endpoints"])
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Startup benchmark: how long a fresh process needs from the first import to the first response.
+
+Each run starts a new Python process (so nothing is cached in memory) that imports interact, creates the app
+and handles a first request with the test client, and reports the time of each phase. With --gunicorn it instead
+starts the real server (gunicorn.conf.py) and measures the time until the first HTTP 200, like a cold start on
+Cloud Run. Prints the median and maximum over --runs runs.
+
+Usage (from the repository root):
+    python -m benchmarks.startup                        # 5 runs in-process
+    python -m benchmarks.startup --gunicorn --runs 3    # real server, from process start to first 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints the phase timings as JSON
+CHILD = """
+import json, time
+start = time.perf_counter()
+import interact
+imported = time.perf_counter()
+app = interact.create_app()
+created = time.perf_counter()
+response = app.test_client().get({path!r})
+assert response.status_code == 200, response.status_code
+responded = time.perf_counter()
+print(json.dumps({{"import": imported - start, "create_app": created - imported, "first_request": responded - created,
+                  "total": responded - start}}))
+"""
+
+PHASES = ["import", "create_app", "first_request", "total"]
+
+def environment(database):
+    env = dict(os.environ)
+    env["FLASK_SQLALCHEMY_DATABASE_URI"] = database
+    env.setdefault("FLASK_SECRET_KEY", "startup-benchmark")
+    return env
+
+def run_in_process(env, path):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD.format(path=path)], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - started # including the interpreter start
+    return timings
+
+def run_gunicorn(env, path, port, timeout=60):
+    env = dict(env, PORT=str(port))
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return {"total": time.perf_counter() - started}
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from gunicorn within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-to-first-response benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="URL of the first request")
+    parser.add_argument("--gunicorn", action="store_true", help="start gunicorn and wait for the first HTTP 200")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database", help="database URI (default: a temporary SQLite database)")
+    args = parser.parse_args(argv)
+
+    database = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='interact-startup-'), 'startup.sqlite')}"
+    env = environment(database)
+    if args.database is None:
+        subprocess.run([sys.executable, "-c", "from interact import app, db\nwith app.app_context(): db.create_all()"],
+                       cwd=ROOT, env=env, check=True, capture_output=True)
+
+    results = [run_gunicorn(env, args.path, args.port) if args.gunicorn else run_in_process(env, args.path)
+               for _ in range(args.runs)]
+    phases = ["total"] if args.gunicorn else PHASES + ["process"]
+    print(f"{'phase':<16}{'median (ms)':>12}{'max (ms)':>10}")
+    for phase in phases:
+        values = [result[phase] * 1000 for result in results]
+        print(f"{phase:<16}{median(values):>12.1f}{max(values):>10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
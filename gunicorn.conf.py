@@ -0,0 +1,40 @@
+# Gunicorn settings (used by the Dockerfile: gunicorn -c gunicorn.conf.py app:app).
+# Every setting can be overridden with the GUNICORN_* environment variables below, or on the command line.
+import os
+
+def nr_cpus():
+    # The CPUs this container may actually use (Cloud Run limits the affinity, not os.cpu_count())
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+
+# gevent (default): one worker per CPU, each serving many connections, as the Server-Sent Events streams are
+# long-lived. gthread: a few workers per CPU with a pool of threads each.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+if worker_class == "gevent":
+    workers = int(os.environ.get("GUNICORN_WORKERS", nr_cpus()))
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+else:
+    workers = int(os.environ.get("GUNICORN_WORKERS", 2 * nr_cpus() + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Import the app once in the master, before forking: workers start faster and share memory pages. Safe, because
+# the app disposes its engine's connection pool after a fork (see create_app()) and starts its background threads
+# (response buffer, job pool) lazily in each worker.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Event streams are kept open by the client; keep-alive a bit longer than a load balancer's idle timeout
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 75
+
+accesslog = "-"
+errorlog = "-"
+
+if worker_class == "gevent" and preload_app:
+    # The preloaded app creates locks and threads; patch the standard library before it is imported
+    from gevent import monkey
+    monkey.patch_all()
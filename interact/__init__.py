@@ -1,58 +1,119 @@
-from flask import Flask
+from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 import json
 import os
 
-### App configuration
+# Extensions, bound to an app in create_app()
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
 
-app = Flask(__name__)
+@login_manager.user_loader
+def load_user(user_id):
+    from interact.lib.cache import get_user
+    return get_user(int(user_id))
 
-config_path = os.path.join(os.path.dirname(__file__), "config.json")
-try:
-    app.config.from_file(config_path, load=json.load)
-except Exception as e:
-    print(f"Error loading config file ({config_path}) from {__file__}: {e}")
+def home():
+    return render_template("home.html")
 
-### ORM
+def create_app(config=None):
+    """
+    Builds the app: configuration (config.json, then FLASK_-prefixed environment variables, then config),
+    database, instrumentation, login manager, blueprints and CLI commands.
+    Nothing is built when the package is imported, so `import interact` stays cheap; see also `app` below.
+    """
+    app = Flask(__name__)
 
-db = SQLAlchemy()
-db.init_app(app)
+    ### App configuration
 
-migrate = Migrate(app, db)
+    config_path = os.path.join(os.path.dirname(__file__), "config.json")
+    try:
+        app.config.from_file(config_path, load=json.load)
+    except Exception as e:
+        print(f"Error loading config file ({config_path}) from {__file__}: {e}")
+    # Settings can be overridden with FLASK_-prefixed environment variables, e.g. FLASK_SQLALCHEMY_DATABASE_URI
+    app.config.from_prefixed_env()
+    app.config.update(config or {})
 
-from sqlalchemy import event
+    ### ORM
 
-with app.app_context():
-    @event.listens_for(db.engine, "connect")
-    def set_sqlite_pragma(dbapi_connection, connection_record):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+    from interact.lib.database import configure_engine_options, register_connection_setup
 
-### Login manager
+    # Engine options and SQLite PRAGMAs of the selected DATABASE_PROFILE (see lib/database.py)
+    configure_engine_options(app)
+    db.init_app(app)
 
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'auth.login'
+    # For the `flask db` commands
+    from flask_migrate import Migrate
+    Migrate(app, db)
 
-from interact.models import User
+    with app.app_context():
+        engine = db.engine
+    register_connection_setup(app, engine)
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Connections must not be shared with forked processes (e.g. gunicorn workers of a preloaded app):
+    # the child starts with an empty pool and leaves the parent's connections alone
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+    ### Instrumentation (request timings and SQL statements per request, see /admin/metrics)
+
+    from interact.lib import metrics
+    metrics.init_app(app, engine)
+
+    ### Login manager
+
+    login_manager.init_app(app)
+
+    # Seminar events for the Server-Sent Events streams, within this process or across processes (EVENT_BUS)
+
+    from interact.lib import events
+    events.init_app(app)
+
+    # Student responses are written behind, in batches
+
+    from interact.lib import responses
+    responses.init_app(app)
+
+    # Static files under fingerprinted names, precompressed (see lib/assets.py and `flask build-assets`)
+
+    from interact.lib.assets import assets
+    assets.init_app(app)
+
+    # Register Blueprints
+
+    app.add_url_rule("/", "home", home)
+
+    from interact.auth.views import auth_blueprint
+    app.register_blueprint(auth_blueprint, url_prefix="/auth")
+
+    from interact.students.views import students_blueprint
+    app.register_blueprint(students_blueprint, url_prefix="/students")
+
+    from interact.teachers.views import teachers_blueprint
+    app.register_blueprint(teachers_blueprint, url_prefix="/teachers")
+
+    from interact.admin.views import admin_blueprint
+    app.register_blueprint(admin_blueprint, url_prefix="/admin")
+
+    # CLI commands
 
-# Register Blueprints
+    from interact.lib.counters import recompute_counters_command
+    app.cli.add_command(recompute_counters_command)
 
-from interact.auth.views import auth_blueprint
-app.register_blueprint(auth_blueprint, url_prefix="/auth")
+    from interact.lib.sessions import purge_archives_command
+    app.cli.add_command(purge_archives_command)
 
-from interact.students.views import students_blueprint
-app.register_blueprint(students_blueprint, url_prefix="/students")
+    from interact.lib.demo import create_demo_command
+    app.cli.add_command(create_demo_command)
 
-from interact.teachers.views import teachers_blueprint
-app.register_blueprint(teachers_blueprint, url_prefix="/teachers")
+    return app
 
-from interact.admin.views import admin_blueprint
-app.register_blueprint(admin_blueprint, url_prefix="/admin")
\ No newline at end of file
+def __getattr__(name):
+    """`from interact import app`: the app with the default configuration, created on first use."""
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
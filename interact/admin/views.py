@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, current_app, flash, redirect, url_for
+from flask import Blueprint, render_template, current_app, flash, redirect, url_for, request, Response
 from flask_login import current_user
 from interact.models import User
 from functools import wraps
+import hmac
 
 admin_blueprint = Blueprint('admin', __name__, template_folder='templates')
 
@@ -20,4 +21,17 @@ def admin_required(f):
 @admin_required
 def index():
     users = User.query.filter(User.role != "admin").all()
-    return render_template("index_admin.html", users=users)
\ No newline at end of file
+    return render_template("index_admin.html", users=users)
+
+@admin_blueprint.route("/metrics")
+def metrics():
+    """
+    Request, SQL and group forming metrics of this worker process, in the Prometheus text format.
+    For admins, or for a scraper sending "Authorization: Bearer <METRICS_TOKEN>" if METRICS_TOKEN is configured.
+    """
+    token = current_app.config.get("METRICS_TOKEN")
+    if not (token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")):
+        if not current_user.is_authenticated or current_user.role != 'admin':
+            return "Not authorized", 403
+    from interact.lib.metrics import render_metrics
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,48 @@
+from interact import db
+from interact.models import Student
+from interact.lib.cache import get_unclaimed_students, unclaimed
+from interact.lib.counters import count_join
+
+# Seminars with more unclaimed names than this get a search box instead of one long dropdown
+DROPDOWN_LIMIT = 40
+# Maximum number of names returned by a search
+MAX_MATCHES = 20
+
+def search_unclaimed(seminar_id, query, limit=MAX_MATCHES):
+    """
+    Unclaimed (id, name) pairs of a seminar whose name, or one of its words, starts with query (ignoring case).
+    Served from the cached list, so typing in the search box does not query the database.
+    """
+    query = query.strip().casefold()
+    if not query:
+        return []
+    matches = []
+    for id, name in get_unclaimed_students(seminar_id):
+        folded = name.casefold()
+        if folded.startswith(query) or any(word.startswith(query) for word in folded.split()):
+            matches.append((id, name))
+            if len(matches) >= limit:
+                break
+    return matches
+
+def claim_student(seminar_id, student_id, motivation, preparation):
+    """
+    Joins a student with one conditional UPDATE, which only succeeds if nobody has claimed that student yet;
+    of two devices claiming the same name at the same time exactly one wins. Counts the join in the same
+    transaction. Returns the claimed student's row, or None if the student was taken (or does not exist).
+    """
+    row = db.session.execute(
+        db.update(Student)
+        .where(Student.id == student_id, Student.seminar_id == seminar_id, Student.joined == False)
+        .values(joined=True, current_slide=1, motivation=motivation, preparation=preparation)
+        .returning(Student.id, Student.seminar_id, Student.name, Student.joined, Student.current_slide,
+                   Student.motivation, Student.preparation, Student.score, Student.reached_gf)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        db.session.rollback()
+        unclaimed.pop(seminar_id) # our list of names was out of date
+        return None
+    count_join(seminar_id, False, None, 1)
+    db.session.commit()
+    return row
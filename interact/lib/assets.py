@@ -0,0 +1,152 @@
+import base64
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import click
+from flask import current_app, request, send_from_directory, url_for, abort
+from flask.cli import with_appcontext
+try:
+    import brotli
+except ImportError: # optional: without it only gzip variants are made
+    brotli = None
+
+# Third-party files, committed in our own static folder and pinned by their Subresource Integrity hash, with the
+# URL they were taken from (only for updating them: they are never fetched at build or run time).
+VENDORED = {
+    "vendor/bootstrap.min.css": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.5/dist/css/bootstrap.min.css",
+        "sha384-SgOJa3DmI69IUzQ2PVdRZhwQ+dy64/BUtbMJw1MZ8t5HZApcHrRKUc4W0kG879m7",
+    ),
+    # Bootstrap's own script without Popper (the dropdowns, popovers and tooltips need popper.min.js first)
+    "vendor/popper.min.js": (
+        "https://cdn.jsdelivr.net/npm/@popperjs/core@2.11.8/dist/umd/popper.min.js",
+        "sha384-rn0XrCNfhQuw2/tzfv4cvBHjPnljfEYSGlYLk2VmCk0ts82JdJvQ72xx/nV/XJcB",
+    ),
+    "vendor/bootstrap.min.js": (
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.5/dist/js/bootstrap.min.js",
+        "sha384-VQqxDN0EQCkWoxt/0vsQvZswzTHUVOImccYmSyhJTp7kGtPed0Qcx8rK9h9YEgx+",
+    ),
+}
+# Only text formats are worth compressing
+COMPRESSIBLE = {".css", ".js", ".svg", ".map", ".json", ".txt"}
+MANIFEST = "manifest.json"
+# Fingerprinted files never change, so browsers may keep them for a year without asking
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def integrity(data):
+    return "sha384-" + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+def fingerprinted(name, data):
+    """style.css -> style.<first 12 hex digits of the SHA-256 of its content>.css"""
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def check_vendored(static_folder):
+    """Raises RuntimeError if a vendored file is missing, or does not match its pinned hash."""
+    problems = []
+    for name, (url, expected) in VENDORED.items():
+        try:
+            with open(os.path.join(static_folder, name), "rb") as f:
+                if integrity(f.read()) != expected:
+                    problems.append(f"{name} does not match its pinned integrity hash")
+        except FileNotFoundError:
+            problems.append(f"{name} is missing (from {url})")
+    if problems:
+        raise RuntimeError("; ".join(problems))
+
+def build_assets(static_folder, output_folder):
+    """
+    Copies every file of the static folder to output_folder under a fingerprinted name, next to precompressed
+    .gz (and .br) variants, and writes the manifest (name -> fingerprinted name). Returns the manifest.
+    """
+    manifest = {}
+    shutil.rmtree(output_folder, ignore_errors=True)
+    for directory, subdirectories, files in os.walk(static_folder):
+        subdirectories[:] = [d for d in subdirectories if os.path.join(directory, d) != output_folder]
+        for file in sorted(files):
+            source = os.path.join(directory, file)
+            name = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            manifest[name] = fingerprinted(name, data)
+            target = os.path.join(output_folder, manifest[name])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+            if os.path.splitext(name)[1] in COMPRESSIBLE:
+                with open(target + ".gz", "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0)) # mtime=0: reproducible builds
+                if brotli is not None:
+                    with open(target + ".br", "wb") as f:
+                        f.write(brotli.compress(data, quality=11))
+    with open(os.path.join(output_folder, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    return manifest
+
+class Assets():
+    """
+    Serves the built assets on /assets/<fingerprinted name>, precompressed if the browser accepts it, and gives
+    templates asset_url(name) and asset_integrity(name). Without a build, asset_url falls back to the plain
+    static file.
+    """
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.output_folder = app.config.get("ASSETS_FOLDER") or os.path.join(app.static_folder, "dist")
+        self.static_folder = app.static_folder
+        self.load_manifest()
+        app.add_url_rule("/assets/<path:filename>", "assets", self.serve)
+        app.context_processor(lambda: {"asset_url": self.url, "asset_integrity": self.integrity})
+        app.cli.add_command(build_assets_command)
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.output_folder, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def url(self, name):
+        if name in self.manifest:
+            return url_for("assets", filename=self.manifest[name])
+        return url_for("static", filename=name)
+
+    def integrity(self, name):
+        return VENDORED[name][1] if name in VENDORED else ""
+
+    def serve(self, filename):
+        path = os.path.join(self.output_folder, filename)
+        if filename == MANIFEST or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        encoding = None
+        for candidate, extension in (("br", ".br"), ("gzip", ".gz")):
+            if request.accept_encodings[candidate] > 0 and os.path.isfile(path + extension):
+                encoding, filename = candidate, filename + extension
+                break
+        response = send_from_directory(self.output_folder, filename, mimetype=mimetype)
+        if encoding is not None:
+            response.content_encoding = encoding
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+assets = Assets()
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Check the vendored files, then fingerprint and precompress the static files."""
+    try:
+        check_vendored(current_app.static_folder)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    manifest = build_assets(current_app.static_folder, assets.output_folder)
+    assets.load_manifest()
+    click.echo(f"Built {len(manifest)} asset(s) in {assets.output_folder}" + ("" if brotli else " (no brotli: pip install Brotli)"))
@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session, selectinload
+from interact import db
+from interact.models import User, Seminar, Slide, Answer, Student
+
+class LRUCache():
+    """Thread-safe LRU cache in which every entry also expires after ttl seconds."""
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Returns the cached value for key, or loads (and caches) it with loader() if missing or expired."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                return entry[1]
+        value = loader()
+        if value is not None:
+            with self.lock:
+                self.entries[key] = (now + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return value
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def pop_matching(self, predicate):
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class CodeMap():
+    """
+    All active seminar codes (code -> seminar id) in one dict, loaded with a single query, so a crowd of students
+    entering a code (or mistyping it) does not query the database each. The map is reloaded after ttl seconds,
+    and on a miss if it is older than miss_ttl seconds: a seminar activated in another worker process is found
+    almost immediately, while wrong codes cause at most one reload per miss_ttl.
+    """
+    def __init__(self, ttl, miss_ttl):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.codes = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def get(self, code, loader):
+        now = time.monotonic()
+        with self.lock:
+            age = None if self.loaded_at is None else now - self.loaded_at
+            if age is not None and age < self.ttl and (code in self.codes or age < self.miss_ttl):
+                return self.codes.get(code)
+        codes = dict(loader())
+        with self.lock:
+            self.codes = codes
+            self.loaded_at = now
+        return codes.get(code)
+
+    def clear(self):
+        with self.lock:
+            self.loaded_at = None
+
+# Slide decks are keyed by (seminar id, deck version), so a stale deck is never served, not even by another
+# worker process. Codes and users are invalidated in this process on commit and otherwise expire quickly.
+decks = LRUCache(maxsize=256, ttl=600)
+# Rendered slide bodies, keyed by (seminar id, deck version, slide id, template)
+fragments = LRUCache(maxsize=4096, ttl=600)
+active_codes = CodeMap(ttl=10, miss_ttl=1)
+# Students that can still be claimed, per seminar. May be a moment behind: claiming is atomic (see lib/admission.py)
+unclaimed = LRUCache(maxsize=256, ttl=2)
+users = LRUCache(maxsize=1024, ttl=60)
+
+### Cached (read-only, session-independent) copies of the models
+
+class CachedAnswer():
+    def __init__(self, answer):
+        self.id = answer.id
+        self.text = answer.text
+        self.correct = answer.correct
+
+class CachedSlide():
+    def __init__(self, slide):
+        self.id = slide.id
+        self.type = slide.type
+        self.title = slide.title
+        self.text = slide.text
+        self.slide_order = slide.slide_order
+        self.seminar_id = slide.seminar_id
+        self.gf_type = slide.gf_type
+        self.gf_nr_per_group = slide.gf_nr_per_group
+        self.answers = [CachedAnswer(answer) for answer in slide.answers]
+
+class CachedDeck():
+    def __init__(self, seminar_id, version, slides):
+        self.seminar_id = seminar_id
+        self.version = version
+        self.slides = {slide.slide_order: CachedSlide(slide) for slide in slides}
+        self.slides_by_id = {slide.id: slide for slide in self.slides.values()}
+        self.nr_slides = len(slides)
+        self.correct_answers = {answer.id for slide in self.slides.values() for answer in slide.answers if answer.correct}
+
+    def slide(self, slide_order):
+        return self.slides.get(slide_order)
+
+    def is_correct(self, answer_id):
+        try:
+            return int(answer_id) in self.correct_answers
+        except (TypeError, ValueError):
+            return False
+
+class CachedUser(UserMixin):
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+
+### Read-through accessors
+
+def get_deck(seminar):
+    """All slides (with answers) of a seminar, for the seminar's current deck version."""
+    def load():
+        slides = Slide.query.options(selectinload(Slide.answers)).filter_by(seminar_id=seminar.id).order_by(Slide.slide_order).all()
+        return CachedDeck(seminar.id, seminar.deck_version, slides)
+    return decks.get((seminar.id, seminar.deck_version), load)
+
+def get_active_seminar_id(code):
+    """Id of the active seminar with this code, or None."""
+    def load():
+        return db.session.execute(select(Seminar.code, Seminar.id).filter_by(active=True)).all()
+    return active_codes.get(code, load)
+
+def get_unclaimed_students(seminar_id):
+    """(id, name) of the enrolled students of a seminar that have not joined yet, ordered by name."""
+    def load():
+        rows = db.session.execute(
+            select(Student.id, Student.name).where(Student.seminar_id == seminar_id, Student.joined == False)
+            .order_by(Student.name)
+        )
+        return tuple((id, name) for id, name in rows)
+    return unclaimed.get(seminar_id, load)
+
+def get_user(user_id):
+    def load():
+        user = db.session.get(User, user_id)
+        return CachedUser(user) if user is not None else None
+    return users.get(user_id, load)
+
+### Invalidation
+
+@event.listens_for(Session, "after_flush")
+def collect_invalidations(session, flush_context):
+    """Bumps the deck version of seminars whose slides or answers changed, and remembers what to evict on commit."""
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    seminar_ids = {obj.seminar_id for obj in changed if isinstance(obj, Slide) and obj.seminar_id is not None}
+    slide_ids = {obj.slide_id for obj in changed if isinstance(obj, Answer) and obj.slide_id is not None}
+    if slide_ids:
+        seminar_ids |= set(session.connection().scalars(select(Slide.seminar_id).where(Slide.id.in_(slide_ids))))
+    if seminar_ids:
+        session.connection().execute(
+            update(Seminar).where(Seminar.id.in_(seminar_ids)).values(deck_version=Seminar.deck_version + 1)
+        )
+
+    pending = session.info.setdefault("cache_invalidations", {"seminars": set(), "codes": set(), "users": set()})
+    pending["seminars"] |= seminar_ids
+    pending["codes"] |= {obj.code for obj in changed if isinstance(obj, Seminar)}
+    pending["users"] |= {obj.id for obj in changed if isinstance(obj, User)}
+
+@event.listens_for(Session, "after_commit")
+def apply_invalidations(session):
+    pending = session.info.pop("cache_invalidations", None)
+    if pending is None:
+        return
+    if pending["seminars"]:
+        decks.pop_matching(lambda key: key[0] in pending["seminars"])
+        fragments.pop_matching(lambda key: key[0] in pending["seminars"])
+    if pending["codes"]:
+        active_codes.clear()
+    for user_id in pending["users"]:
+        users.pop(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def discard_invalidations(session):
+    session.info.pop("cache_invalidations", None)
@@ -0,0 +1,141 @@
+import numpy as np
+
+# Maximum number of assignment/update rounds; usually the assignment is stable well before that
+MAX_ITERATIONS = 15
+# Stop when an iteration improves the total squared distance to the centroids by less than this fraction
+TOLERANCE = 1e-3
+# Each student is first offered its nearest CANDIDATES clusters; only the few that are left over look further
+CANDIDATES = 8
+# Upper bound (in bytes) for one block of the student x centroid distance computation
+BLOCK_BYTES = 16 * 1024 * 1024
+
+class BalancedClustering():
+    """
+    Size-constrained k-means on the (motivation, preparation, score) vectors, for very large cohorts.
+    Forms ceil(n / size) clusters of exactly `size` students (one cluster gets the remainder, if any).
+    Every iteration costs O(n·k): the distances of all students to all k centroids (vectorized), then a
+    balanced assignment in which clusters take their closest applicants up to their capacity, and finally
+    new centroids. The start is balanced already: the cohort sorted along the direction
+    of largest spread, cut into consecutive groups.
+    """
+    def __init__(self, features, size, max_iterations=MAX_ITERATIONS, candidates=CANDIDATES, block_bytes=BLOCK_BYTES):
+        self.features = np.asarray(features, dtype=np.float64).reshape(-1, 3)
+        self.features32 = self.features.astype(np.float32)
+        self.n = len(self.features)
+        self.size = size
+        self.k = -(-self.n // size) if self.n > 0 else 0 # rounded-up integer division
+        self.max_iterations = max_iterations
+        self.candidates = min(candidates, self.k)
+        self.block_rows = max(1, block_bytes // (4 * max(self.k, 1) * 3))
+
+    def initial_labels(self):
+        centered = self.features - self.features.mean(axis=0)
+        # Direction of largest spread (first principal component); ties broken by index via a stable sort
+        _, _, vt = np.linalg.svd(centered, full_matrices=False)
+        order = np.argsort(centered @ vt[0], kind="stable")
+        labels = np.empty(self.n, dtype=np.int64)
+        labels[order] = np.arange(self.n) // self.size
+        return labels
+
+    def centroids(self, labels):
+        counts = np.bincount(labels, minlength=self.k).astype(np.float64)
+        sums = np.zeros((self.k, 3))
+        np.add.at(sums, labels, self.features)
+        return sums / np.maximum(counts, 1)[:, None]
+
+    def nearest_clusters(self, centroids):
+        """
+        For every student its `candidates` nearest centroids (nearest first) and their squared distances,
+        computed block by block, so the full n x k distance matrix is never materialised.
+        """
+        centroids32 = centroids.astype(np.float32)
+        centroid_norms = (centroids32 ** 2).sum(axis=1)
+        nearest = np.empty((self.n, self.candidates), dtype=np.int64)
+        nearest_distances = np.empty((self.n, self.candidates), dtype=np.float32)
+        for start in range(0, self.n, self.block_rows):
+            x = self.features32[start:start + self.block_rows]
+            # |x|^2 - 2 x.c + |c|^2
+            d = (x ** 2).sum(axis=1)[:, None] - 2 * x @ centroids32.T + centroid_norms[None, :]
+            if self.candidates < self.k:
+                block_nearest = np.argpartition(d, self.candidates - 1, axis=1)[:, :self.candidates]
+            else:
+                block_nearest = np.broadcast_to(np.arange(self.k), d.shape)
+            block_distances = np.take_along_axis(d, block_nearest, axis=1)
+            order = np.argsort(block_distances, axis=1, kind="stable")
+            nearest[start:start + len(x)] = np.take_along_axis(block_nearest, order, axis=1)
+            nearest_distances[start:start + len(x)] = np.take_along_axis(block_distances, order, axis=1)
+        return nearest, nearest_distances
+
+    def capacities(self, nearest):
+        """Every cluster takes `size` students, except the least wanted one, which takes the remainder."""
+        capacities = np.full(self.k, self.size, dtype=np.int64)
+        remainder = self.n - (self.k - 1) * self.size
+        if remainder < self.size:
+            demand = np.bincount(nearest[:, 0], minlength=self.k)
+            capacities[np.argmin(demand)] = remainder
+        return capacities
+
+    def assign(self, centroids):
+        """
+        Capacity-constrained assignment in rounds: in round r every unassigned student applies to its r-th
+        nearest cluster, and every cluster accepts its closest applicants while it has room.
+        """
+        nearest, nearest_distances = self.nearest_clusters(centroids)
+        capacities = self.capacities(nearest)
+        labels = np.full(self.n, -1, dtype=np.int64)
+
+        for r in range(self.candidates):
+            students = np.flatnonzero(labels < 0)
+            if len(students) == 0:
+                break
+            clusters = nearest[students, r]
+            order = np.lexsort((students, nearest_distances[students, r], clusters))
+            students, clusters = students[order], clusters[order]
+            # Position of each applicant in its cluster's queue
+            group_start = np.flatnonzero(np.r_[True, clusters[1:] != clusters[:-1]])
+            positions = np.arange(len(clusters)) - np.repeat(group_start, np.diff(np.r_[group_start, len(clusters)]))
+            accepted = positions < capacities[clusters]
+            labels[students[accepted]] = clusters[accepted]
+            capacities -= np.bincount(clusters[accepted], minlength=self.k)
+
+        # Students whose nearest clusters were all full: nearest cluster with room left
+        for student in np.flatnonzero(labels < 0):
+            open_clusters = np.flatnonzero(capacities > 0)
+            distances = ((centroids[open_clusters] - self.features[student]) ** 2).sum(axis=1)
+            cluster = open_clusters[np.argmin(distances)]
+            labels[student] = cluster
+            capacities[cluster] -= 1
+        return labels
+
+    def cost(self, labels):
+        """Total squared distance of the students to the centroids of their clusters."""
+        return float(((self.features - self.centroids(labels)[labels]) ** 2).sum())
+
+    def labels(self):
+        if self.k <= 1:
+            return np.zeros(self.n, dtype=np.int64)
+        labels = self.initial_labels()
+        cost = self.cost(labels)
+        for _ in range(self.max_iterations):
+            new_labels = self.assign(self.centroids(labels))
+            new_cost = self.cost(new_labels)
+            if new_cost >= cost:
+                break # no improvement (the assignment can oscillate), keep the best one
+            improvement = (cost - new_cost) / cost
+            labels, cost = new_labels, new_cost
+            if improvement < TOLERANCE:
+                break
+        return labels
+
+    def order(self):
+        """
+        Student indices ordered cluster by cluster (the remainder cluster last), so that consecutive runs of
+        `size` students form the groups.
+        """
+        labels = self.labels()
+        counts = np.bincount(labels, minlength=self.k)
+        # Full clusters first; within the same size, by cluster number
+        cluster_rank = np.lexsort((np.arange(self.k), counts < self.size))
+        rank = np.empty(self.k, dtype=np.int64)
+        rank[cluster_rank] = np.arange(self.k)
+        return np.argsort(rank[labels], kind="stable").tolist()
@@ -0,0 +1,118 @@
+import click
+from flask.cli import with_appcontext
+from interact import db
+from interact.models import Seminar, Student, SeminarCounters, SlideCounter
+
+# All updates below are single atomic UPDATE/upsert statements in the caller's transaction,
+# so they are committed together with the student change they count.
+
+def get_counters(seminar_id):
+    """The counters record of a seminar (a single-row read), created from the Student table if missing."""
+    counters = db.session.get(SeminarCounters, seminar_id)
+    if counters is None:
+        recompute_counters(seminar_id)
+        counters = db.session.get(SeminarCounters, seminar_id)
+    return counters
+
+def get_slide_counts(seminar_id):
+    """Number of joined students per current slide, as {slide_order: nr_students}."""
+    rows = db.session.execute(
+        db.select(SlideCounter.slide_order, SlideCounter.nr_students)
+        .where(SlideCounter.seminar_id == seminar_id, SlideCounter.nr_students > 0)
+        .order_by(SlideCounter.slide_order)
+    ).all()
+    return dict(rows)
+
+def upsert(model, values, index_elements, set_):
+    """INSERT ... ON CONFLICT DO UPDATE (SQLite and PostgreSQL)."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    db.session.execute(insert(model).values(**values).on_conflict_do_update(index_elements=index_elements, set_=set_))
+
+def increment(seminar_id, **deltas):
+    """
+    Adds the deltas (e.g. nr_joined=1) to the seminar's counters. Returns False if there were no counters yet:
+    they are then computed from scratch, which already includes the change being counted.
+    """
+    result = db.session.execute(
+        db.update(SeminarCounters)
+        .where(SeminarCounters.seminar_id == seminar_id)
+        .values({column: getattr(SeminarCounters, column) + delta for column, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        recompute_counters(seminar_id)
+        return False
+    return True
+
+def add_to_slide(seminar_id, slide_order):
+    upsert(SlideCounter, {"seminar_id": seminar_id, "slide_order": slide_order, "nr_students": 1},
+           ["seminar_id", "slide_order"], {"nr_students": SlideCounter.nr_students + 1})
+
+def move_student(seminar_id, from_slide, to_slide):
+    result = db.session.execute(
+        db.update(SlideCounter)
+        .where(SlideCounter.seminar_id == seminar_id, SlideCounter.slide_order == from_slide)
+        .values(nr_students=SlideCounter.nr_students - 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # The student was not counted at from_slide (no counters yet, or drift): count from scratch
+        recompute_counters(seminar_id)
+        return
+    add_to_slide(seminar_id, to_slide)
+
+def count_enrolled(seminar_id, nr_added):
+    increment(seminar_id, nr_enrolled=nr_added)
+
+def count_join(seminar_id, was_joined, from_slide, to_slide):
+    """A student (re)joined the seminar and is now at to_slide."""
+    if was_joined:
+        move_student(seminar_id, from_slide, to_slide)
+    elif increment(seminar_id, nr_joined=1):
+        add_to_slide(seminar_id, to_slide)
+
+def count_advance(seminar_id, from_slide):
+    move_student(seminar_id, from_slide, from_slide + 1)
+
+def count_reached_gf(seminar_id, nr_students=1):
+    increment(seminar_id, nr_reached_gf=nr_students)
+
+def recompute_counters(seminar_id):
+    """Repairs the counters of a seminar by counting the Student table."""
+    nr_enrolled, nr_joined, nr_reached_gf = db.session.execute(
+        db.select(db.func.count(Student.id),
+                  db.func.coalesce(db.func.sum(db.cast(Student.joined, db.Integer)), 0),
+                  db.func.coalesce(db.func.sum(db.cast(Student.reached_gf, db.Integer)), 0))
+        .where(Student.seminar_id == seminar_id)
+    ).one()
+    values = {"nr_enrolled": nr_enrolled, "nr_joined": nr_joined, "nr_reached_gf": nr_reached_gf}
+    upsert(SeminarCounters, {"seminar_id": seminar_id, **values}, ["seminar_id"], values)
+
+    slide_counts = db.session.execute(
+        db.select(Student.current_slide, db.func.count(Student.id))
+        .where(Student.seminar_id == seminar_id, Student.joined == True)
+        .group_by(Student.current_slide)
+    ).all()
+    db.session.execute(db.delete(SlideCounter).where(SlideCounter.seminar_id == seminar_id))
+    if slide_counts:
+        db.session.execute(db.insert(SlideCounter), [
+            {"seminar_id": seminar_id, "slide_order": slide_order, "nr_students": nr_students}
+            for slide_order, nr_students in slide_counts
+        ])
+
+@click.command("recompute-counters")
+@click.option("--seminar-id", type=int, default=None, help="Only this seminar (default: all seminars)")
+@with_appcontext
+def recompute_counters_command(seminar_id):
+    """Recompute the seminar progress counters from the Student table, to repair drift."""
+    if seminar_id is None:
+        seminar_ids = db.session.scalars(db.select(Seminar.id)).all()
+    else:
+        seminar_ids = [seminar_id]
+    for id in seminar_ids:
+        recompute_counters(id)
+    db.session.commit()
+    click.echo(f"Recomputed counters of {len(seminar_ids)} seminar(s)")
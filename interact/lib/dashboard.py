@@ -0,0 +1,112 @@
+from interact import db
+from interact.models import Seminar, Student, Slide, Answer, Group, Response, SeminarCounters
+from interact.lib.counters import get_counters, get_slide_counts, recompute_counters
+from interact.lib.jobs import latest_job, job_data
+
+def dashboard_data(seminar):
+    """
+    Everything the teacher's dashboard shows, as plain (JSON-serializable) data.
+    Uses a fixed number of SQL statements, however many students and groups there are.
+    """
+    nr_slides = db.session.scalar(db.select(db.func.count(Slide.id)).where(Slide.seminar_id == seminar.id))
+    rows = db.session.execute(
+        db.select(Student.id, Student.name, Student.joined, Student.current_slide, Student.motivation,
+                  Student.preparation, Student.score, Student.reached_gf, Group.number)
+        .outerjoin(Group, Student.group_id == Group.id)
+        .where(Student.seminar_id == seminar.id)
+        .order_by(Student.id)
+    ).all()
+
+    students = []
+    groups = {}
+    for id, name, joined, current_slide, motivation, preparation, score, reached_gf, group_number in rows:
+        student = {
+            "id": id,
+            "name": name,
+            "joined": bool(joined),
+            "current_slide": current_slide,
+            "done": (current_slide or 0) > nr_slides,
+            "motivation": motivation,
+            "preparation": preparation,
+            "score": score,
+            "reached_gf": bool(reached_gf),
+            "group": group_number,
+        }
+        students.append(student)
+        if group_number is not None:
+            groups.setdefault(group_number, []).append(student)
+
+    # Who gave which answer, per question slide, in order of submission
+    response_rows = db.session.execute(
+        db.select(Slide.slide_order, Slide.title, Answer.text, Answer.correct, Student.name)
+        .select_from(Response)
+        .join(Slide, Response.slide_id == Slide.id)
+        .join(Student, Response.student_id == Student.id)
+        .outerjoin(Answer, Response.answer_id == Answer.id)
+        .where(Slide.seminar_id == seminar.id)
+        .order_by(Slide.slide_order, Response.created_at, Response.id)
+    ).all()
+    responses = {}
+    for slide_order, title, answer_text, correct, name in response_rows:
+        slide = responses.setdefault(slide_order, {"slide": slide_order, "title": title, "answers": {}})
+        answer = slide["answers"].setdefault(answer_text, {"text": answer_text, "correct": bool(correct), "students": []})
+        answer["students"].append(name)
+
+    counters = get_counters(seminar.id)
+    progress = get_slide_counts(seminar.id)
+    return {
+        "seminar": {
+            "id": seminar.id,
+            "name": seminar.name,
+            "code": seminar.code,
+            "active": bool(seminar.active),
+            "nr_students": seminar.nr_students,
+            "nr_slides": nr_slides,
+            "gf_status": seminar.gf_status,
+        },
+        "gf_job": job_data(latest_job(seminar)),
+        "counts": {
+            "enrolled": counters.nr_enrolled,
+            "joined": counters.nr_joined,
+            "reached_gf": counters.nr_reached_gf,
+        },
+        # Number of joined students per current slide
+        "progress": [{"slide": slide, "nr_students": nr_students} for slide, nr_students in progress.items()],
+        "students": students,
+        "groups": [{"number": number, "students": groups[number]} for number in sorted(groups)],
+        "responses": [{**slide, "answers": list(slide["answers"].values())} for slide in responses.values()],
+    }
+
+def index_summary(user_id):
+    """
+    All seminars of a teacher with their enrolled/joined/reached-GF counts, in a single query on the counters.
+    Missing counters (e.g. of seminars from before the counters existed) are computed and committed first, like
+    get_counters does.
+    """
+    query = (
+        db.select(Seminar.id, Seminar.name, Seminar.code, Seminar.active, Seminar.nr_students,
+                  SeminarCounters.nr_enrolled, SeminarCounters.nr_joined, SeminarCounters.nr_reached_gf)
+        .outerjoin(SeminarCounters, SeminarCounters.seminar_id == Seminar.id)
+        .where(Seminar.user_id == user_id)
+        .order_by(Seminar.id)
+    )
+    rows = db.session.execute(query).all()
+    missing = [id for id, *_, nr_enrolled, _, _ in rows if nr_enrolled is None]
+    if missing:
+        for seminar_id in missing:
+            recompute_counters(seminar_id)
+        db.session.commit()
+        rows = db.session.execute(query).all()
+    return [
+        {
+            "id": id,
+            "name": name,
+            "code": code,
+            "active": bool(active),
+            "nr_students": nr_students,
+            "nr_enrolled": nr_enrolled,
+            "nr_joined": nr_joined,
+            "nr_reached_gf": nr_reached_gf,
+        }
+        for id, name, code, active, nr_students, nr_enrolled, nr_joined, nr_reached_gf in rows
+    ]
@@ -0,0 +1,72 @@
+from sqlalchemy import event
+
+# Database profiles, chosen with DATABASE_PROFILE in config.json ("sqlite", "postgresql" or "default"; by default
+# derived from SQLALCHEMY_DATABASE_URI). Single settings can be overridden with DATABASE_SETTINGS, e.g.
+# "DATABASE_SETTINGS": {"busy_timeout": 10000}.
+PROFILES = {
+    # No tuning, only foreign keys (the old behaviour)
+    "default": {},
+    # WAL lets readers continue while a student's change is committed; writers wait busy_timeout ms for the lock
+    # instead of failing with "database is locked"
+    "sqlite": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000, # ms
+        "synchronous": "NORMAL", # safe with WAL, no fsync on every commit
+        "mmap_size": 268435456, # 256 MB
+        "cache_size": -65536, # 64 MB (negative = KiB)
+    },
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10, # s
+        "pool_recycle": 1800, # s
+        "pool_pre_ping": True,
+        "statement_timeout": 10000, # ms
+        "lock_timeout": 5000, # ms
+        "idle_in_transaction_session_timeout": 60000, # ms
+    },
+}
+SQLITE_PRAGMAS = ["journal_mode", "busy_timeout", "synchronous", "mmap_size", "cache_size"]
+POOL_OPTIONS = ["pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"]
+POSTGRESQL_TIMEOUTS = ["statement_timeout", "lock_timeout", "idle_in_transaction_session_timeout"]
+
+def database_settings(config):
+    """The profile name and its settings (with overrides from DATABASE_SETTINGS) for an app config."""
+    profile = config.get("DATABASE_PROFILE")
+    if profile is None:
+        uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+        profile = "postgresql" if uri.startswith("postgres") else "sqlite"
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {profile}, use one of: {", ".join(PROFILES)}")
+    return profile, {**PROFILES[profile], **config.get("DATABASE_SETTINGS", {})}
+
+def configure_engine_options(app):
+    """Puts the engine options of the selected profile in SQLALCHEMY_ENGINE_OPTIONS; call before db.init_app()."""
+    profile, settings = database_settings(app.config)
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    connect_args = dict(options.get("connect_args", {}))
+    if profile == "sqlite":
+        connect_args.setdefault("timeout", settings["busy_timeout"] / 1000)
+    elif profile == "postgresql":
+        for option in POOL_OPTIONS:
+            options.setdefault(option, settings[option])
+        timeouts = " ".join(f"-c {timeout}={settings[timeout]}" for timeout in POSTGRESQL_TIMEOUTS)
+        connect_args.setdefault("options", timeouts)
+    if connect_args:
+        options["connect_args"] = connect_args
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+def register_connection_setup(app, engine):
+    """Sets the per-connection PRAGMAs of SQLite connections (foreign keys always, tuning per profile)."""
+    if engine.dialect.name != "sqlite":
+        return
+    profile, settings = database_settings(app.config)
+    pragmas = [(pragma, settings[pragma]) for pragma in SQLITE_PRAGMAS if pragma in settings]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        for pragma, value in pragmas:
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
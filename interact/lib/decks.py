@@ -0,0 +1,152 @@
+import json
+from interact import db
+from interact.models import Slide, Answer
+from interact.teachers.helpers import create_seminar
+
+# Decks are copied with a fixed number of statements, whatever the number of slides: one multi-row insert (or
+# INSERT ... SELECT) for the slides and one for the answers, in one transaction. Answers find their new slide by
+# slide_order, which is unique within a seminar.
+
+DECK_FORMAT = "interact-deck"
+DECK_VERSION = 1
+SLIDE_TYPES = {0, 1, 2} # question, text and group forming slide
+GF_TYPES = {0, 1, 2, 3, 4, 5}
+# Lengths of Slide.title, Slide.text and Answer.text
+TITLE_LENGTH = 100
+TEXT_LENGTH = 500
+ANSWER_LENGTH = 100
+SLIDE_COLUMNS = ["type", "title", "text", "slide_order", "gf_type", "gf_nr_per_group"]
+
+def next_slide_order(seminar_id):
+    return (db.session.scalar(db.select(db.func.max(Slide.slide_order)).where(Slide.seminar_id == seminar_id)) or 0) + 1
+
+def export_deck(seminar):
+    """The slides and answers of a seminar as a JSON-serialisable dict (two queries)."""
+    slides = db.session.execute(
+        db.select(Slide.id, Slide.type, Slide.title, Slide.text, Slide.gf_type, Slide.gf_nr_per_group)
+        .where(Slide.seminar_id == seminar.id)
+        .order_by(Slide.slide_order)
+    ).all()
+    answers = {}
+    for slide_id, text, correct in db.session.execute(
+        db.select(Answer.slide_id, Answer.text, Answer.correct)
+        .join(Slide, Answer.slide_id == Slide.id)
+        .where(Slide.seminar_id == seminar.id)
+        .order_by(Answer.id)
+    ):
+        answers.setdefault(slide_id, []).append({"text": text, "correct": bool(correct)})
+
+    deck = []
+    for id, type, title, text, gf_type, gf_nr_per_group in slides:
+        slide = {"type": type, "title": title, "text": text}
+        if type == 0:
+            slide["answers"] = answers.get(id, [])
+        elif type == 2:
+            slide.update(gf_type=gf_type, gf_nr_per_group=gf_nr_per_group)
+        deck.append(slide)
+    return {"format": DECK_FORMAT, "version": DECK_VERSION, "name": seminar.name, "slides": deck}
+
+def text_value(value, name, length, required=False):
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{name} is required")
+        return None
+    if not isinstance(value, str) or len(value) > length:
+        raise ValueError(f"{name} must be a text of at most {length} characters")
+    return value
+
+def read_deck(data):
+    """
+    Checks a deck (a JSON string/bytes or an already parsed dict, as made by export_deck) and returns its slides as
+    (row, answers) pairs. Raises ValueError with a message for the teacher if the deck is invalid.
+    """
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            raise ValueError("The file is not valid JSON")
+    if not isinstance(data, dict) or data.get("format") != DECK_FORMAT or not isinstance(data.get("slides"), list):
+        raise ValueError("The file is not an exported slide deck")
+    if data.get("version") != DECK_VERSION:
+        raise ValueError(f"Unsupported deck version {data.get('version')}")
+
+    slides = []
+    for number, slide in enumerate(data["slides"], start=1):
+        if not isinstance(slide, dict) or slide.get("type") not in SLIDE_TYPES:
+            raise ValueError(f"Slide {number}: unknown slide type")
+        row = {"type": slide["type"],
+               "title": text_value(slide.get("title"), f"Slide {number}: title", TITLE_LENGTH, required=True),
+               "text": text_value(slide.get("text"), f"Slide {number}: text", TEXT_LENGTH),
+               "gf_type": None, "gf_nr_per_group": None}
+        answers = []
+        if slide["type"] == 0:
+            if not isinstance(slide.get("answers"), list):
+                raise ValueError(f"Slide {number}: a question needs a list of answers")
+            for answer in slide["answers"]:
+                if not isinstance(answer, dict):
+                    raise ValueError(f"Slide {number}: invalid answer")
+                answers.append({"text": text_value(answer.get("text"), f"Slide {number}: answer", ANSWER_LENGTH),
+                                "correct": bool(answer.get("correct"))})
+        elif slide["type"] == 2:
+            nr_per_group = slide.get("gf_nr_per_group")
+            if slide.get("gf_type") not in GF_TYPES or not isinstance(nr_per_group, int) or nr_per_group < 1:
+                raise ValueError(f"Slide {number}: invalid group forming settings")
+            row.update(gf_type=slide["gf_type"], gf_nr_per_group=nr_per_group)
+        slides.append((row, answers))
+    if sum(row["type"] == 2 for row, _ in slides) > 1:
+        raise ValueError("A deck can have only one group forming slide")
+    return slides
+
+def import_deck(seminar, data):
+    """
+    Appends the slides of a deck (see read_deck) to a seminar, in one transaction with one insert for the slides and
+    one for the answers. Returns the number of slides added.
+    """
+    slides = read_deck(data)
+    if any(row["type"] == 2 for row, _ in slides) and db.session.scalar(
+            db.select(db.func.count(Slide.id)).where(Slide.seminar_id == seminar.id, Slide.type == 2)):
+        raise ValueError("The seminar already has a group forming slide")
+    if not slides:
+        return 0
+
+    offset = next_slide_order(seminar.id) - 1
+    # On the table: an ORM bulk insert would split the rows by their None columns, into several statements
+    db.session.execute(db.insert(Slide.__table__), [
+        {**row, "slide_order": offset + order, "seminar_id": seminar.id}
+        for order, (row, _) in enumerate(slides, start=1)
+    ])
+    answer_rows = [(offset + order, answer) for order, (_, answers) in enumerate(slides, start=1) for answer in answers]
+    if answer_rows:
+        slide_ids = dict(db.session.execute(
+            db.select(Slide.slide_order, Slide.id).where(Slide.seminar_id == seminar.id, Slide.slide_order > offset)
+        ).all())
+        db.session.execute(db.insert(Answer), [{**answer, "slide_id": slide_ids[order]} for order, answer in answer_rows])
+    # Core inserts bypass the cache invalidation on flush (see lib/cache.py): a new version is a new deck
+    seminar.deck_version += 1
+    db.session.commit()
+    return len(slides)
+
+def clone_seminar(seminar, name=None):
+    """
+    Creates a new, inactive seminar of the same teacher with a copy of the slides and answers (not the students),
+    with INSERT ... SELECT, in one transaction. Returns the new seminar.
+    """
+    clone = create_seminar(name or seminar.name, seminar.nr_students, seminar.user_id)
+    db.session.flush()
+
+    db.session.execute(db.insert(Slide).from_select(
+        SLIDE_COLUMNS + ["seminar_id"],
+        db.select(*(getattr(Slide, column) for column in SLIDE_COLUMNS), db.literal(clone.id))
+        .where(Slide.seminar_id == seminar.id)
+    ))
+    source = db.aliased(Slide)
+    db.session.execute(db.insert(Answer).from_select(
+        ["text", "correct", "slide_id"],
+        db.select(Answer.text, Answer.correct, Slide.id)
+        .join(source, Answer.slide_id == source.id)
+        .join(Slide, db.and_(Slide.seminar_id == clone.id, Slide.slide_order == source.slide_order))
+        .where(source.seminar_id == seminar.id)
+        .order_by(Answer.id)
+    ))
+    db.session.commit()
+    return clone
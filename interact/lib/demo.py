@@ -1,62 +1,120 @@
-from interact import db, app
-from interact.models import Seminar, Student, Slide, Answer
-
-def populate_for_demo(user_id, nr_students_at_gf=5):
-    student_names = ["Henk", "Tjeerd", "Karel", "Piet", "Jan", "Kees"]
-    student_scores =       [2, 1, 0, 1, 2, 0]
-    student_preparations = [4, 3, 3, 0, 1, 2]
-    student_motivations =  [3, 2, 5, 1, 2, 4]
-
-    with app.app_context():
-        test = Seminar("Test", 6, user_id)
-        test.active = True
-        db.session.add(test)
-        db.session.commit()
-
-        slide1 = Slide(1, "Welkom", 1, test.id, "Welkom bij dit werkcollege")
-        db.session.add(slide1)
-        db.session.commit()
-
-        slide2 = Slide(0, "Wat is 1+1?", 2, test.id)
-        db.session.add(slide2)
-        db.session.commit()
-        answers = []
-        answers.append(Answer("1", False, slide2.id))
-        answers.append(Answer("2", True, slide2.id))
-        answers.append(Answer("3", False, slide2.id))
-        db.session.add_all(answers)
-        db.session.commit()
-
-        slide3 = Slide(0, "Wat is de tweede letter van het alfabet?", 3, test.id)
-        db.session.add(slide3)
-        db.session.commit()
-        answers = []
-        answers.append(Answer("A", False, slide3.id))
-        answers.append(Answer("B", True, slide3.id))
-        answers.append(Answer("C", False, slide3.id))
-        db.session.add_all(answers)
-        db.session.commit()
-
-        slide4 = Slide(2, "Groepsvorming", 4, test.id)
-        slide4.gf_type = 3 # similarity grouping
-        slide4.gf_nr_per_group = 3
-        db.session.add(slide4)
-        db.session.commit()
-
-        slide5 = Slide(1, "Bedankt", 5, test.id, "Tot ziens bij het volgende werkcollege")
-        db.session.add(slide5)
-        db.session.commit()
-
-        students = []
-        for i in range(6):
-            student = Student(student_names[i], test.id)
-            if i < nr_students_at_gf:
-                student.current_slide = 4
-                student.joined = True
-                student.score = student_scores[i]
-                student.preparation = student_preparations[i]
-                student.motivation = student_motivations[i]
-                student.reached_gf = True
-            students.append(student)
-        db.session.add_all(students)
-        db.session.commit()
\ No newline at end of file
+import random
+import click
+from flask.cli import with_appcontext
+from interact import db
+from interact.models import User, Student, Slide, Answer
+from interact.teachers.helpers import create_seminar
+from interact.lib.counters import recompute_counters
+
+FIRST_NAMES = ["Henk", "Tjeerd", "Karel", "Piet", "Jan", "Kees", "Anna", "Sanne", "Fleur", "Daan", "Lotte", "Bram",
+               "Emma", "Sem", "Julia", "Lucas", "Noor", "Finn", "Tess", "Milan", "Eva", "Jesse", "Iris", "Thijs"]
+DISTRIBUTIONS = ["uniform", "normal"]
+MAX_RATING = 5 # motivation and preparation are on a scale from 0-5
+
+def student_names(nr_students):
+    """Unique names: the first names, then the first names numbered."""
+    for i in range(nr_students):
+        name = FIRST_NAMES[i % len(FIRST_NAMES)]
+        yield name if i < len(FIRST_NAMES) else f"{name} {i // len(FIRST_NAMES) + 1}"
+
+def draw(rng, maximum, distribution):
+    """A value from 0 to maximum: uniform, or normal around the middle (clipped)."""
+    if distribution == "normal":
+        return min(maximum, max(0, round(rng.gauss(maximum / 2, maximum / 4))))
+    return rng.randint(0, maximum)
+
+def question(nr_answers, rng):
+    """A sum with one correct answer and nr_answers - 1 wrong ones, in random order."""
+    a, b = rng.randint(1, 20), rng.randint(1, 20)
+    wrong = rng.sample([n for n in range(max(0, a + b - nr_answers), a + b + nr_answers + 1) if n != a + b], nr_answers - 1)
+    answers = [(str(a + b), True)] + [(str(n), False) for n in wrong]
+    rng.shuffle(answers)
+    return f"Wat is {a}+{b}?", answers
+
+def populate_for_demo(user_id, nr_students_at_gf=5, nr_students=6, nr_slides=5, nr_answers=3, distribution="uniform",
+                      seed=None, name="Test"):
+    """
+    Creates an active seminar: a welcome slide, nr_slides - 3 question slides with nr_answers answers each, a group
+    forming slide (similarity grouping) and a closing slide, and nr_students enrolled students, of whom the first
+    nr_students_at_gf have joined and reached the group forming slide, with score, motivation and preparation drawn
+    from the distribution. The same seed gives the same seminar.
+    Everything is written in one transaction, with one multi-row insert per table. Returns the seminar.
+    """
+    if nr_slides < 3:
+        raise ValueError("A demo seminar needs at least 3 slides (welcome, group forming and closing slide)")
+    if not 0 <= nr_students_at_gf <= nr_students:
+        raise ValueError("The number of students at group forming must be between 0 and the number of students")
+    if nr_answers < 1:
+        raise ValueError("Questions need at least 1 answer")
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution {distribution}, use one of: {", ".join(DISTRIBUTIONS)}")
+    rng = random.Random(seed)
+    nr_questions = nr_slides - 3
+    gf_order = nr_slides - 1
+
+    seminar = create_seminar(name, nr_students, user_id)
+    seminar.active = True
+    db.session.flush()
+
+    def slide_row(type, title, order, text=None, gf_type=None, gf_nr_per_group=None):
+        return {"type": type, "title": title, "text": text, "slide_order": order, "seminar_id": seminar.id,
+                "gf_type": gf_type, "gf_nr_per_group": gf_nr_per_group}
+
+    slide_rows = [slide_row(1, "Welkom", 1, "Welkom bij dit werkcollege")]
+    answers = {}
+    for order in range(2, gf_order):
+        title, answers[order] = question(nr_answers, rng)
+        slide_rows.append(slide_row(0, title, order))
+    slide_rows.append(slide_row(2, "Groepsvorming", gf_order, gf_type=3, gf_nr_per_group=3)) # similarity grouping
+    slide_rows.append(slide_row(1, "Bedankt", nr_slides, "Tot ziens bij het volgende werkcollege"))
+    # On the table: an ORM bulk insert would split the rows by their None columns, into one statement per slide type
+    db.session.execute(db.insert(Slide.__table__), slide_rows)
+
+    if answers:
+        slide_ids = dict(db.session.execute(
+            db.select(Slide.slide_order, Slide.id).where(Slide.seminar_id == seminar.id, Slide.type == 0)
+        ).all())
+        db.session.execute(db.insert(Answer), [
+            {"text": text, "correct": correct, "slide_id": slide_ids[order]}
+            for order, slide_answers in answers.items() for text, correct in slide_answers
+        ])
+
+    student_rows = []
+    for i, student_name in enumerate(student_names(nr_students)):
+        row = {"name": student_name, "seminar_id": seminar.id, "joined": False, "current_slide": 0, "score": 0,
+               "motivation": 0, "preparation": 0, "reached_gf": False}
+        if i < nr_students_at_gf:
+            row.update(joined=True, current_slide=gf_order, reached_gf=True,
+                       score=draw(rng, nr_questions, distribution),
+                       motivation=draw(rng, MAX_RATING, distribution),
+                       preparation=draw(rng, MAX_RATING, distribution))
+        student_rows.append(row)
+    if student_rows:
+        db.session.execute(db.insert(Student), student_rows)
+
+    recompute_counters(seminar.id)
+    db.session.commit()
+    return seminar
+
+@click.command("create-demo")
+@click.argument("username")
+@click.option("--students", "nr_students", type=int, default=6, show_default=True)
+@click.option("--at-gf", "nr_students_at_gf", type=int, default=None, help="Students at the group forming slide (default: all)")
+@click.option("--slides", "nr_slides", type=int, default=5, show_default=True, help="Including welcome, group forming and closing slide")
+@click.option("--answers", "nr_answers", type=int, default=3, show_default=True, help="Answers per question")
+@click.option("--distribution", type=click.Choice(DISTRIBUTIONS), default="uniform", show_default=True,
+              help="Of the scores, motivation and preparation")
+@click.option("--seed", type=int, default=None)
+@click.option("--name", default="Demo", show_default=True)
+@with_appcontext
+def create_demo_command(username, nr_students, nr_students_at_gf, nr_slides, nr_answers, distribution, seed, name):
+    """Create a synthetic seminar for USERNAME, e.g. a large one for load tests and benchmarks."""
+    user_id = db.session.scalar(db.select(User.id).where(User.username == username))
+    if user_id is None:
+        raise click.ClickException(f"Unknown user {username}")
+    try:
+        seminar = populate_for_demo(user_id, nr_students if nr_students_at_gf is None else nr_students_at_gf,
+                                    nr_students, nr_slides, nr_answers, distribution, seed, name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Created seminar {seminar.id} with code {seminar.code}")
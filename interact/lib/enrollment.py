@@ -0,0 +1,67 @@
+import csv
+import io
+from itertools import chain, islice
+from interact import db
+from interact.models import Student
+from interact.lib.counters import count_enrolled
+
+# Names are looked up and inserted in batches of this size
+BATCH_SIZE = 500
+NAME_LENGTH = 50 # length of Student.name
+HEADER_NAMES = {"name", "naam", "student", "student name"}
+
+def read_roster(stream, encoding="utf-8-sig"):
+    """
+    Generator yielding the student names in an uploaded CSV/TSV roster, row by row, so large files are never
+    fully loaded into memory. Uses the 'name' column if there is a header row, otherwise the first column.
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    first_line = text.readline()
+    if "\t" in first_line:
+        delimiter = "\t"
+    elif ";" in first_line and "," not in first_line:
+        delimiter = ";"
+    else:
+        delimiter = ","
+    rows = csv.reader(chain([first_line], text), delimiter=delimiter)
+    column = 0
+    header = next(rows, None)
+    if header is None:
+        return
+    header_names = [cell.strip().lower() for cell in header]
+    if HEADER_NAMES.intersection(header_names):
+        column = next(i for i, cell in enumerate(header_names) if cell in HEADER_NAMES)
+    else:
+        rows = chain([header], rows)
+    for row in rows:
+        if len(row) > column:
+            yield row[column]
+
+def unique_names(names):
+    seen = set()
+    for name in names:
+        name = (name or "").strip()[:NAME_LENGTH]
+        if len(name) > 0 and name not in seen:
+            seen.add(name)
+            yield name
+
+def enroll_students(seminar_id, names):
+    """
+    Adds the given names as students of the seminar, skipping empty names, duplicates and names that are enrolled
+    already. Works in batches: one query to find existing names and one multi-row insert per batch, one commit.
+    Returns the number of students added.
+    """
+    nr_added = 0
+    names = unique_names(names)
+    while batch := list(islice(names, BATCH_SIZE)):
+        existing = set(db.session.scalars(
+            db.select(Student.name).where(Student.seminar_id == seminar_id, Student.name.in_(batch))
+        ))
+        new_rows = [{"name": name, "seminar_id": seminar_id, "joined": False} for name in batch if name not in existing]
+        if new_rows:
+            db.session.execute(db.insert(Student), new_rows)
+            nr_added += len(new_rows)
+    if nr_added > 0:
+        count_enrolled(seminar_id, nr_added)
+    db.session.commit()
+    return nr_added
@@ -0,0 +1,296 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from werkzeug.utils import import_string
+
+# A stream is closed after this many seconds; the browser's EventSource reconnects by itself.
+# This keeps worker threads from being held forever by a single client.
+STREAM_TIMEOUT = 30
+# How often (in seconds) an idle stream checks the database, for changes made by other worker processes.
+# With a bus that is shared between processes this is only a safety net.
+CHECK_INTERVAL = 5
+SHARED_CHECK_INTERVAL = 60
+# Reconnection delay suggested to the browser (in milliseconds)
+RETRY_MS = 2000
+
+class EventBus():
+    """
+    Publish/subscribe of seminar events, used by the Server-Sent Events streams. Events that reach this process
+    are fanned out to all local subscribers (streams waiting in wait()); every seminar keeps a short history, so
+    a reconnecting client (Last-Event-ID) does not miss events. Only the max_seminars seminars with the most recent
+    events keep their history; a stream of a seminar that was quiet longer catches up with its database check.
+    Backends differ in how a published event reaches the other processes: see the subclasses.
+    """
+    shared = False # True if events published in one process reach the subscribers in all processes
+
+    def __init__(self, history=100, max_seminars=1000):
+        self.condition = threading.Condition()
+        self.history = history
+        self.max_seminars = max_seminars
+        self.events = OrderedDict() # seminar id -> recent events, least recently active seminar first
+        self.last_id = 0
+        self.pid = None
+
+    def publish(self, seminar_id, name, data=None):
+        raise NotImplementedError
+
+    def deliver(self, id, seminar_id, name, data):
+        """Hands an event to the local subscribers."""
+        with self.condition:
+            self.last_id = max(self.last_id, id)
+            events = self.events.get(seminar_id)
+            if events is None:
+                events = self.events[seminar_id] = deque(maxlen=self.history)
+            else:
+                self.events.move_to_end(seminar_id)
+            events.append((id, name, data or {}))
+            while len(self.events) > self.max_seminars:
+                self.events.popitem(last=False)
+            self.condition.notify_all()
+
+    def since(self, seminar_id, last_id):
+        return [event for event in self.events.get(seminar_id, ()) if event[0] > last_id]
+
+    def current_id(self):
+        self.ensure_started()
+        with self.condition:
+            return self.last_id
+
+    def wait(self, seminar_id, last_id, timeout):
+        """Blocks until there are events after last_id for the seminar, or the timeout expires."""
+        self.ensure_started()
+        with self.condition:
+            self.condition.wait_for(lambda: self.since(seminar_id, last_id), timeout)
+            return self.since(seminar_id, last_id)
+
+    def ensure_started(self):
+        """(Re)starts the backend's background thread, if any; also after a fork, as threads do not survive it."""
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.start()
+
+    def start(self):
+        pass
+
+class LocalEventBus(EventBus):
+    """Events only reach the subscribers in the publishing process (one worker, or tests)."""
+    def publish(self, seminar_id, name, data=None):
+        with self.condition:
+            self.deliver(self.last_id + 1, seminar_id, name, data)
+
+class DatabaseEventBus(EventBus):
+    """
+    Events go through the seminar_event table. One poller thread per process inserts the events published here
+    (as soon as it is free, so events published meanwhile are written together) and reads the new rows of all
+    processes every interval seconds, which it fans out to the local subscribers. Event ids are the row ids, so
+    they mean the same in every process. Needs nothing but the database; costs one query on the primary key per
+    interval per process, however many streams are open.
+    """
+    shared = True
+
+    def __init__(self, app, interval=0.5, retention=600, history=100):
+        super().__init__(history)
+        self.app = app
+        self.interval = interval
+        self.retention = retention
+        atexit.register(self.stop)
+
+    def start(self):
+        from interact import db
+        from interact.models import SeminarEvent
+        self.lock = threading.Lock()
+        self.poll_lock = threading.Lock()
+        self.outbox = []
+        self.wakeup = threading.Event()
+        self.stopped = False
+        with self.app.app_context():
+            # Only events published from now on
+            self.last_id = db.session.scalar(db.select(db.func.max(SeminarEvent.id))) or 0
+            db.session.remove()
+        self.last_purge = time.monotonic()
+        threading.Thread(target=self.run, name="event-poller", daemon=True).start()
+
+    def publish(self, seminar_id, name, data=None):
+        self.ensure_started()
+        with self.lock:
+            self.outbox.append({"seminar_id": seminar_id, "name": name, "data": json.dumps(data or {}),
+                                "created_at": datetime.now()})
+        self.wakeup.set()
+
+    def run(self):
+        pid = os.getpid()
+        while self.pid == pid and not self.stopped:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.poll()
+            except Exception:
+                self.app.logger.exception("Event bus poll failed")
+                time.sleep(self.interval)
+
+    def stop(self):
+        """
+        Stops the poller thread, after writing the events that were not written yet. Runs when the process exits
+        (atexit), so the last events of an exiting worker are not lost.
+        """
+        if self.pid != os.getpid() or self.stopped:
+            return # not started in this process, or stopped already
+        self.stopped = True
+        self.wakeup.set()
+        try:
+            self.poll()
+        except Exception:
+            self.app.logger.exception("Event bus flush failed")
+
+    def poll(self):
+        """Writes the outbox and delivers the new events."""
+        from interact import db
+        from interact.models import SeminarEvent
+        with self.poll_lock, self.app.app_context():
+            with self.lock:
+                rows, self.outbox = self.outbox, []
+            try:
+                if rows:
+                    try:
+                        db.session.execute(db.insert(SeminarEvent), rows)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        with self.lock:
+                            self.outbox[:0] = rows # retry on the next poll
+                        raise
+                events = db.session.execute(
+                    db.select(SeminarEvent.id, SeminarEvent.seminar_id, SeminarEvent.name, SeminarEvent.data)
+                    .where(SeminarEvent.id > self.last_id).order_by(SeminarEvent.id)
+                ).all()
+                for id, seminar_id, name, data in events:
+                    self.deliver(id, seminar_id, name, json.loads(data))
+                if time.monotonic() - self.last_purge > self.retention / 10:
+                    self.last_purge = time.monotonic()
+                    db.session.execute(db.delete(SeminarEvent).where(
+                        SeminarEvent.created_at < datetime.now() - timedelta(seconds=self.retention)))
+                    db.session.commit()
+            finally:
+                db.session.remove()
+
+class Broker():
+    """
+    Interface for an external message broker (e.g. Redis pub/sub), for BrokerEventBus. Set EVENT_BUS to "broker" and
+    EVENT_BROKER to the import path of a subclass ("package.module:RedisBroker"); it is created with the app config.
+    """
+    def __init__(self, config):
+        self.config = config
+
+    def publish(self, message):
+        """Sends a message (a string) to all processes, this one included."""
+        raise NotImplementedError
+
+    def listen(self):
+        """Blocking iterator over all published messages, from now on."""
+        raise NotImplementedError
+
+class BrokerEventBus(EventBus):
+    """
+    Events go through an external broker. One listener thread per process fans the broker's messages out to the
+    local subscribers. Event ids are assigned per process, so a reconnecting stream that lands on another process
+    starts afresh (and its database check catches up).
+    """
+    shared = True
+
+    def __init__(self, broker, history=100):
+        super().__init__(history)
+        self.broker = broker
+
+    def start(self):
+        threading.Thread(target=self.run, name="event-listener", daemon=True).start()
+
+    def publish(self, seminar_id, name, data=None):
+        self.ensure_started()
+        self.broker.publish(json.dumps({"seminar_id": seminar_id, "name": name, "data": data or {}}))
+
+    def run(self):
+        for message in self.broker.listen():
+            event = json.loads(message)
+            with self.condition:
+                self.deliver(self.last_id + 1, event["seminar_id"], event["name"], event["data"])
+
+bus = LocalEventBus()
+
+def init_app(app):
+    """Selects the event bus with EVENT_BUS: "local" (default), "database" or "broker" (see Broker)."""
+    global bus
+    backend = app.config.get("EVENT_BUS", "local")
+    if backend == "local":
+        bus = LocalEventBus()
+    elif backend == "database":
+        bus = DatabaseEventBus(app, app.config.get("EVENT_POLL_INTERVAL", 0.5))
+    elif backend == "broker":
+        bus = BrokerEventBus(import_string(app.config["EVENT_BROKER"])(app.config))
+    else:
+        raise ValueError(f"Unknown EVENT_BUS {backend}, use one of: local, database, broker")
+
+def publish_progress(student):
+    bus.publish(student.seminar_id, "progress", {
+        "id": student.id,
+        "joined": student.joined,
+        "current_slide": student.current_slide,
+        "motivation": student.motivation,
+        "preparation": student.preparation,
+        "score": student.score,
+        "reached_gf": student.reached_gf,
+    })
+
+def publish_gf_done(seminar_id):
+    bus.publish(seminar_id, "gf_done")
+
+def format_event(name, data, id=None):
+    message = f"event: {name}\ndata: {json.dumps(data)}\n\n"
+    if id is not None:
+        message = f"id: {id}\n" + message
+    return message
+
+def event_stream(seminar_id, check, change_event, names=None, initial=None, last_event_id=None):
+    """
+    Generator producing a Server-Sent Events stream for one seminar.
+    - check: callable doing a cheap database query; when its result changes, change_event is sent.
+      This catches changes that were not published on the bus (e.g. made in another worker process with the
+      local bus). A result that differs from initial already counts as a change on the first check.
+    - names: only forward published events with these names (None = all)
+    """
+    current_bus = bus
+    last_id = current_bus.current_id()
+    if last_event_id is not None and last_event_id.isdigit():
+        last_id = min(int(last_event_id), last_id)
+    check_interval = SHARED_CHECK_INTERVAL if current_bus.shared else CHECK_INTERVAL
+    previous = initial
+    delivered = False
+    deadline = time.monotonic() + STREAM_TIMEOUT
+    next_check = time.monotonic()
+    yield f"retry: {RETRY_MS}\n\n"
+    while True:
+        now = time.monotonic()
+        if now >= next_check:
+            signature = check()
+            # Changes we already delivered as events don't need to be signalled again
+            if previous is not None and signature != previous and not delivered:
+                yield format_event(change_event, {})
+            previous = signature
+            delivered = False
+            next_check = now + check_interval
+
+        remaining = deadline - now
+        if remaining <= 0:
+            return
+        events = current_bus.wait(seminar_id, last_id, min(next_check - now, remaining))
+        for id, name, data in events:
+            last_id = id
+            if names is None or name in names:
+                delivered = True
+                yield format_event(name, data, id)
+        if not events:
+            # Comment line, keeps proxies from closing the connection
+            yield ": keepalive\n\n"
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from interact import db
+from interact.models import Seminar, Student, Slide, Group
+
+# Rows are fetched from the database and sent to the client in chunks of this size
+CHUNK_SIZE = 500
+COLUMNS = ["seminar_id", "seminar", "student_id", "name", "joined", "current_slide", "nr_slides", "done",
+           "motivation", "preparation", "score", "reached_gf", "group"]
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+def export_chunks(user_id, seminar_id=None):
+    """
+    Generator yielding lists of at most CHUNK_SIZE student rows (dicts with COLUMNS) of a teacher's seminar,
+    or of all of the teacher's seminars. Streams the query result with yield_per, so memory use does not grow
+    with the number of students.
+    """
+    seminar_filter = [Seminar.user_id == user_id]
+    if seminar_id is not None:
+        seminar_filter.append(Seminar.id == seminar_id)
+    nr_slides = dict(db.session.execute(
+        db.select(Slide.seminar_id, db.func.count(Slide.id))
+        .join(Seminar, Slide.seminar_id == Seminar.id)
+        .where(*seminar_filter)
+        .group_by(Slide.seminar_id)
+    ).all())
+
+    result = db.session.execute(
+        db.select(Seminar.id, Seminar.name, Student.id, Student.name, Student.joined, Student.current_slide,
+                  Student.motivation, Student.preparation, Student.score, Student.reached_gf, Group.number)
+        .join(Student, Student.seminar_id == Seminar.id)
+        .outerjoin(Group, Student.group_id == Group.id)
+        .where(*seminar_filter)
+        .order_by(Seminar.id, Student.id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    for partition in result.partitions():
+        chunk = []
+        for (seminar_id, seminar_name, student_id, name, joined, current_slide, motivation, preparation, score,
+             reached_gf, group_number) in partition:
+            seminar_nr_slides = nr_slides.get(seminar_id, 0)
+            chunk.append({
+                "seminar_id": seminar_id,
+                "seminar": seminar_name,
+                "student_id": student_id,
+                "name": name,
+                "joined": bool(joined),
+                "current_slide": current_slide,
+                "nr_slides": seminar_nr_slides,
+                "done": (current_slide or 0) > seminar_nr_slides,
+                "motivation": motivation,
+                "preparation": preparation,
+                "score": score,
+                "reached_gf": bool(reached_gf),
+                "group": group_number,
+            })
+        yield chunk
+
+def export_csv(chunks):
+    """Generator yielding the CSV text: the header right away, then one piece per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+def export_jsonl(chunks):
+    """Generator yielding JSON Lines text, one piece per chunk of rows."""
+    for chunk in chunks:
+        yield "".join(json.dumps(row) + "\n" for row in chunk)
+
+def export(user_id, seminar_id=None, format="csv"):
+    chunks = export_chunks(user_id, seminar_id)
+    if format == "jsonl":
+        return export_jsonl(chunks)
+    return export_csv(chunks)
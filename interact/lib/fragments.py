@@ -0,0 +1,51 @@
+import hashlib
+import time
+from flask import render_template, request, session, current_app, make_response
+from markupsafe import Markup
+from interact.lib.cache import fragments
+
+# The body of a slide is the same for every student, so it is rendered once per (slide, deck version) and
+# injected into the page, which only adds the per-user parts (CSRF token, flashed messages).
+
+class Fragment():
+    def __init__(self, html):
+        self.html = Markup(html)
+        self.digest = hashlib.sha1(self.html.encode()).hexdigest()
+
+def get_fragment(template, deck, slide):
+    """The rendered slide, cached for the current deck version."""
+    def render():
+        return Fragment(render_template(template, slide=slide, nr_slides=deck.nr_slides))
+    return fragments.get((deck.seminar_id, deck.version, slide.id, template), render)
+
+def page_etag(fragment):
+    """
+    ETag of a page around the fragment, or None if the page has to be rendered anyway (flashed messages).
+    The CSRF token of the session is part of it, and the ETag changes halfway the token's time limit,
+    so a page served from the browser's cache never holds an expired token.
+    """
+    if session.get("_flashes"):
+        return None
+    parts = [fragment.digest]
+    if current_app.config.get("WTF_CSRF_ENABLED", True):
+        parts.append(session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"), ""))
+        time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+        if time_limit:
+            parts.append(str(int(time.time() // max(time_limit // 2, 1))))
+    return hashlib.sha1("/".join(parts).encode()).hexdigest()
+
+def not_modified(etag):
+    """A 304 response if the browser has the page with this ETag already, otherwise None."""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    return cached_for_revalidation(response, etag)
+
+def cached_for_revalidation(response, etag):
+    """Lets the browser keep the response, but only use it after checking its ETag with the server."""
+    response = make_response(response)
+    if etag is not None:
+        # Weak: the signed CSRF token in the page differs between renders, but any of them is valid
+        response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -1,12 +1,27 @@
 from random import shuffle
 from math import sqrt
+from interact.lib.metrics import timed
+
+# Default time budget (in milliseconds) of the refinement after dividing: off, so the methods give the same groups
+# as before the refinement existed, without the extra time (see GF_REFINE_MS)
+REFINE_MS = 0
+# What the refinement optimizes per method: (homogeneous groups?, attributes). Random groups are not refined.
+REFINE_TARGETS = {
+    1: (False, ["score"]), # mix-level
+    2: (True, ["score"]), # same-level
+    3: (True, ["motivation", "preparation", "score"]), # similarity grouping
+    4: (True, ["motivation", "preparation", "score"]), # balanced clustering
+    5: (False, ["motivation", "preparation", "score"]), # dissimilarity grouping
+}
 
 class GroupForming():
-    def __init__(self, nr_per_group, students, groups):
+    def __init__(self, nr_per_group, students, groups, refine_ms=REFINE_MS):
         self.nr_per_group = nr_per_group
         self.students = students
         self.groups = groups
+        self.refine_ms = refine_ms
 
+    @timed("GroupForming.divide")
     def divide(self, method):
         if method == 0:
             self.divide_random()
@@ -16,12 +31,20 @@ class GroupForming():
             self.divide_samelevel()
         elif method == 3:
             self.similarity_grouping()
+        elif method == 4:
+            self.balanced_clustering()
+        elif method == 5:
+            self.similarity_grouping(homogeneous=False)
 
+        if self.refine_ms > 0 and method in REFINE_TARGETS:
+            self.refine(*REFINE_TARGETS[method])
         self.put_students_in_groups()
 
+    @timed("GroupForming.divide_random")
     def divide_random(self):
         shuffle(self.students)
         
+    @timed("GroupForming.divide_mixlevel")
     def divide_mixlevel(self):
         sorted_students = sorted(self.students, key=lambda s: s.score)
         alternating_sorted = []
@@ -31,6 +54,7 @@ class GroupForming():
                 alternating_sorted.append(sorted_students.pop(0))
         self.students = alternating_sorted
 
+    @timed("GroupForming.divide_samelevel")
     def divide_samelevel(self):
         self.students.sort(key=lambda s: s.score)
 
@@ -45,66 +69,56 @@ class GroupForming():
         distance = sqrt(sum(squared_diffs))
         return -distance
 
+    @timed("GroupForming.similarity_grouping")
     def similarity_grouping(self, homogeneous=True):
         """
         Forms groups by similarity/dissimilarity.
         Original version made by Sietse Boonstra (RUG) for his Master's thesis.
+        The heavy lifting is done by the NumPy-backed SimilarityEngine (see interact/lib/similarity.py),
+        which gives the same groups in O(n^2) time and bounded memory.
         """
-        n = len(self.students)
-        sim = [[0 for _ in range(n)] for _ in range(n)]
-        for i in range(n):
-            for j in range(i+1, n):
-                s = self.pairwise_similarity(self.students[i], self.students[j])
-                sim[i][j] = s
-                sim[j][i] = s
-
-        unassigned = set(range(n))
+        features = [(s.motivation or 0, s.preparation or 0, s.score or 0) for s in self.students]
 
         # Make group sizes
+        n = len(self.students)
         n_full = n // self.nr_per_group
         remainder = n % self.nr_per_group
         sizes = [self.nr_per_group] * n_full
         if remainder > 0:
             sizes.append(remainder)
 
-        temp_student_list = []
-
-        for sz in sizes:
-            if not unassigned:
-                break
-            
-            # Make pairs from the yet unassigned students
-            pairs = [(i, j, sim[i][j]) for i in unassigned for j in unassigned if i < j]
-            if not pairs:
-                leftover = list(unassigned)
-                temp_student_list += [self.students[idx] for idx in leftover]
-                unassigned = set()
-                break
-            # Start with the pair with max/min similarity
-            i0, j0, _ = max(pairs, key=(lambda x: x[2]) if homogeneous else (lambda x: -x[2]))
-            group_idxs = {i0, j0}
-            unassigned.remove(i0)
-            unassigned.remove(j0)
-            # Add unassigned students with max/min similarity until group is full
-            while len(group_idxs) < sz and unassigned:
-                scores = []
-                for u in unassigned:
-                    values = [sim[u][g] for g in group_idxs]
-                    avg_sim = sum(values) / len(values)
-                    scores.append((u, avg_sim))
-                u_pick, _ = max(scores, key=(lambda x: x[1]) if homogeneous else (lambda x: -x[1]))
-                group_idxs.add(u_pick)
-                unassigned.remove(u_pick)
-
-            temp_student_list += [self.students[i] for i in group_idxs]
-
-        # Done. Add any remaining students
-        if unassigned:
-            temp_student_list += [self.students[i] for i in unassigned]
+        from interact.lib.similarity import SimilarityEngine # NumPy, only imported where groups are formed
+        order = SimilarityEngine(features, homogeneous).order(sizes)
         # Put the students, now in the right order, back into self.students.
         # put_students_in_groups() will take care of the division into groups (yes, there's some double work here).
-        self.students = temp_student_list
+        self.students = [self.students[i] for i in order]
+
+    @timed("GroupForming.balanced_clustering")
+    def balanced_clustering(self):
+        """
+        Forms groups of students with similar motivation, preparation and score, like similarity_grouping,
+        but by size-constrained k-means clustering (see interact/lib/clustering.py). Doesn't compare all pairs
+        of students, so it stays fast for cohorts of thousands of students.
+        """
+        features = [(s.motivation or 0, s.preparation or 0, s.score or 0) for s in self.students]
+        from interact.lib.clustering import BalancedClustering
+        order = BalancedClustering(features, self.nr_per_group).order()
+        self.students = [self.students[i] for i in order]
 
+    @timed("GroupForming.refine")
+    def refine(self, homogeneous, attributes):
+        """
+        Improves the groups (consecutive runs of nr_per_group students) by swapping students between groups,
+        for at most self.refine_ms milliseconds (see interact/lib/refinement.py).
+        """
+        features = [[getattr(s, attribute) or 0 for attribute in attributes] for s in self.students]
+        labels = [i // self.nr_per_group for i in range(len(self.students))]
+        from interact.lib.refinement import LocalSearch
+        labels = LocalSearch(features, labels, homogeneous).refine(self.refine_ms).tolist()
+        # Group sizes are unchanged, so sorting by group keeps the runs of nr_per_group students
+        self.students = [self.students[i] for i in sorted(range(len(self.students)), key=lambda i: labels[i])]
+
+    @timed("GroupForming.put_students_in_groups")
     def put_students_in_groups(self):
         group_index = 0
         student_index = 0
@@ -122,22 +136,90 @@ class GroupForming():
     def get_groups(self):
         return self.groups
     
-# Static helper function to activate Group Forming:
+# Static helper functions to activate Group Forming:
 
+from datetime import datetime, timedelta
+from flask import current_app
 from interact import db
-from interact.models import Student, Group
+from interact.models import Seminar, Student, Group
+from interact.lib.events import publish_gf_done
+from interact.lib.counters import count_reached_gf
+
+# Group forming states of a seminar (Seminar.gf_status)
+GF_PENDING = 0
+GF_RUNNING = 1
+GF_DONE = 2
+GF_FAILED = 3 # not retried automatically, only when the teacher forces group forming
+# A claim older than this (in seconds) is considered abandoned (e.g. the worker crashed) and can be taken over
+GF_CLAIM_TIMEOUT = 300
+
+def claim_group_forming(seminar_id, forced=False):
+    """
+    Atomically moves the seminar's group forming from pending (or, when forced by the teacher, failed) to running.
+    Returns True for exactly one caller; everybody else should wait for (or read) the stored result.
+    """
+    now = datetime.now()
+    claimable = db.or_(
+        Seminar.gf_status == GF_PENDING,
+        db.and_(Seminar.gf_status == GF_RUNNING, Seminar.gf_claimed_at < now - timedelta(seconds=GF_CLAIM_TIMEOUT)),
+    )
+    if forced:
+        claimable = db.or_(claimable, Seminar.gf_status == GF_FAILED)
+    result = db.session.execute(
+        db.update(Seminar)
+        .where(Seminar.id == seminar_id, claimable)
+        .values(gf_status=GF_RUNNING, gf_claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
 
+@timed("activate_group_forming")
 def activate_group_forming(seminar_id, gf_slide, forced=False):
-    students = Student.query.filter_by(seminar_id=seminar_id).all()
-    nr_groups = -(-len(students) // gf_slide.gf_nr_per_group) # rounded-up integer division
-    groups = [Group(seminar_id, n) for n in range(1, nr_groups+1)]
-    db.session.add_all(groups)
-    db.session.commit()
-    gf = GroupForming(gf_slide.gf_nr_per_group, students, groups)
-    gf.divide(gf_slide.gf_type)
-    students = gf.get_students()
-    if forced:
-        for student in students:
-            student.reached_gf = True
-    groups = gf.get_groups()
-    db.session.commit()
\ No newline at end of file
+    """
+    Forms the groups of a seminar in this process, exactly once. Returns False if group forming is already
+    running or done. See lib/jobs.py for running it in the background instead.
+    """
+    if not claim_group_forming(seminar_id, forced):
+        return False
+    form_groups(seminar_id, gf_slide, forced)
+    publish_gf_done(seminar_id)
+    return True
+
+@timed("form_groups")
+def form_groups(seminar_id, gf_slide, forced=False):
+    """
+    Divides the students of a seminar (claimed with claim_group_forming) into groups and commits the result.
+    On failure, the seminar goes to failed, until the teacher forces group forming. Returns the number of groups.
+    """
+    try:
+        # Remove leftovers of an abandoned run (unlink the students first, deleting a group cascades to its students)
+        Student.query.filter_by(seminar_id=seminar_id).update({"group_id": None}, synchronize_session=False)
+        Group.query.filter_by(seminar_id=seminar_id).delete(synchronize_session=False)
+        students = Student.query.filter_by(seminar_id=seminar_id).all()
+        nr_groups = -(-len(students) // gf_slide.gf_nr_per_group) # rounded-up integer division
+        groups = [Group(seminar_id, n) for n in range(1, nr_groups+1)]
+        db.session.add_all(groups)
+        db.session.flush() # assigns the group ids
+        gf = GroupForming(gf_slide.gf_nr_per_group, students, groups, current_app.config.get("GF_REFINE_MS", REFINE_MS))
+        gf.divide(gf_slide.gf_type)
+        students = gf.get_students()
+        if forced:
+            count_reached_gf(seminar_id, sum(1 for student in students if not student.reached_gf))
+            for student in students:
+                student.reached_gf = True
+        groups = gf.get_groups()
+        # Groups, assignments and the 'done' state are committed together
+        db.session.execute(
+            db.update(Seminar)
+            .where(Seminar.id == seminar_id)
+            .values(gf_status=GF_DONE)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        db.session.execute(db.update(Seminar).where(Seminar.id == seminar_id).values(gf_status=GF_FAILED))
+        db.session.commit()
+        raise
+    return len(groups)
@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from flask import current_app
+from interact import db
+from interact.models import Seminar, Slide, GroupFormingJob
+from interact.lib import events
+from interact.lib.events import publish_gf_done
+from interact.lib.metrics import collect_timings, stop_collecting_timings, record_timings
+from interact.lib.group_forming import claim_group_forming, form_groups, GF_FAILED
+
+# Job states (GroupFormingJob.status)
+JOB_QUEUED = 0
+JOB_RUNNING = 1
+JOB_DONE = 2
+JOB_FAILED = 3
+JOB_STATUS_NAMES = {JOB_QUEUED: "queued", JOB_RUNNING: "running", JOB_DONE: "done", JOB_FAILED: "failed"}
+
+# One pool per app and (worker) process, created on first use, so it is never inherited through a fork
+pool_lock = threading.Lock()
+# In a pool process: the app built from the configuration of the app that created the pool
+worker_app = None
+
+def nr_job_workers(app):
+    """
+    Size of the process pool, from GF_JOB_WORKERS (default: the number of CPUs).
+    0 runs group forming in the requesting process, which is also the only option for an in-memory database.
+    """
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+    if uri in ("sqlite://", "sqlite:///:memory:"):
+        return 0
+    workers = app.config.get("GF_JOB_WORKERS")
+    return (os.cpu_count() or 1) if workers is None else workers
+
+def get_pool(app, nr_workers):
+    with pool_lock:
+        pid, pool = app.extensions.get("group_forming_pool", (None, None))
+        if pool is None or pid != os.getpid():
+            # Spawned (not forked) processes, which build their own app with this app's configuration (database,
+            # GF_* settings); safe with gevent and open connections
+            pool = ProcessPoolExecutor(max_workers=nr_workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=init_worker, initargs=(dict(app.config),))
+            app.extensions["group_forming_pool"] = (os.getpid(), pool)
+        return pool
+
+def reset_pool(app):
+    """Forgets a broken pool, so the next job starts a new one."""
+    with pool_lock:
+        app.extensions.pop("group_forming_pool", None)
+
+def init_worker(config):
+    """Initializer of a pool process."""
+    global worker_app
+    from interact import create_app
+    worker_app = create_app(config)
+
+def submit_group_forming(seminar_id, gf_slide, forced=False):
+    """
+    Claims the group forming of a seminar and runs it as a background job in the process pool.
+    Returns the job, or None if group forming is already running or done, or failed and not forced.
+    """
+    if not claim_group_forming(seminar_id, forced):
+        return None
+    job = None
+    try:
+        job = GroupFormingJob(seminar_id=seminar_id, slide_id=gf_slide.id, forced=forced, status=JOB_QUEUED,
+                              created_at=datetime.now(),
+                              session_number=db.select(Seminar.session_number).where(Seminar.id == seminar_id).scalar_subquery())
+        db.session.add(job)
+        db.session.commit()
+        nr_workers = nr_job_workers(current_app)
+        if nr_workers == 0:
+            run_job(job.id)
+            return job
+        future = get_pool(current_app, nr_workers).submit(run_job_in_worker, job.id)
+    except Exception as e:
+        db.session.rollback()
+        if isinstance(e, BrokenProcessPool):
+            reset_pool(current_app)
+        if job is not None and job.id is not None:
+            db.session.execute(
+                db.update(GroupFormingJob)
+                .where(GroupFormingJob.id == job.id)
+                .values(status=JOB_FAILED, error=f"{type(e).__name__}: {e}"[:500], finished_at=datetime.now())
+            )
+        db.session.execute(db.update(Seminar).where(Seminar.id == seminar_id).values(gf_status=GF_FAILED))
+        db.session.commit()
+        raise
+
+    def job_finished(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        status, timings = future.result()
+        record_timings(timings)
+        # With the local event bus the worker's event does not reach this process' streams: publish it here.
+        # The other processes see the new status on their next check.
+        if status == JOB_DONE and not events.bus.shared:
+            publish_gf_done(seminar_id)
+    future.add_done_callback(job_finished)
+    return job
+
+def run_job(job_id):
+    """Runs a queued group forming job (in an app context) and stores its outcome. Returns the final status."""
+    job = db.session.get(GroupFormingJob, job_id)
+    job.status = JOB_RUNNING
+    job.started_at = datetime.now()
+    db.session.commit()
+    try:
+        gf_slide = db.session.get(Slide, job.slide_id)
+        nr_groups = form_groups(job.seminar_id, gf_slide, job.forced)
+    except Exception as e:
+        current_app.logger.exception(f"Group forming job {job_id} failed")
+        job = db.session.get(GroupFormingJob, job_id)
+        job.status = JOB_FAILED
+        job.error = f"{type(e).__name__}: {e}"[:500]
+    else:
+        job = db.session.get(GroupFormingJob, job_id)
+        job.status = JOB_DONE
+        job.nr_groups = nr_groups
+    job.finished_at = datetime.now()
+    db.session.commit()
+    if job.status == JOB_DONE:
+        publish_gf_done(job.seminar_id)
+    return job.status
+
+def run_job_in_worker(job_id):
+    """Entry point in a pool process. Returns the final status and the timed calls, for the submitting process."""
+    with worker_app.app_context():
+        timings = collect_timings()
+        try:
+            return run_job(job_id), timings
+        finally:
+            stop_collecting_timings()
+            db.session.remove()
+
+def latest_job(seminar):
+    """The latest job of the seminar's current session, or None."""
+    return (GroupFormingJob.query.filter_by(seminar_id=seminar.id, session_number=seminar.session_number)
+            .order_by(GroupFormingJob.id.desc()).first())
+
+def job_data(job):
+    """A job as plain (JSON-serializable) data, or None."""
+    if job is None:
+        return None
+    duration = None
+    if job.started_at is not None and job.finished_at is not None:
+        duration = (job.finished_at - job.started_at).total_seconds()
+    return {
+        "id": job.id,
+        "status": JOB_STATUS_NAMES[job.status],
+        "forced": job.forced,
+        "created_at": job.created_at.isoformat(),
+        "duration": duration,
+        "nr_groups": job.nr_groups,
+        "error": job.error,
+    }
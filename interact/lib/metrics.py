@@ -0,0 +1,154 @@
+import threading
+import time
+from functools import wraps
+from flask import request, g
+from sqlalchemy import event
+
+# Metrics are kept in memory per worker process and exposed in the Prometheus text format on /admin/metrics.
+
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200]
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}" if labels else ""
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Histogram():
+    def __init__(self, name, help, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {} # label values -> [bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, (bucket_counts, total, count) in sorted(self.series.items()):
+                labels = list(zip(self.label_names, label_values))
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{format_labels(labels + [('le', format_value(bound))])} {bucket_count}")
+                lines.append(f"{self.name}_bucket{format_labels(labels + [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+class Gauge():
+    def __init__(self, name, help, label_names):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def add(self, delta, *label_values):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + delta
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(list(zip(self.label_names, label_values)))} {format_value(value)}")
+        return lines
+
+request_duration = Histogram("interact_request_duration_seconds", "Request duration per endpoint.",
+                             ["endpoint", "method", "status"])
+request_sql_statements = Histogram("interact_request_sql_statements", "SQL statements executed per request.",
+                                   ["endpoint"], COUNT_BUCKETS)
+request_sql_duration = Histogram("interact_request_sql_duration_seconds", "Time spent in SQL per request.", ["endpoint"])
+requests_in_flight = Gauge("interact_requests_in_flight", "Requests being handled right now.", ["endpoint"])
+function_duration = Histogram("interact_function_duration_seconds", "Duration of instrumented functions.", ["function"])
+METRICS = [request_duration, request_sql_statements, request_sql_duration, requests_in_flight, function_duration]
+
+def render_metrics():
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+# Timed calls in a pool process are not seen by /admin/metrics: the job collects them here and sends them back to the
+# process that submitted it, which records them (see lib/jobs.py)
+collected = threading.local()
+
+def timed(name):
+    """Decorator that records the duration of each call in interact_function_duration_seconds."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                function_duration.observe(duration, name)
+                if getattr(collected, "timings", None) is not None:
+                    collected.timings.append((name, duration))
+        return decorated_function
+    return decorator
+
+def collect_timings():
+    """Starts collecting the timed calls of this thread, as (name, seconds) pairs in the returned list."""
+    collected.timings = []
+    return collected.timings
+
+def stop_collecting_timings():
+    collected.timings = None
+
+def record_timings(timings):
+    """Records timed calls collected in another process."""
+    for name, duration in timings:
+        function_duration.observe(duration, name)
+
+# SQL statements of the current request (threading.local is per greenlet under gevent)
+sql = threading.local()
+
+def init_app(app, engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if getattr(sql, "statements", None) is not None:
+            sql.statements += 1
+            sql.duration += time.perf_counter() - getattr(context, "_metrics_start", time.perf_counter())
+
+    @app.before_request
+    def start_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_endpoint = request.endpoint or "unknown"
+        sql.statements = 0
+        sql.duration = 0.0
+        requests_in_flight.add(1, g.metrics_endpoint)
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def end_request(exception):
+        # Runs after a streamed response has been sent completely
+        if "metrics_start" not in g:
+            return
+        endpoint = g.pop("metrics_endpoint")
+        status = 500 if exception is not None else g.pop("metrics_status", 500)
+        request_duration.observe(time.perf_counter() - g.pop("metrics_start"), endpoint, request.method, status)
+        request_sql_statements.observe(sql.statements, endpoint)
+        request_sql_duration.observe(sql.duration, endpoint)
+        requests_in_flight.add(-1, endpoint)
+        sql.statements = None
@@ -0,0 +1,36 @@
+from interact import db
+from interact.models import Student
+from interact.lib.counters import count_advance, count_reached_gf
+
+# Student progress is changed with conditional UPDATEs, like claiming a student (see lib/admission.py): a
+# double-submitted form or two concurrent requests of the same student change the row, and count, only once.
+# The student object is synchronised with the new values (RETURNING, no extra query).
+
+def advance_student(student, from_slide, points=0):
+    """
+    Moves the student from from_slide to the next slide, adding points to the score, and counts it, in the caller's
+    transaction. Returns False if the student was no longer at from_slide (the request was handled already).
+    """
+    result = db.session.execute(
+        db.update(Student)
+        .where(Student.id == student.id, Student.current_slide == from_slide)
+        .values(current_slide=Student.current_slide + 1, score=db.func.coalesce(Student.score, 0) + points)
+        .execution_options(synchronize_session="fetch")
+    )
+    if result.rowcount != 1:
+        return False
+    count_advance(student.seminar_id, from_slide)
+    return True
+
+def reach_gf(student):
+    """Marks that the student reached the group forming slide and counts it; False if that was done already."""
+    result = db.session.execute(
+        db.update(Student)
+        .where(Student.id == student.id, Student.reached_gf == False)
+        .values(reached_gf=True)
+        .execution_options(synchronize_session="fetch")
+    )
+    if result.rowcount != 1:
+        return False
+    count_reached_gf(student.seminar_id)
+    return True
@@ -0,0 +1,74 @@
+import random
+import time
+import numpy as np
+
+# Swaps that change the objective by less than this are not worth it (and avoid cycling on rounding noise)
+MIN_GAIN = 1e-9
+
+class LocalSearch():
+    """
+    Anytime improvement of a division into groups by swapping students between groups.
+    The objective is the within-group sum of squared deviations of the features: minimised for homogeneous
+    groups, maximised for heterogeneous groups. Swaps keep the group sizes. With S the feature sums of a
+    group of n students, that sum is a constant minus |S|^2 / n, so the effect of swapping a (group A) and
+    b (group B) follows from S_A, S_B and d = x_b - x_a alone:
+        delta = -(2 S_A.d + |d|^2) / n_A - (-2 S_B.d + |d|^2) / n_B
+    which is evaluated for all candidates b at once, instead of rescoring whole groups.
+    """
+    def __init__(self, features, labels, homogeneous=True, seed=0):
+        self.features = np.asarray(features, dtype=np.float64).reshape(len(labels), -1)
+        self.labels = np.asarray(labels, dtype=np.int64).copy()
+        self.sign = 1.0 if homogeneous else -1.0 # so that a negative signed delta is always an improvement
+        self.nr_groups = int(self.labels.max()) + 1 if len(self.labels) else 0
+        self.sizes = np.bincount(self.labels, minlength=self.nr_groups).astype(np.float64)
+        self.sums = np.zeros((self.nr_groups, self.features.shape[1]))
+        np.add.at(self.sums, self.labels, self.features)
+        self.rng = random.Random(seed)
+        self.nr_swaps = 0
+
+    def objective(self):
+        """Within-group sum of squared deviations."""
+        return float((self.features ** 2).sum() - ((self.sums ** 2).sum(axis=1) / np.maximum(self.sizes, 1)).sum())
+
+    def best_swap(self, a):
+        """The partner b for which swapping with a improves the objective most, or None."""
+        group_a = self.labels[a]
+        d = self.features - self.features[a]
+        d2 = (d * d).sum(axis=1)
+        sums_b = self.sums[self.labels]
+        delta = -(2 * d @ self.sums[group_a] + d2) / self.sizes[group_a] \
+                - (-2 * (sums_b * d).sum(axis=1) + d2) / self.sizes[self.labels]
+        delta *= self.sign
+        delta[self.labels == group_a] = 0
+        b = int(np.argmin(delta))
+        return b if delta[b] < -MIN_GAIN else None
+
+    def swap(self, a, b):
+        group_a, group_b = self.labels[a], self.labels[b]
+        d = self.features[b] - self.features[a]
+        self.sums[group_a] += d
+        self.sums[group_b] -= d
+        self.labels[a], self.labels[b] = group_b, group_a
+        self.nr_swaps += 1
+
+    def refine(self, budget_ms):
+        """
+        Swaps students until no swap improves the objective (a local optimum) or budget_ms milliseconds have
+        passed, whichever comes first. Returns the new labels.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        if self.nr_groups < 2:
+            return self.labels
+        students = list(range(len(self.labels)))
+        improved = True
+        while improved:
+            improved = False
+            self.rng.shuffle(students)
+            for a in students:
+                if time.perf_counter() >= deadline:
+                    return self.labels
+                b = self.best_swap(a)
+                if b is not None:
+                    self.swap(a, b)
+                    improved = True
+        return self.labels
@@ -0,0 +1,144 @@
+import atexit
+import os
+import threading
+import weakref
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from werkzeug.local import LocalProxy
+from interact import db
+from interact.models import Seminar, Student, Response
+
+class ResponseBuffer():
+    """
+    Write-behind buffer for student responses. Requests only append to an in-memory list; a background thread
+    writes the buffered responses with one multi-row insert and one commit, as soon as max_size responses are
+    waiting or after max_delay seconds. The buffer is drained when the worker process exits.
+    Every process has its own buffer, so ending a session (lib/sessions.py) can only flush the one of its own
+    process: responses of the ended session that are written afterwards by another process are dropped, rather than
+    attached to the students of the new session.
+    """
+    def __init__(self, app, max_size=200, max_delay=1.0):
+        self.app = app
+        self.max_size = app.config.get("RESPONSE_BUFFER_SIZE", max_size)
+        self.max_delay = app.config.get("RESPONSE_BUFFER_DELAY", max_delay)
+        self.pid = None
+
+    def start(self):
+        """(Re)starts the flusher thread; also after a fork, as threads do not survive it."""
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.rows = []
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name="response-buffer", daemon=True)
+        self.thread.start()
+
+    def add(self, student_id, slide_id, answer_id, correct, session_number):
+        """Buffers a response given in session session_number of the student's seminar."""
+        if self.pid != os.getpid():
+            self.start()
+        with self.lock:
+            self.rows.append({
+                "session_number": session_number,
+                "student_id": student_id,
+                "slide_id": slide_id,
+                "answer_id": answer_id,
+                "correct": correct,
+                "created_at": datetime.now(),
+            })
+            if len(self.rows) >= self.max_size:
+                self.wakeup.set()
+
+    def run(self):
+        while not self.stopped:
+            self.wakeup.wait(self.max_delay)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered responses. Returns the number of responses written."""
+        if self.pid != os.getpid():
+            return 0
+        with self.lock:
+            rows, self.rows = self.rows, []
+        if not rows:
+            return 0
+        with self.app.app_context():
+            try:
+                rows = self.in_current_session(rows)
+                if rows:
+                    db.session.execute(db.insert(Response), [response_values(row) for row in rows])
+                db.session.commit()
+            except OperationalError:
+                # E.g. the database is locked: keep the responses for the next flush
+                db.session.rollback()
+                with self.lock:
+                    self.rows[:0] = rows
+                self.app.logger.warning(f"Could not write {len(rows)} responses, will retry", exc_info=True)
+                return 0
+            except Exception:
+                # E.g. a response of a student deleted meanwhile: write the others one by one
+                db.session.rollback()
+                return self.write_one_by_one(rows)
+            finally:
+                db.session.remove()
+        return len(rows)
+
+    def in_current_session(self, rows):
+        """The rows whose seminar is still in the session they were given in (one query)."""
+        current = dict(db.session.execute(
+            db.select(Student.id, Seminar.session_number)
+            .join(Seminar, Student.seminar_id == Seminar.id)
+            .where(Student.id.in_({row["student_id"] for row in rows}))
+        ).all())
+        live = [row for row in rows if current.get(row["student_id"]) == row["session_number"]]
+        if len(live) < len(rows):
+            self.app.logger.info(f"Dropped {len(rows) - len(live)} responses of an ended session")
+        return live
+
+    def write_one_by_one(self, rows):
+        """Writes the rows of a failed batch separately, dropping only the ones that fail. Returns the number written."""
+        nr_written = 0
+        for i, row in enumerate(rows):
+            try:
+                db.session.execute(db.insert(Response).values(**response_values(row)))
+                db.session.commit()
+                nr_written += 1
+            except OperationalError:
+                db.session.rollback()
+                with self.lock:
+                    self.rows[:0] = rows[i:]
+                self.app.logger.warning(f"Could not write {len(rows) - i} responses, will retry", exc_info=True)
+                break
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception(f"Dropped a response that could not be written: {row}")
+        return nr_written
+
+    def drain(self):
+        """Stops the flusher thread and writes what is left (called on worker shutdown)."""
+        if self.pid != os.getpid():
+            return
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join(timeout=5)
+        self.flush()
+
+def response_values(row):
+    return {name: value for name, value in row.items() if name != "session_number"}
+
+# One buffer per app, in app.extensions; the buffers of all apps in this process are drained by one exit handler
+buffers = weakref.WeakSet()
+
+@atexit.register
+def drain_buffers():
+    for buffer in list(buffers):
+        buffer.drain()
+
+def init_app(app):
+    buffer = app.extensions["response_buffer"] = ResponseBuffer(app)
+    buffers.add(buffer)
+
+# The buffer of the current app
+response_buffer = LocalProxy(lambda: current_app.extensions["response_buffer"])
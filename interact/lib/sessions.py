@@ -0,0 +1,111 @@
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from interact import db
+from interact.models import (Student, Group, Slide, Answer, Response, SeminarSession, ArchivedStudent,
+                             ArchivedResponse)
+from interact.lib.counters import get_counters, recompute_counters
+from interact.lib.responses import response_buffer
+
+# Old archives are deleted in batches of this many rows, one commit per batch, so the database is never locked long
+PURGE_BATCH_SIZE = 1000
+purge_lock = threading.Lock()
+
+def end_session(seminar):
+    """
+    Archives the live session of a seminar and starts a new one, in one transaction: the results of the joined
+    students and their answers are copied to the archive tables with INSERT ... SELECT, then the groups and answers
+    are deleted and the enrolled students are reset with single bulk statements. Returns the archived session.
+    """
+    # Answers still waiting in this process are archived with the session. Those waiting in other worker processes
+    # (at most RESPONSE_BUFFER_DELAY seconds old) are dropped when they are written, see lib/responses.py
+    response_buffer.flush()
+
+    archived = SeminarSession(seminar_id=seminar.id, number=seminar.session_number, started_at=seminar.session_started_at,
+                              ended_at=datetime.now(), nr_students=get_counters(seminar.id).nr_joined)
+    db.session.add(archived)
+    db.session.flush()
+
+    db.session.execute(db.insert(ArchivedStudent).from_select(
+        ["session_id", "name", "score", "motivation", "preparation", "current_slide", "reached_gf", "group_number"],
+        db.select(db.literal(archived.id), Student.name, Student.score, Student.motivation, Student.preparation,
+                  Student.current_slide, Student.reached_gf, Group.number)
+        .outerjoin(Group, Student.group_id == Group.id)
+        .where(Student.seminar_id == seminar.id, Student.joined == True)
+    ))
+    db.session.execute(db.insert(ArchivedResponse).from_select(
+        ["session_id", "student_name", "slide_order", "answer", "correct", "created_at"],
+        db.select(db.literal(archived.id), Student.name, Slide.slide_order, Answer.text, Response.correct, Response.created_at)
+        .select_from(Response)
+        .join(Student, Response.student_id == Student.id)
+        .join(Slide, Response.slide_id == Slide.id)
+        .outerjoin(Answer, Response.answer_id == Answer.id)
+        .where(Student.seminar_id == seminar.id)
+    ))
+
+    seminar_students = db.select(Student.id).where(Student.seminar_id == seminar.id)
+    db.session.execute(db.delete(Response).where(Response.student_id.in_(seminar_students)))
+    db.session.execute(
+        db.update(Student)
+        .where(Student.seminar_id == seminar.id)
+        .values(joined=False, current_slide=0, score=0, motivation=0, preparation=0, reached_gf=False, group_id=None)
+    )
+    db.session.execute(db.delete(Group).where(Group.seminar_id == seminar.id))
+
+    seminar.session_number += 1
+    seminar.session_started_at = datetime.now() if seminar.active else None
+    seminar.gf_status = 0
+    seminar.gf_claimed_at = None
+    recompute_counters(seminar.id)
+    db.session.commit()
+    return archived
+
+def purge_archives(retention_days):
+    """Deletes archived sessions that ended more than retention_days ago. Returns the number of sessions deleted."""
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    expired = db.select(SeminarSession.id).where(SeminarSession.ended_at < cutoff)
+    delete_in_batches(ArchivedResponse, ArchivedResponse.session_id.in_(expired))
+    delete_in_batches(ArchivedStudent, ArchivedStudent.session_id.in_(expired))
+    return delete_in_batches(SeminarSession, SeminarSession.ended_at < cutoff)
+
+def delete_in_batches(model, condition):
+    nr_deleted = 0
+    while ids := db.session.scalars(db.select(model.id).where(condition).limit(PURGE_BATCH_SIZE)).all():
+        db.session.execute(db.delete(model).where(model.id.in_(ids)))
+        db.session.commit()
+        nr_deleted += len(ids)
+    return nr_deleted
+
+def purge_archives_in_background():
+    """Runs purge_archives in a background thread, if ARCHIVE_RETENTION_DAYS is set and no purge is running yet."""
+    retention_days = current_app.config.get("ARCHIVE_RETENTION_DAYS")
+    if not retention_days:
+        return
+    app = current_app._get_current_object()
+
+    def run():
+        if not purge_lock.acquire(blocking=False):
+            return
+        try:
+            with app.app_context():
+                nr_deleted = purge_archives(retention_days)
+                if nr_deleted > 0:
+                    app.logger.info(f"Purged {nr_deleted} archived session(s) older than {retention_days} days")
+        except Exception:
+            app.logger.exception("Purging archived sessions failed")
+        finally:
+            purge_lock.release()
+
+    threading.Thread(target=run, name="purge-archives", daemon=True).start()
+
+@click.command("purge-archives")
+@click.option("--days", type=int, default=None, help="Retention in days (default: ARCHIVE_RETENTION_DAYS)")
+@with_appcontext
+def purge_archives_command(days):
+    """Delete archived seminar sessions older than the retention period."""
+    days = days or current_app.config.get("ARCHIVE_RETENTION_DAYS")
+    if not days:
+        raise click.UsageError("No retention period: pass --days or set ARCHIVE_RETENTION_DAYS")
+    click.echo(f"Purged {purge_archives(days)} archived session(s)")
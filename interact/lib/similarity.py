@@ -0,0 +1,152 @@
+import numpy as np
+
+# Upper bound (in bytes) for one block of the pairwise distance computation.
+# The full n x n matrix is never materialised, so memory stays bounded for large cohorts.
+BLOCK_BYTES = 32 * 1024 * 1024
+# Number of stale rows that are refreshed at once when picking the next pair
+REFRESH_BATCH = 64
+
+def neumaier_add(sums, x):
+    """
+    Elementwise compensated addition of x to the running (sum, compensation) pair.
+    This is the same summation that Python's built-in sum() uses for floats (3.12+), which the original
+    algorithm relied on, so averages that are mathematically equal also compare as equal here.
+    """
+    total, comp = sums
+    t = total + x
+    comp = comp + np.where(np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total)
+    return t, comp
+
+class SimilarityEngine():
+    """
+    NumPy-backed version of GroupForming.similarity_grouping.
+    Produces exactly the same student order as the original list-based algorithm:
+    - start every group with the unassigned pair of max (or min) similarity, lowest index pair first on ties;
+    - keep adding the unassigned student with the max (or min) average similarity to the group, lowest index first.
+    Instead of rebuilding all pairs per group, every row keeps its best partner among the unassigned higher
+    indices, which is only refreshed (lazily) after that partner got assigned. The average similarity to the
+    group is kept as a running (compensated) sum per candidate that is updated when a member joins.
+    """
+    def __init__(self, features, homogeneous=True, block_bytes=BLOCK_BYTES):
+        self.features = np.asarray(features, dtype=np.float64).reshape(-1, 3)
+        self.features32 = self.features.astype(np.float32)
+        self.n = len(self.features)
+        # Sign so that the best pair is always the one with the lowest key
+        self.sign = np.float32(1.0 if homogeneous else -1.0)
+        self.homogeneous = homogeneous
+        self.block_rows = max(1, block_bytes // (4 * max(self.n, 1) * 2))
+        self.unassigned = np.ones(self.n, dtype=bool)
+        self.partner = np.full(self.n, -1, dtype=np.int64)
+        self.best = np.full(self.n, np.inf, dtype=np.float32)
+        self.stale = np.zeros(self.n, dtype=bool)
+        self.refresh_rows(np.arange(self.n))
+
+    def squared_distances(self, rows, cols):
+        """Squared distances (float32) between the given rows and columns, shape (len(rows), len(cols))."""
+        x = self.features32
+        d2 = np.zeros((len(rows), len(cols)), dtype=np.float32)
+        for c in range(x.shape[1]):
+            diff = x[rows, c][:, None] - x[cols, c][None, :]
+            d2 += diff * diff
+        return d2
+
+    def refresh_rows(self, rows):
+        """(Re)compute the best unassigned partner j > i for every row i in rows, block by block."""
+        for start in range(0, len(rows), self.block_rows):
+            block = rows[start:start + self.block_rows]
+            # Only unassigned students with a higher index can be a partner
+            cols = np.flatnonzero(self.unassigned)
+            cols = cols[cols > block[0]]
+            if len(cols) == 0:
+                self.partner[block] = -1
+                self.best[block] = np.inf
+                self.stale[block] = False
+                continue
+            keys = self.squared_distances(block, cols) * self.sign
+            keys[cols[None, :] <= block[:, None]] = np.inf
+            best_cols = np.argmin(keys, axis=1)
+            best_keys = keys[np.arange(len(block)), best_cols]
+            self.partner[block] = np.where(np.isfinite(best_keys), cols[best_cols], -1)
+            self.best[block] = best_keys
+            self.stale[block] = False
+
+    def similarities_to(self, i):
+        """Similarity (negative euclidean distance) of every student to student i, in float64."""
+        diff = self.features - self.features[i]
+        return -np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def add_member(self, sums, summed, group_idxs, rows, u):
+        """
+        Updates the running similarity sums for a new group member.
+        The sums are kept in the iteration order of the group set, like the original algorithm, so rounding
+        (and therefore tie-breaking) is identical. Only when the set order changes the sums are folded again.
+        """
+        new_order = list(group_idxs)
+        if new_order[:-1] == summed and new_order[-1] == u:
+            summed.append(u)
+            return neumaier_add(sums, rows[u])
+        summed[:] = new_order
+        return self.fold(new_order, rows)
+
+    def fold(self, idxs, rows):
+        sums = (np.zeros(self.n), np.zeros(self.n))
+        for i in idxs:
+            sums = neumaier_add(sums, rows[i])
+        return sums
+
+    def pick_pair(self):
+        """
+        Returns the (i, j) pair with the best key, lowest i (and j) first on ties, or None if no pair is left.
+        Keys of stale rows are lower bounds of their real keys (assigning students can only make a row's best
+        partner worse), so a stale row only needs to be refreshed once it is at the top.
+        """
+        while True:
+            candidates = np.where(self.unassigned & (self.partner >= 0), self.best, np.inf)
+            i0 = int(np.argmin(candidates))
+            if not np.isfinite(candidates[i0]):
+                return None
+            if not self.stale[i0]:
+                return i0, int(self.partner[i0])
+            stale_keys = np.where(self.stale, candidates, np.inf)
+            nr_rows = min(REFRESH_BATCH, int(np.count_nonzero(np.isfinite(stale_keys))))
+            rows = np.sort(np.argpartition(stale_keys, nr_rows - 1)[:nr_rows])
+            self.refresh_rows(rows)
+
+    def assign(self, idxs):
+        idxs = np.fromiter(idxs, dtype=np.int64)
+        self.unassigned[idxs] = False
+        self.stale |= self.unassigned & np.isin(self.partner, idxs)
+
+    def order(self, sizes):
+        """Returns the student indices in group order, for the given list of group sizes."""
+        order = []
+        for sz in sizes:
+            if not self.unassigned.any():
+                break
+            pair = self.pick_pair()
+            if pair is None:
+                # Only one student left
+                break
+            i0, j0 = pair
+            # A set, so the order within the group is the same as in the original algorithm
+            group_idxs = {i0, j0}
+            self.unassigned[[i0, j0]] = False
+            rows = {i: self.similarities_to(i) for i in group_idxs}
+            summed = list(group_idxs)
+            sums = self.fold(summed, rows)
+            while len(group_idxs) < sz and self.unassigned.any():
+                avg = (sums[0] + sums[1]) / len(group_idxs)
+                if self.homogeneous:
+                    u_pick = int(np.argmax(np.where(self.unassigned, avg, -np.inf)))
+                else:
+                    u_pick = int(np.argmin(np.where(self.unassigned, avg, np.inf)))
+                group_idxs.add(u_pick)
+                self.unassigned[u_pick] = False
+                rows[u_pick] = self.similarities_to(u_pick)
+                sums = self.add_member(sums, summed, group_idxs, rows, u_pick)
+            self.assign(group_idxs)
+            order += list(group_idxs)
+
+        # Add any remaining students
+        order += np.flatnonzero(self.unassigned).tolist()
+        return order
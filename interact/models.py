@@ -22,6 +22,11 @@ class Seminar(db.Model):
     name = db.Column(db.String(50), nullable=False)
     active = db.Column(db.Boolean, default=False)
     nr_students = db.Column(db.Integer)
+    gf_status = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0")) # 0 = pending, 1 = running, 2 = done, 3 = failed
+    gf_claimed_at = db.Column(db.DateTime, nullable=True) # when group forming was claimed by a worker
+    deck_version = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0")) # bumped whenever slides or answers change
+    session_number = db.Column(db.Integer, nullable=False, default=1, server_default=db.text("1")) # number of the current (live) session
+    session_started_at = db.Column(db.DateTime, nullable=True) # when the current session was first opened
     students = db.relationship("Student", back_populates="seminar", cascade="all, delete-orphan", passive_deletes=True)
     slides = db.relationship("Slide", back_populates="seminar", order_by="Slide.slide_order", cascade="all, delete-orphan", passive_deletes=True)
     groups = db.relationship("Group", back_populates="seminar", cascade="all, delete-orphan", passive_deletes=True)
@@ -39,6 +44,9 @@ class Seminar(db.Model):
             ondelete='CASCADE',
             name='fk_seminar_user'
         ),
+        db.Index('uq_seminar_code', 'code', unique=True),
+        db.Index('ix_seminar_active_code', 'active', 'code'), # the active codes (lib/cache.py)
+        db.Index('ix_seminar_user_id', 'user_id'),
     )
 
 class Student(db.Model):
@@ -66,6 +74,10 @@ class Student(db.Model):
             ondelete='CASCADE',
             name='fk_student_group'
         ),
+        db.Index('ix_student_seminar_joined', 'seminar_id', 'joined'),
+        db.Index('ix_student_seminar_reached_gf', 'seminar_id', 'reached_gf'),
+        db.Index('ix_student_seminar_name', 'seminar_id', 'name'), # enrollment checks for duplicate names
+        db.Index('ix_student_group_id', 'group_id'),
     )
 
     def __init__(self, name, seminar_id):
@@ -86,6 +98,7 @@ class Group(db.Model):
             ondelete='CASCADE',
             name='fk_group_seminar'
         ),
+        db.Index('ix_group_seminar_id', 'seminar_id'),
     )
 
     def __init__(self, seminar_id, number):
@@ -101,7 +114,7 @@ class Slide(db.Model):
     seminar_id = db.Column(db.Integer)
     seminar = db.relationship("Seminar", back_populates="slides")
     answers = db.relationship("Answer", back_populates="slide", cascade="all, delete-orphan", passive_deletes=True)
-    gf_type = db.Column(db.Integer, nullable=True) # 0 = random, 1 = mix-level, 2 = same-level, 3 = similarity grouping
+    gf_type = db.Column(db.Integer, nullable=True) # 0 = random, 1 = mix-level, 2 = same-level, 3 = similarity grouping, 4 = balanced clustering, 5 = dissimilarity grouping
     gf_nr_per_group = db.Column(db.Integer, nullable=True)
 
     __table_args__ = (
@@ -110,6 +123,7 @@ class Slide(db.Model):
             ondelete='CASCADE',
             name='fk_slide_seminar'
         ),
+        db.Index('ix_slide_seminar_order', 'seminar_id', 'slide_order'),
     )
 
     def __init__(self, type, title, slide_order, seminar_id, text=None):
@@ -132,9 +146,174 @@ class Answer(db.Model):
             ondelete='CASCADE',
             name='fk_answer_slide'
         ),
+        db.Index('ix_answer_slide_id', 'slide_id'),
     )
 
     def __init__(self, text, correct, slide_id):
         self.text = text
         self.correct = correct
-        self.slide_id = slide_id
\ No newline at end of file
+        self.slide_id = slide_id
+
+class Response(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    slide_id = db.Column(db.Integer, nullable=False)
+    answer_id = db.Column(db.Integer, nullable=True)
+    correct = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['student_id'], ['student.id'],
+            ondelete='CASCADE',
+            name='fk_response_student'
+        ),
+        db.ForeignKeyConstraint(
+            ['slide_id'], ['slide.id'],
+            ondelete='CASCADE',
+            name='fk_response_slide'
+        ),
+        db.ForeignKeyConstraint(
+            ['answer_id'], ['answer.id'],
+            ondelete='SET NULL',
+            name='fk_response_answer'
+        ),
+        db.Index('ix_response_student_id', 'student_id'),
+        db.Index('ix_response_slide_id', 'slide_id'),
+        db.Index('ix_response_answer_id', 'answer_id'),
+    )
+
+# Progress counters of a seminar, kept up to date on join, slide advance and group forming arrival (see lib/counters.py)
+class SeminarCounters(db.Model):
+    seminar_id = db.Column(db.Integer, primary_key=True)
+    nr_enrolled = db.Column(db.Integer, nullable=False, default=0)
+    nr_joined = db.Column(db.Integer, nullable=False, default=0)
+    nr_reached_gf = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['seminar_id'], ['seminar.id'],
+            ondelete='CASCADE',
+            name='fk_seminar_counters_seminar'
+        ),
+    )
+
+# Number of joined students of a seminar that are currently at a slide
+class SlideCounter(db.Model):
+    seminar_id = db.Column(db.Integer, primary_key=True)
+    slide_order = db.Column(db.Integer, primary_key=True)
+    nr_students = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['seminar_id'], ['seminar.id'],
+            ondelete='CASCADE',
+            name='fk_slide_counter_seminar'
+        ),
+    )
+
+# A group forming run of a seminar, executed by the job runner (see lib/jobs.py)
+class GroupFormingJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    seminar_id = db.Column(db.Integer, nullable=False)
+    slide_id = db.Column(db.Integer, nullable=False) # the group forming slide
+    session_number = db.Column(db.Integer, nullable=False, default=1, server_default=db.text("1")) # session of the seminar
+    forced = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.Integer, nullable=False, default=0) # 0 = queued, 1 = running, 2 = done, 3 = failed
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    nr_groups = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.String(500), nullable=True)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['seminar_id'], ['seminar.id'],
+            ondelete='CASCADE',
+            name='fk_group_forming_job_seminar'
+        ),
+        db.ForeignKeyConstraint(
+            ['slide_id'], ['slide.id'],
+            ondelete='CASCADE',
+            name='fk_group_forming_job_slide'
+        ),
+        db.Index('ix_group_forming_job_seminar_id', 'seminar_id'),
+        db.Index('ix_group_forming_job_slide_id', 'slide_id'),
+    )
+
+# A finished session of a seminar; its results live in the archive tables below, not in Student/Group/Response
+class SeminarSession(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    seminar_id = db.Column(db.Integer, nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    nr_students = db.Column(db.Integer, nullable=False, default=0) # number of joined students
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['seminar_id'], ['seminar.id'],
+            ondelete='CASCADE',
+            name='fk_seminar_session_seminar'
+        ),
+        db.Index('ix_seminar_session_seminar_id', 'seminar_id'),
+    )
+
+# Results of a joined student in a finished session (names and numbers only, no links to live rows)
+class ArchivedStudent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    score = db.Column(db.Integer)
+    motivation = db.Column(db.Integer)
+    preparation = db.Column(db.Integer)
+    current_slide = db.Column(db.Integer)
+    reached_gf = db.Column(db.Boolean)
+    group_number = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['session_id'], ['seminar_session.id'],
+            ondelete='CASCADE',
+            name='fk_archived_student_session'
+        ),
+        db.Index('ix_archived_student_session_name', 'session_id', 'name'),
+    )
+
+# An answer given in a finished session
+class ArchivedResponse(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False)
+    student_name = db.Column(db.String(50), nullable=False)
+    slide_order = db.Column(db.Integer)
+    answer = db.Column(db.String(100)) # answer text, None if no valid answer was given
+    correct = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['session_id'], ['seminar_session.id'],
+            ondelete='CASCADE',
+            name='fk_archived_response_session'
+        ),
+        db.Index('ix_archived_response_session_id', 'session_id'),
+    )
+
+# A seminar event (student progress, groups formed) as published by any worker process, for the database event bus
+# (see lib/events.py). Rows are only kept for a few minutes.
+class SeminarEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    seminar_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.Text, nullable=False) # JSON
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ['seminar_id'], ['seminar.id'],
+            ondelete='CASCADE',
+            name='fk_seminar_event_seminar'
+        ),
+        db.Index('ix_seminar_event_created_at', 'created_at'),
+        {'sqlite_autoincrement': True}, # ids never go back, not even when all rows have been purged
+    )
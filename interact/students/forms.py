@@ -6,7 +6,9 @@ class JoinForm(FlaskForm):
     submit = SubmitField("Join")
 
 class JoinWithNameForm(FlaskForm):
-    name = SelectField("Choose your name from the list")
+    # The choices are a (cached) selection of the unclaimed students; whether the chosen one is still free is
+    # decided by the atomic claim, not by the form
+    name = SelectField("Choose your name from the list", coerce=int, validate_choice=False)
     motivation = IntegerField("How motivated are you, on a scale from 0-5?", validators=[validators.NumberRange(min=0, max=5)])
     preparation = IntegerField("How well prepared are you, on a scale from 0-5?", validators=[validators.NumberRange(min=0, max=5)])
     submit = SubmitField("Enter")
@@ -1,5 +1,12 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, Response, stream_with_context, jsonify
 from interact import db
+from interact.lib.events import publish_progress, event_stream
+from interact.lib.cache import get_deck, get_active_seminar_id, get_unclaimed_students
+from interact.lib.admission import claim_student, search_unclaimed, DROPDOWN_LIMIT
+from interact.lib.counters import get_counters
+from interact.lib.progress import advance_student, reach_gf
+from interact.lib.responses import response_buffer
+from interact.lib.fragments import get_fragment, page_etag, not_modified, cached_for_revalidation
 from interact.students.forms import JoinForm, JoinWithNameForm, SlideForm
 from interact.models import Seminar, Student, Slide, Answer, Group
 
@@ -9,10 +16,10 @@ students_blueprint = Blueprint('students', __name__, template_folder='templates'
 def index():
     form = JoinForm()
     if request.method == "POST":
-        if form.validate_on_submit:
-            seminar = Seminar.query.filter_by(code=form.code.data, active=True).first()
-            if seminar is not None:
-                return redirect(url_for("students.join", id=seminar.id))
+        if form.validate_on_submit():
+            seminar_id = get_active_seminar_id(form.code.data)
+            if seminar_id is not None:
+                return redirect(url_for("students.join", id=seminar_id))
             else:
                 flash("This seminar cannot be joined at the moment")
         else:
@@ -21,90 +28,137 @@ def index():
 
 @students_blueprint.route("/join/<int:id>", methods=["POST", "GET"])
 def join(id:int):
-    seminar = Seminar.query.filter_by(id=id).first()
-    form = JoinWithNameForm()
-    form.name.choices = [(student.id, student.name) for student in seminar.students if student.joined == False]
-    if len(form.name.choices) == 0:
+    seminar = db.session.get(Seminar, id)
+    students = get_unclaimed_students(id) if seminar is not None else ()
+    if len(students) == 0:
         flash("No more spots left in the chosen seminar")
         return redirect(url_for("students.index"))
 
+    form = JoinWithNameForm()
+    # Large seminars: search for your name instead of scrolling through all of them
+    search = len(students) > DROPDOWN_LIMIT
+    query = request.args.get("q", "")
+    form.name.choices = search_unclaimed(id, query) if search else list(students)
+
     if request.method == "POST":
-        if form.validate_on_submit:
-            student = Student.query.filter_by(id=form.name.data).first()
+        if form.validate_on_submit():
+            student = claim_student(id, form.name.data, form.motivation.data, form.preparation.data)
             if student is not None:
-                # Mark student as 'joined' in the DB
-                student.joined = True
-                student.current_slide = 1
-                student.motivation = form.motivation.data
-                student.preparation = form.preparation.data
-                db.session.commit()
+                publish_progress(student)
                 # Prepare session to track progress
                 session["student_id"] = student.id
                 session["student_name"] = student.name
                 session["seminar_id"] = id
+                session["session_number"] = seminar.session_number
                 session["slide"] = 1
                 session["score"] = 0
 
                 return redirect(url_for("students.seminar"))
             else:
-                flash("Unknown student")
+                flash("Somebody has just joined with this name, please choose again")
         else:
             flash("Form not filled in correctly")
-    return render_template("join.html", form=form, seminar=seminar)
+    return render_template("join.html", form=form, seminar=seminar, search=search, query=query)
+
+@students_blueprint.route("/join/<int:id>/names")
+def names(id:int):
+    """Unclaimed names of a seminar matching ?q=, for the search box on the join page."""
+    return jsonify([{"id": student_id, "name": name} for student_id, name in search_unclaimed(id, request.args.get("q", ""))])
 
 @students_blueprint.route("/seminar", methods=["POST", "GET"])
 def seminar():
-    current_slide = Slide.query.filter_by(seminar_id=session["seminar_id"], slide_order=session["slide"]).first()
+    seminar = Seminar.query.filter_by(id=session["seminar_id"]).first()
+    if session.get("session_number", seminar.session_number) != seminar.session_number:
+        # The teacher ended the session this student joined
+        flash("This session of the seminar has ended")
+        return redirect(url_for("students.index"))
+    deck = get_deck(seminar)
+    current_slide = deck.slide(session["slide"])
     if current_slide is None:
         # We're out of slides
         flash("Seminar completed!")
         return redirect(url_for("students.index"))
-    
+
+    if current_slide.type != 2:
+        fragment = get_fragment("slide_body.html", deck, current_slide)
+        if request.method == "GET":
+            # Repeat visit (reload, back button): the browser still has this page
+            response = not_modified(page_etag(fragment))
+            if response is not None:
+                return response
+
     student = Student.query.filter_by(id=session["student_id"]).first()
-    seminar = Seminar.query.filter_by(id=session["seminar_id"]).first()
     form = SlideForm()
     
     if current_slide.type == 2:
         # Group forming slide
         if request.method == "GET":
             # Page visit: check if all students have reached this point
-            student.reached_gf = True
-            db.session.commit()
-            nr_students_reached_gf = Student.query.filter_by(seminar_id=seminar.id, reached_gf=True).count()
-            if nr_students_reached_gf < seminar.nr_students:
-                return render_template("gf_slide_waiting.html", slide=current_slide, nr_slides=len(seminar.slides))
-            else:
-                from interact.lib.group_forming import activate_group_forming
-                activate_group_forming(seminar.id, current_slide)
-                return render_template("gf_slide_result.html", slide=current_slide, form=form, nr_slides=len(seminar.slides), student=student)
+            if not student.reached_gf and reach_gf(student):
+                db.session.commit()
+                publish_progress(student)
+            from interact.lib.group_forming import GF_PENDING, GF_DONE
+            from interact.lib.jobs import submit_group_forming, latest_job
+            if student.group_id is not None or seminar.gf_status == GF_DONE:
+                # Groups have been formed already (possibly forced by the teacher)
+                return render_template("gf_slide_result.html", slide=current_slide, form=form, nr_slides=deck.nr_slides, student=student)
+            if seminar.gf_status == GF_PENDING:
+                nr_students_reached_gf = get_counters(seminar.id).nr_reached_gf
+                # Only one request starts the group forming job, everybody waits for the result
+                if nr_students_reached_gf >= seminar.nr_students and submit_group_forming(seminar.id, current_slide):
+                    return redirect(url_for("students.seminar"))
+            return render_template("gf_slide_waiting.html", slide=current_slide, nr_slides=deck.nr_slides, job=latest_job(seminar))
         else:
             # POST, so we know group forming is complete and we can redirect the visitor to the next slide
+            if advance_student(student, session["slide"]):
+                db.session.commit()
+                publish_progress(student)
             session["slide"] += 1
-            student.current_slide += 1
-            db.session.commit()
             return redirect(url_for("students.seminar"))
 
     # Normal slide
     if request.method == "POST":
-        if form.validate_on_submit:
+        if form.validate_on_submit():
+            answer_id, correct = None, False
             if current_slide.type == 0:
-                # Question slide, check if correct
-                answer_id = request.form.get("answer")
-                answer = Answer.query.filter_by(id=answer_id).first()
-                if answer.correct == True:
-                    session["score"] += 1
-                    if student.score is None:
-                        student.score = 1
-                    else:
-                        student.score += 1
-                    flash(f"Correct answer! Current score: {session["score"]}")
-                else:
-                    flash(f"Wrong answer... Current score: {session["score"]}")
+                # Question slide, check if the answer is correct
+                answer_id = request.form.get("answer", type=int)
+                if answer_id not in {answer.id for answer in current_slide.answers}:
+                    answer_id = None
+                correct = deck.is_correct(answer_id)
 
+            # Only the first of several submits of this slide (e.g. a double click) advances and records the response
+            if advance_student(student, session["slide"], 1 if correct else 0):
+                if current_slide.type == 0:
+                    response_buffer.add(student.id, current_slide.id, answer_id, correct, seminar.session_number)
+                    if correct:
+                        session["score"] += 1
+                        flash(f"Correct answer! Current score: {session["score"]}")
+                    else:
+                        flash(f"Wrong answer... Current score: {session["score"]}")
+                db.session.commit()
+                publish_progress(student)
             session["slide"] += 1
-            student.current_slide += 1
-            db.session.commit()
             return redirect(url_for("students.seminar"))
         else:
             flash("Form not filled in correctly")
-    return render_template("slide.html", slide=current_slide, nr_slides=len(seminar.slides), form=form)
\ No newline at end of file
+    etag = page_etag(fragment) # before rendering, which consumes the flashed messages
+    return cached_for_revalidation(render_template("slide.html", body=fragment.html, form=form), etag)
+
+@students_blueprint.route("/events")
+def events():
+    """Server-Sent Events stream for the group forming waiting page: tells the student when groups are formed."""
+    if "seminar_id" not in session:
+        return "Not in a seminar", 403
+    seminar_id = session["seminar_id"]
+
+    def groups_formed():
+        from interact.lib.group_forming import GF_DONE
+        formed = db.session.query(Seminar.gf_status).filter_by(id=seminar_id).scalar() == GF_DONE
+        db.session.close() # don't keep a read transaction open while the stream waits
+        return formed
+
+    stream = event_stream(seminar_id, groups_formed, "gf_done", names={"gf_done"}, initial=False,
+                          last_event_id=request.headers.get("Last-Event-ID"))
+    return Response(stream_with_context(stream), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, IntegerField, TextAreaField, validators
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, SubmitField, IntegerField, TextAreaField, SelectField, validators
 
 class NewSeminarForm(FlaskForm):
     name = StringField("Name", validators=[validators.DataRequired()])
@@ -7,6 +8,8 @@ class NewSeminarForm(FlaskForm):
     submit = SubmitField("Create")
 
 class EnrollForm(FlaskForm):
+    names = TextAreaField("Or paste a list of names, one per line")
+    roster = FileField("Or upload a roster (CSV or TSV, with a 'name' column or the names in the first column)", validators=[FileAllowed(["csv", "tsv", "txt"], "Only CSV, TSV or text files")])
     submit = SubmitField("Enroll")
 
 class NewSlideForm(FlaskForm):
@@ -14,6 +17,19 @@ class NewSlideForm(FlaskForm):
     text = TextAreaField("Text", validators=[validators.Length(max=500)])
     submit = SubmitField("Add")
 
+class ImportDeckForm(FlaskForm):
+    deck = FileField("Slide deck (a JSON file exported from a seminar); its slides are added after the current slides", validators=[FileRequired(), FileAllowed(["json"], "Only JSON files")])
+    submit = SubmitField("Import")
+
 class DemoSeminarForm(FlaskForm):
-    nr_students_at_gf = IntegerField("Number of students who have reached the Group Forming slide", validators=[validators.NumberRange(min=0, max=5)])
-    submit = SubmitField("Create")
\ No newline at end of file
+    nr_students = IntegerField("Number of students", default=6, validators=[validators.NumberRange(min=1, max=5000)])
+    nr_students_at_gf = IntegerField("Number of students who have reached the Group Forming slide", default=5, validators=[validators.NumberRange(min=0, max=5000)])
+    nr_slides = IntegerField("Number of slides (including welcome, group forming and closing slide)", default=5, validators=[validators.NumberRange(min=3, max=200)])
+    nr_answers = IntegerField("Number of answers per question", default=3, validators=[validators.NumberRange(min=1, max=10)])
+    distribution = SelectField("Distribution of scores, motivation and preparation", choices=[("uniform", "Uniform"), ("normal", "Normal")])
+    seed = IntegerField("Random seed (optional, the same seed gives the same seminar)", validators=[validators.Optional()])
+    submit = SubmitField("Create")
+
+    def validate_nr_students_at_gf(self, field):
+        if self.nr_students.data is not None and field.data is not None and field.data > self.nr_students.data:
+            raise validators.ValidationError("Cannot be more than the number of students")
\ No newline at end of file
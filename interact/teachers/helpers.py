@@ -3,4 +3,23 @@ import random
 
 def generate_code(length=5):
     characters = string.ascii_letters + string.digits
-    return ''.join(random.choices(characters, k=length))
\ No newline at end of file
+    return ''.join(random.choices(characters, k=length))
+
+def unique_code(length=5, nr_candidates=5):
+    """A code no seminar has yet: draws a few candidates and takes a free one (one query), and draws again if all are taken."""
+    from interact import db
+    from interact.models import Seminar
+    while True:
+        candidates = {generate_code(length) for _ in range(nr_candidates)}
+        free = candidates - set(db.session.scalars(db.select(Seminar.code).where(Seminar.code.in_(candidates))))
+        if free:
+            return sorted(free)[0]
+
+def create_seminar(name, nr_students, user_id):
+    """Adds a new seminar with a unique code to the session. Use this instead of Seminar(), whose code may be taken."""
+    from interact import db
+    from interact.models import Seminar
+    seminar = Seminar(name, nr_students, user_id)
+    seminar.code = unique_code()
+    db.session.add(seminar)
+    return seminar
@@ -1,9 +1,17 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, Response, stream_with_context, jsonify
 from flask_login import current_user
+from markupsafe import escape
 from interact import db
-from interact.teachers.forms import NewSeminarForm, EnrollForm, NewSlideForm, DemoSeminarForm
-from interact.models import Seminar, Student, Slide, Answer, Group
+from interact.lib.events import event_stream
+from interact.lib.dashboard import dashboard_data, index_summary
+from interact.lib.counters import get_counters
+from interact.teachers.helpers import create_seminar
+from interact.teachers.forms import NewSeminarForm, EnrollForm, NewSlideForm, ImportDeckForm, DemoSeminarForm
+from interact.models import Seminar, Student, Slide, Answer, Group, SeminarSession, ArchivedStudent
 from functools import wraps
+from itertools import chain
+from datetime import datetime
+import json
 
 teachers_blueprint = Blueprint('teachers', __name__, template_folder='templates')
 
@@ -21,10 +29,12 @@ def user_required(f):
 @teachers_blueprint.route("/")
 @user_required
 def index():
-    seminars = Seminar.query.filter_by(user_id=current_user.id).all()
-    for seminar in seminars:
-        seminar.nr_joined_students = Student.query.filter_by(seminar_id=seminar.id, joined=True).count()
-    return render_template("index_teachers.html", seminars=seminars)
+    return render_template("index_teachers.html", seminars=index_summary(current_user.id))
+
+@teachers_blueprint.route("/api/index")
+@user_required
+def index_json():
+    return jsonify(seminars=index_summary(current_user.id))
 
 @teachers_blueprint.route('/create', methods=["GET", "POST"])
 @user_required
@@ -32,8 +42,7 @@ def create():
     new_form = NewSeminarForm()
     if request.method == "POST":
         if new_form.validate_on_submit():
-            new_seminar = Seminar(new_form.name.data, new_form.nr_students.data, current_user.id)
-            db.session.add(new_seminar)
+            create_seminar(new_form.name.data, new_form.nr_students.data, current_user.id)
             db.session.commit()
             flash("New seminar successfully created")
             return redirect(url_for("teachers.index"))
@@ -51,6 +60,8 @@ def activate(id:int):
         return redirect(url_for("teachers.index"))
     if seminar.active == False:
         seminar.active = True
+        if seminar.session_started_at is None:
+            seminar.session_started_at = datetime.now()
         db.session.commit()
         flash(f"Seminar is now open. Use code <b>{seminar.code}</b> to share.")
     else:
@@ -70,13 +81,18 @@ def enroll(id:int):
     form = EnrollForm()
     if request.method == "POST":
         if form.validate_on_submit():
-            for i in range(seminar.nr_students):
-                name = request.form.get(f"name{i}")
-                if name is not None and len(name) > 0 and Student.query.filter_by(name=name, seminar_id=id).first() is None: # only add new students
-                    new_student = Student(name, seminar.id)
-                    db.session.add(new_student)
-            db.session.commit()
-            flash("Students enrolled in seminar")
+            from interact.lib.enrollment import enroll_students, read_roster
+            names = chain(
+                (request.form.get(f"name{i}") for i in range(seminar.nr_students)),
+                (form.names.data or "").splitlines(),
+                read_roster(form.roster.data.stream) if form.roster.data else [],
+            )
+            nr_added = enroll_students(seminar.id, names) # only adds new students
+            nr_enrolled = get_counters(seminar.id).nr_enrolled
+            if seminar.nr_students is None or nr_enrolled > seminar.nr_students:
+                seminar.nr_students = nr_enrolled
+                db.session.commit()
+            flash(f"{nr_added} students enrolled in seminar")
             return redirect(url_for("teachers.index"))
         else:
             flash("Form not filled in correctly")
@@ -95,6 +111,35 @@ def delete(id:int):
     flash("Seminar deleted")
     return redirect(url_for("teachers.index"))
 
+@teachers_blueprint.route("/end_session/<int:id>")
+@user_required
+def end_session(id:int):
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        flash("Unknown or invalid seminar")
+        return redirect(url_for("teachers.index"))
+    from interact.lib.sessions import end_session, purge_archives_in_background
+    archived = end_session(seminar)
+    purge_archives_in_background()
+    flash(f"Session {archived.number} archived, session {seminar.session_number} started")
+    return redirect(url_for("teachers.sessions", id=seminar.id))
+
+@teachers_blueprint.route("/sessions/<int:id>")
+@teachers_blueprint.route("/sessions/<int:id>/<int:number>")
+@user_required
+def sessions(id:int, number:int=None):
+    """Archived sessions of a seminar, with the results of one of them."""
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        flash("Unknown or invalid seminar")
+        return redirect(url_for("teachers.index"))
+    archived_sessions = SeminarSession.query.filter_by(seminar_id=id).order_by(SeminarSession.number.desc()).all()
+    selected = next((archived for archived in archived_sessions if archived.number == number), None)
+    students = []
+    if selected is not None:
+        students = ArchivedStudent.query.filter_by(session_id=selected.id).order_by(ArchivedStudent.name).all()
+    return render_template("sessions.html", seminar=seminar, sessions=archived_sessions, selected=selected, students=students)
+
 @teachers_blueprint.route("/edit/<int:id>")
 @user_required
 def edit(id:int):
@@ -108,10 +153,14 @@ def edit(id:int):
 @teachers_blueprint.route('/slide-preview/<int:id>')
 @user_required
 def slide_preview(id):
-    slide = Slide.query.filter_by(id=id).first()
-    if slide is None:
+    from interact.lib.cache import get_deck
+    from interact.lib.fragments import get_fragment, not_modified, cached_for_revalidation
+    seminar = Seminar.query.join(Slide).filter(Slide.id == id, Seminar.user_id == current_user.id).first()
+    if seminar is None:
         return "Cannot find slide", 404
-    return render_template("slide_preview.html", slide=slide, nr_slides=len(slide.seminar.slides))
+    deck = get_deck(seminar)
+    fragment = get_fragment("slide_preview.html", deck, deck.slides_by_id[id])
+    return not_modified(fragment.digest) or cached_for_revalidation(fragment.html, fragment.digest)
 
 @teachers_blueprint.route("/add_slide/<int:id>/<int:type>", methods=["POST", "GET"])
 @user_required
@@ -124,20 +173,20 @@ def add_slide(id:int, type:int):
     form = NewSlideForm()
     if request.method == "POST":
         if form.validate_on_submit():
-            new_slide = Slide(type, form.title.data, len(seminar.slides) + 1, id, form.text.data)
+            from interact.lib.decks import next_slide_order
+            new_slide = Slide(type, form.title.data, next_slide_order(id), id, form.text.data)
+            if type == 2:
+                # Process group forming slide specifics
+                new_slide.gf_type = request.form.get("gf_type")
+                new_slide.gf_nr_per_group = request.form.get("gf_nr_per_group")
             db.session.add(new_slide)
-            db.session.commit()
             if type == 0:
                 # Process question slide specifics
+                db.session.flush()
                 for i in range(1, NR_ANSWERS+1):
                     new_answer = Answer(request.form.get(f"answer{i}"), request.form.get("answer_correct") == str(i), new_slide.id)
                     db.session.add(new_answer)
-                db.session.commit()
-            elif type == 2:
-                # Process group forming slide specifics
-                new_slide.gf_type = request.form.get("gf_type")
-                new_slide.gf_nr_per_group = request.form.get("gf_nr_per_group")
-                db.session.commit()
+            db.session.commit()
             flash(f"Slide added")
             return redirect(url_for("teachers.edit", id=id, type=type))
         else:
@@ -145,6 +194,52 @@ def add_slide(id:int, type:int):
 
     return render_template("add_slide.html", form=form, type=type, seminar=seminar, nr_answers=NR_ANSWERS)
 
+@teachers_blueprint.route("/deck/<int:id>/export")
+@user_required
+def export_deck(id:int):
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        return "Unknown or invalid seminar", 404
+    from interact.lib.decks import export_deck
+    return Response(json.dumps(export_deck(seminar), indent=2), mimetype="application/json",
+                    headers={"Content-Disposition": f"attachment; filename=deck-{seminar.id}.json"})
+
+@teachers_blueprint.route("/deck/<int:id>/import", methods=["POST", "GET"])
+@user_required
+def import_deck(id:int):
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        flash("Unknown or invalid seminar")
+        return redirect(url_for("teachers.index"))
+    form = ImportDeckForm()
+    if request.method == "POST":
+        if form.validate_on_submit():
+            from interact.lib.decks import import_deck
+            try:
+                nr_slides = import_deck(seminar, form.deck.data.read())
+            except ValueError as e:
+                db.session.rollback()
+                flash(f"Cannot import the deck: {escape(str(e))}")
+                return render_template("import_deck.html", form=form, seminar=seminar)
+            flash(f"{nr_slides} slides imported")
+            return redirect(url_for("teachers.edit", id=id))
+        else:
+            flash("Form not filled in correctly")
+    return render_template("import_deck.html", form=form, seminar=seminar)
+
+@teachers_blueprint.route("/clone/<int:id>")
+@user_required
+def clone(id:int):
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        flash("Unknown or invalid seminar")
+        return redirect(url_for("teachers.index"))
+    from interact.lib.decks import clone_seminar
+    suffix = " (copy)"
+    copy = clone_seminar(seminar, seminar.name[:50 - len(suffix)] + suffix)
+    flash(f"Seminar copied, with code <b>{copy.code}</b>")
+    return redirect(url_for("teachers.index"))
+
 @teachers_blueprint.route('/seminar/<int:seminar_id>/slide/<int:id>/delete')
 @user_required
 def delete_slide(seminar_id, id):
@@ -193,7 +288,68 @@ def dashboard(id:int):
     if seminar is None:
         flash("Unknown or invalid seminar")
         return redirect(url_for("teachers.index"))
-    return render_template("dashboard.html", seminar=seminar)
+    return render_template("dashboard.html", data=dashboard_data(seminar))
+
+@teachers_blueprint.route("/dashboard/<int:id>/content")
+@user_required
+def dashboard_content(id:int):
+    """Students and groups part of the dashboard, fetched by the dashboard page when it gets notified of changes."""
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        return "Unknown or invalid seminar", 404
+    return render_template("dashboard_content.html", data=dashboard_data(seminar))
+
+@teachers_blueprint.route("/api/dashboard/<int:id>")
+@user_required
+def dashboard_json(id:int):
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        return jsonify(error="Unknown or invalid seminar"), 404
+    return jsonify(dashboard_data(seminar))
+
+@teachers_blueprint.route("/dashboard/<int:id>/events")
+@user_required
+def dashboard_events(id:int):
+    """Server-Sent Events stream for the dashboard: student progress and group forming."""
+    seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+    if seminar is None:
+        return "Unknown or invalid seminar", 404
+    db.session.close()
+
+    def progress_signature():
+        signature = db.session.query(
+            db.func.count(Student.id),
+            db.func.sum(Student.current_slide),
+            db.func.sum(Student.score),
+            db.func.sum(db.cast(Student.reached_gf, db.Integer)),
+            db.func.sum(db.cast(Student.joined, db.Integer)),
+            db.func.count(db.distinct(Student.group_id)),
+        ).filter(Student.seminar_id == id).one()
+        db.session.close() # don't keep a read transaction open while the stream waits
+        return tuple(signature)
+
+    stream = event_stream(id, progress_signature, "changed", last_event_id=request.headers.get("Last-Event-ID"))
+    return Response(stream_with_context(stream), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@teachers_blueprint.route("/export")
+@teachers_blueprint.route("/export/<int:id>")
+@user_required
+def export(id:int=None):
+    """Streams the students, groups, scores and progress of a seminar (or of all seminars) as CSV or JSON Lines."""
+    from interact.lib.export import export, FORMATS
+    format = request.args.get("format", "csv")
+    if format not in FORMATS:
+        return f"Unknown export format, use one of: {", ".join(FORMATS)}", 400
+    if id is not None:
+        seminar = Seminar.query.filter_by(id=id, user_id=current_user.id).first()
+        if seminar is None:
+            return "Unknown or invalid seminar", 404
+        filename = f"seminar-{seminar.id}.{format}"
+    else:
+        filename = f"seminars.{format}"
+    return Response(stream_with_context(export(current_user.id, id, format)), mimetype=FORMATS[format],
+                    headers={"Content-Disposition": f"attachment; filename={filename}", "X-Accel-Buffering": "no"})
 
 @teachers_blueprint.route("/dashboard/demo", methods=["POST", "GET"])
 @user_required
@@ -202,9 +358,12 @@ def demo():
     if request.method == "POST":
         if form.validate_on_submit():
             from interact.lib.demo import populate_for_demo
-            populate_for_demo(current_user.id, form.nr_students_at_gf.data)
+            populate_for_demo(current_user.id, form.nr_students_at_gf.data, form.nr_students.data, form.nr_slides.data,
+                              form.nr_answers.data, form.distribution.data, form.seed.data)
             flash("Demo seminar set up")
             return redirect(url_for("teachers.index"))
+        else:
+            flash("Form not filled in correctly")
     return render_template("demo_seminar.html", form=form)
 
 @teachers_blueprint.route("/force_gf/<int:id>")
@@ -215,9 +374,11 @@ def force_gf(id:int):
         flash("Unknown or invalid seminar")
         return redirect(url_for("teachers.index"))
     
-    from interact.lib.group_forming import activate_group_forming
+    from interact.lib.jobs import submit_group_forming
     gf_slide = Slide.query.filter_by(seminar_id=seminar.id, type=2).first()
-    activate_group_forming(seminar.id, gf_slide, forced=True)
-    flash("Group forming done")
+    if submit_group_forming(seminar.id, gf_slide, forced=True):
+        flash("Group forming started")
+    else:
+        flash("Group forming is already running or done")
     
     return redirect(url_for("teachers.dashboard", id=seminar.id))
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+import pytest
+
+# The default app reads its configuration from the environment when it is created, so point it at a fresh SQLite
+# database first
+database_dir = tempfile.mkdtemp(prefix="interact-tests-")
+os.environ["FLASK_SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(database_dir, 'test.sqlite')}"
+os.environ["FLASK_DATABASE_PROFILE"] = '"sqlite"'
+os.environ.setdefault("FLASK_SECRET_KEY", "test")
+os.environ["FLASK_WTF_CSRF_ENABLED"] = "false"
+
+@pytest.fixture(scope="session")
+def app():
+    from interact import app, db
+    with app.app_context():
+        db.create_all()
+    yield app
+
+@pytest.fixture
+def assert_max_queries(app):
+    """
+    Returns a helper that makes a request with a test client and asserts it executes at most max_queries SQL
+    statements, to catch N+1 regressions. Returns the response.
+    """
+    from sqlalchemy import event
+    from interact import db
+
+    def check(client, method, url, max_queries, **kwargs):
+        statements = []
+        thread = threading.get_ident()
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if threading.get_ident() == thread: # not the background threads (e.g. the response buffer)
+                statements.append(statement)
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = client.open(url, method=method, **kwargs)
+            response.get_data() # consume streamed responses within the count
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        assert len(statements) <= max_queries, \
+            f"{method} {url} executed {len(statements)} SQL statements (max. {max_queries}):\n" + "\n".join(statements)
+        return response
+    return check
+
+@pytest.fixture
+def teacher(app):
+    """A teacher with an active seminar (three questions, a group forming slide, 20 enrolled students)."""
+    from werkzeug.security import generate_password_hash
+    from interact import db
+    from interact.models import User, Seminar, Slide, Answer
+    from interact.lib.enrollment import enroll_students
+    with app.app_context():
+        user = User(f"teacher{User.query.count()}", generate_password_hash("secret"))
+        db.session.add(user)
+        db.session.flush()
+        seminar = Seminar("Test seminar", 20, user.id)
+        seminar.active = True
+        db.session.add(seminar)
+        db.session.flush()
+        for order in range(1, 4):
+            slide = Slide(0, f"Question {order}", order, seminar.id)
+            db.session.add(slide)
+            db.session.flush()
+            db.session.add_all([Answer(f"Answer {i}", i == 0, slide.id) for i in range(3)])
+        gf_slide = Slide(2, "Group forming", 4, seminar.id)
+        gf_slide.gf_type = 3
+        gf_slide.gf_nr_per_group = 3
+        db.session.add(gf_slide)
+        db.session.commit()
+        enroll_students(seminar.id, [f"Student {i}" for i in range(1, 21)])
+        return {"username": user.username, "password": "secret", "seminar_id": seminar.id, "code": seminar.code}
+
+@pytest.fixture
+def teacher_client(app, teacher):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": teacher["username"], "password": teacher["password"]})
+    return client
@@ -0,0 +1,134 @@
+import threading
+from interact import db
+from interact.models import Student
+from interact.lib.cache import active_codes
+from interact.lib.counters import get_counters
+
+NR_DEVICES = 16
+
+def unclaimed_ids(app, seminar_id):
+    with app.app_context():
+        return db.session.scalars(db.select(Student.id).where(Student.seminar_id == seminar_id, Student.joined == False)
+                                  .order_by(Student.id)).all()
+
+def join_in_parallel(app, seminar_id, student_ids):
+    """Every device tries to join with the given student id at the same moment. Returns the ids of the successes."""
+    start = threading.Barrier(len(student_ids))
+    joined = []
+    lock = threading.Lock()
+
+    def device(student_id):
+        client = app.test_client()
+        start.wait()
+        response = client.post(f"/students/join/{seminar_id}", data={"name": student_id, "motivation": 3, "preparation": 2})
+        if response.status_code == 302 and response.headers["Location"].endswith("/students/seminar"):
+            with lock:
+                joined.append(student_id)
+
+    threads = [threading.Thread(target=device, args=(student_id,)) for student_id in student_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return joined
+
+def test_no_double_claims(app, teacher):
+    seminar_id = teacher["seminar_id"]
+    free = unclaimed_ids(app, seminar_id)
+
+    # All devices pick the same name: exactly one of them gets it
+    assert join_in_parallel(app, seminar_id, [free[0]] * NR_DEVICES) == [free[0]]
+
+    # Two devices for each of the next names
+    contested = free[1:NR_DEVICES // 2 + 1]
+    joined = join_in_parallel(app, seminar_id, contested * 2)
+    assert sorted(joined) == sorted(contested)
+
+    with app.app_context():
+        assert get_counters(seminar_id).nr_joined == 1 + len(contested)
+        assert db.session.scalar(db.select(db.func.count(Student.id)).where(Student.seminar_id == seminar_id,
+                                                                          Student.joined == True)) == 1 + len(contested)
+    # Claimed names disappear from the (cached) list once it is refreshed after a lost race
+    client = app.test_client()
+    response = client.post(f"/students/join/{seminar_id}", data={"name": free[0], "motivation": 3, "preparation": 2})
+    assert response.status_code == 200 and "Somebody has just joined with this name" in response.get_data(as_text=True)
+    assert f'value="{free[0]}"' not in client.get(f"/students/join/{seminar_id}").get_data(as_text=True)
+
+def test_name_search(app, teacher, monkeypatch):
+    seminar_id = teacher["seminar_id"]
+    monkeypatch.setattr("interact.students.views.DROPDOWN_LIMIT", 5)
+    client = app.test_client()
+    html = client.get(f"/students/join/{seminar_id}").get_data(as_text=True)
+    assert 'name="q"' in html and "Student 1<" not in html # no full dropdown
+    html = client.get(f"/students/join/{seminar_id}?q=student 1").get_data(as_text=True)
+    assert "Student 1<" in html and "Student 2<" not in html
+
+    names = client.get(f"/students/join/{seminar_id}/names?q=2").get_json()
+    assert [student["name"] for student in names] == ["Student 2", "Student 20"]
+    assert client.get(f"/students/join/{seminar_id}/names?q=").get_json() == []
+
+def test_active_codes_from_memory(app, teacher, assert_max_queries):
+    client = app.test_client()
+    active_codes.clear()
+    assert_max_queries(client, "POST", "/students/", 1, data={"code": teacher["code"]})
+    response = assert_max_queries(client, "POST", "/students/", 0, data={"code": teacher["code"]})
+    assert response.headers["Location"].endswith(f"/students/join/{teacher['seminar_id']}")
+    assert_max_queries(client, "POST", "/students/", 0, data={"code": "wrong"})
+
+def test_double_submits_count_once(app, teacher):
+    import re
+    from interact.models import SlideCounter
+    seminar_id = teacher["seminar_id"]
+    student_id = unclaimed_ids(app, seminar_id)[0]
+    client = app.test_client()
+    client.post(f"/students/join/{seminar_id}", data={"name": student_id, "motivation": 3, "preparation": 2})
+    for _ in range(3): # the question slides, every answer submitted twice (the second time with the stale session)
+        answer = re.findall(r'name="answer" value="(\d+)"', client.get("/students/seminar").get_data(as_text=True))[0]
+        with client.session_transaction() as stale:
+            stale = dict(stale)
+        client.post("/students/seminar", data={"answer": answer})
+        with client.session_transaction() as current:
+            current.update(slide=stale["slide"], score=stale["score"])
+        client.post("/students/seminar", data={"answer": answer})
+    client.get("/students/seminar") # the group forming slide, twice
+    client.get("/students/seminar")
+
+    with app.app_context():
+        student = db.session.get(Student, student_id)
+        assert (student.current_slide, student.score, student.reached_gf) == (4, 3, True)
+        assert get_counters(seminar_id).nr_reached_gf == 1
+        assert db.session.scalar(db.select(SlideCounter.nr_students).where(SlideCounter.seminar_id == seminar_id,
+                                                                         SlideCounter.slide_order == 4)) == 1
+        assert db.session.scalar(db.select(db.func.sum(SlideCounter.nr_students))
+                                 .where(SlideCounter.seminar_id == seminar_id)) == 1
+
+def test_seminar_codes_are_unique(app, teacher, monkeypatch):
+    from interact.models import Seminar
+    from interact.teachers.helpers import create_seminar
+    from itertools import chain, repeat
+    codes = chain([teacher["code"]] * 5, repeat("fresh")) # the first candidates are all taken
+    monkeypatch.setattr("interact.teachers.helpers.generate_code", lambda length=5: next(codes))
+    with app.app_context():
+        user_id = db.session.scalar(db.select(Seminar.user_id).where(Seminar.id == teacher["seminar_id"]))
+        seminar = create_seminar("Another", 10, user_id)
+        db.session.commit()
+        assert seminar.code == "fresh"
+
+def test_forms_are_validated(app, teacher):
+    """Without a CSRF token (or a code) the student forms are refused, and the student stays where they are."""
+    seminar_id = teacher["seminar_id"]
+    student_id = unclaimed_ids(app, seminar_id)[0]
+    client = app.test_client()
+    response = client.post("/students/", data={"code": ""})
+    assert response.status_code == 200 and b"Form not filled in correctly" in response.data
+    client.post(f"/students/join/{seminar_id}", data={"name": student_id, "motivation": 3, "preparation": 2})
+    app.config["WTF_CSRF_ENABLED"] = True
+    try:
+        response = client.post("/students/", data={"code": teacher["code"]})
+        assert response.status_code == 200 and b"Form not filled in correctly" in response.data
+        response = client.post("/students/seminar", data={"answer": 1})
+        assert response.status_code == 200 and b"Form not filled in correctly" in response.data
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        assert db.session.get(Student, student_id).current_slide == 1
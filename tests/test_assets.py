@@ -0,0 +1,80 @@
+import gzip
+import json
+import os
+import pytest
+from interact.lib.assets import assets, build_assets, check_vendored, fingerprinted, integrity, MANIFEST, VENDORED
+
+def test_build_assets(tmp_path):
+    static = tmp_path / "static"
+    (static / "vendor").mkdir(parents=True)
+    (static / "style.css").write_text("body { color: red; }")
+    (static / "vendor" / "logo.png").write_bytes(b"\x89PNG")
+    output = str(static / "dist")
+    manifest = build_assets(str(static), output)
+    assert manifest == {
+        "style.css": fingerprinted("style.css", b"body { color: red; }"),
+        "vendor/logo.png": fingerprinted("vendor/logo.png", b"\x89PNG"),
+    }
+    assert manifest["style.css"].startswith("style.") and manifest["style.css"].endswith(".css")
+    with gzip.open(os.path.join(output, manifest["style.css"] + ".gz")) as f:
+        assert f.read() == b"body { color: red; }"
+    assert not os.path.exists(os.path.join(output, manifest["vendor/logo.png"] + ".gz")) # not compressible
+    with open(os.path.join(output, MANIFEST)) as f:
+        assert json.load(f) == manifest
+    # A rebuild does not pick up its own output
+    assert build_assets(str(static), output) == manifest
+
+def test_serve_assets(app, tmp_path, monkeypatch):
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "style.css").write_text("body { color: red; }" * 100)
+    output = str(tmp_path / "dist")
+    build_assets(str(static), output)
+    monkeypatch.setattr(assets, "output_folder", output)
+    monkeypatch.setattr(assets, "static_folder", str(static))
+    assets.load_manifest()
+    try:
+        with app.test_request_context():
+            url = assets.url("style.css")
+        assert url == f"/assets/{assets.manifest['style.css']}"
+        client = app.test_client()
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.mimetype == "text/css"
+        assert gzip.decompress(response.data) == b"body { color: red; }" * 100
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in response.headers and response.data == b"body { color: red; }" * 100
+        assert client.get(f"/assets/{MANIFEST}").status_code == 404
+    finally:
+        monkeypatch.undo()
+        assets.load_manifest()
+
+def test_unbuilt_fallbacks(app):
+    with app.test_request_context():
+        assert assets.url("vendor/bootstrap.min.css").startswith(("/static/", "/assets/")) # never a CDN
+        assert assets.integrity("vendor/bootstrap.min.css").startswith("sha384-")
+        assert assets.integrity("style.css") == ""
+
+def test_check_vendored(tmp_path, monkeypatch):
+    (tmp_path / "vendor").mkdir()
+    (tmp_path / "vendor" / "lib.js").write_bytes(b"console.log(1)")
+    monkeypatch.setattr("interact.lib.assets.VENDORED", {"vendor/lib.js": ("https://example.org/lib.js", integrity(b"console.log(1)"))})
+    check_vendored(str(tmp_path))
+    (tmp_path / "vendor" / "lib.js").write_bytes(b"console.log(2)")
+    with pytest.raises(RuntimeError, match="does not match"):
+        check_vendored(str(tmp_path))
+    (tmp_path / "vendor" / "lib.js").unlink()
+    with pytest.raises(RuntimeError, match="missing"):
+        check_vendored(str(tmp_path))
+
+def test_vendored_files_are_committed(app):
+    check_vendored(app.static_folder)
+    client = app.test_client()
+    for name in VENDORED:
+        response = client.get(f"/static/{name}")
+        assert response.status_code == 200
+        assert integrity(response.data) == VENDORED[name][1]
+        response.close()
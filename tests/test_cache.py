@@ -0,0 +1,74 @@
+from interact import db
+from interact.models import User, Seminar, Slide, Answer
+from interact.lib import cache
+from interact.lib.cache import get_deck, get_active_seminar_id, get_user
+
+def cached_deck(app, seminar_id):
+    """The seminar's deck version and its (cached) deck, read through the cache twice."""
+    with app.app_context():
+        seminar = db.session.get(Seminar, seminar_id)
+        deck = get_deck(seminar)
+        assert get_deck(seminar) is deck
+        return seminar.deck_version, deck
+
+def titles(deck):
+    return [deck.slide(order).title for order in range(1, deck.nr_slides + 1)]
+
+def test_deck_changes_invalidate(app, teacher, teacher_client):
+    seminar_id = teacher["seminar_id"]
+    version, deck = cached_deck(app, seminar_id)
+    assert titles(deck) == ["Question 1", "Question 2", "Question 3", "Group forming"]
+
+    # Edit a slide
+    with app.app_context():
+        slide = Slide.query.filter_by(seminar_id=seminar_id, slide_order=1).first()
+        slide.title = "First question"
+        db.session.commit()
+    assert (seminar_id, version) not in cache.decks.entries
+    new_version, deck = cached_deck(app, seminar_id)
+    assert new_version > version and deck.slide(1).title == "First question"
+
+    # Edit an answer
+    version = new_version
+    with app.app_context():
+        answer = Answer.query.filter_by(slide_id=deck.slide(2).id).order_by(Answer.id).first()
+        answer.correct = False
+        db.session.commit()
+    new_version, deck = cached_deck(app, seminar_id)
+    assert new_version > version and not any(answer.correct for answer in deck.slide(2).answers)
+
+    # Add a slide
+    version = new_version
+    response = teacher_client.post(f"/teachers/add_slide/{seminar_id}/1", data={"title": "The end", "text": "Bye"})
+    assert response.status_code == 302
+    new_version, deck = cached_deck(app, seminar_id)
+    assert new_version > version and titles(deck)[-1] == "The end"
+
+    # Move a slide
+    version = new_version
+    teacher_client.get(f"/teachers/seminar/{seminar_id}/slide/{deck.slide(5).id}/up")
+    new_version, deck = cached_deck(app, seminar_id)
+    assert new_version > version
+    assert titles(deck) == ["First question", "Question 2", "Question 3", "The end", "Group forming"]
+
+def test_code_map_invalidation(app, teacher, teacher_client):
+    with app.app_context():
+        assert get_active_seminar_id(teacher["code"]) == teacher["seminar_id"]
+    teacher_client.get(f"/teachers/activate/{teacher['seminar_id']}") # closes the seminar
+    with app.app_context():
+        assert get_active_seminar_id(teacher["code"]) is None
+    teacher_client.get(f"/teachers/activate/{teacher['seminar_id']}")
+    with app.app_context():
+        assert get_active_seminar_id(teacher["code"]) == teacher["seminar_id"]
+
+def test_user_invalidation(app):
+    with app.app_context():
+        user = User(f"cached{User.query.count()}", "secret")
+        db.session.add(user)
+        db.session.commit()
+        cached = get_user(user.id)
+        assert get_user(user.id) is cached and cached.role == user.role
+        user.role = "admin"
+        db.session.commit()
+        assert user.id not in cache.users.entries
+        assert get_user(user.id).role == "admin"
@@ -0,0 +1,24 @@
+import random
+from collections import Counter
+from interact.lib.clustering import BalancedClustering
+
+def test_balanced_group_sizes():
+    rng = random.Random(1)
+    for n, size in [(1, 3), (7, 3), (30, 2), (301, 5), (1000, 4)]:
+        features = [(rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 10)) for _ in range(n)]
+        clustering = BalancedClustering(features, size)
+        order = clustering.order()
+        assert sorted(order) == list(range(n))
+        labels = clustering.labels()
+        sizes = sorted(Counter(labels.tolist()).values(), reverse=True)
+        expected = [size] * (n // size) + ([n % size] if n % size else [])
+        assert sizes == expected
+        # Consecutive runs of `size` students in the order are exactly the clusters
+        for start in range(0, n, size):
+            assert len({labels[i] for i in order[start:start + size]}) == 1
+
+def test_balanced_groups_similar_students():
+    # Two well separated clouds of students end up in separate groups
+    features = [(0, 0, 0)] * 6 + [(5, 5, 10)] * 6
+    labels = BalancedClustering(features, 3).labels()
+    assert {labels[i] for i in range(6)}.isdisjoint({labels[i] for i in range(6, 12)})
@@ -0,0 +1,56 @@
+import threading
+from sqlalchemy.exc import OperationalError
+from interact import db
+from interact.models import User, Seminar, Student
+
+NR_THREADS = 16
+NR_COMMITS = 25
+
+def test_sqlite_profile_pragmas(app):
+    with app.app_context():
+        connection = db.session.connection()
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1 # NORMAL
+        assert connection.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+def test_concurrent_commits_do_not_lock(app):
+    """Many threads reading and committing at once (like a room of students) get no "database is locked" errors."""
+    with app.app_context():
+        user = User("concurrency", "x")
+        db.session.add(user)
+        db.session.flush()
+        seminar = Seminar("Concurrency", NR_THREADS, user.id)
+        db.session.add(seminar)
+        db.session.flush()
+        students = [Student(f"student{i}", seminar.id) for i in range(NR_THREADS)]
+        db.session.add_all(students)
+        db.session.commit()
+        student_ids = [student.id for student in students]
+        seminar_id = seminar.id
+
+    errors = []
+    start = threading.Barrier(NR_THREADS)
+
+    def run(student_id):
+        start.wait()
+        for _ in range(NR_COMMITS):
+            with app.app_context():
+                try:
+                    db.session.scalar(db.select(db.func.count(Student.id)).where(Student.seminar_id == seminar_id))
+                    db.session.execute(db.update(Student).where(Student.id == student_id).values(score=Student.score + 1))
+                    db.session.execute(db.update(Seminar).where(Seminar.id == seminar_id).values(nr_students=Seminar.nr_students + 1))
+                    db.session.commit()
+                except OperationalError as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(student_id,)) for student_id in student_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.sum(Student.score)).where(Student.seminar_id == seminar_id)) == NR_THREADS * NR_COMMITS
+        assert db.session.get(Seminar, seminar_id).nr_students == NR_THREADS + NR_THREADS * NR_COMMITS
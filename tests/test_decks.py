@@ -0,0 +1,99 @@
+import io
+import json
+import threading
+import pytest
+from sqlalchemy import event
+
+def deck_of(seminar_id):
+    from interact import db
+    from interact.models import Seminar
+    from interact.lib.decks import export_deck
+    deck = export_deck(db.session.get(Seminar, seminar_id))
+    return deck["slides"]
+
+def count_statements(engine, action):
+    statements = []
+    thread = threading.get_ident()
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread: # not the background threads (e.g. the response buffer)
+            statements.append(statement)
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = action()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, statements
+
+def test_export_import_round_trip(app, teacher):
+    from interact import db
+    from interact.models import Seminar
+    from interact.lib.decks import export_deck, import_deck
+    with app.app_context():
+        source = db.session.get(Seminar, teacher["seminar_id"])
+        data = json.dumps(export_deck(source))
+        slides = json.loads(data)["slides"]
+        assert [slide["type"] for slide in slides] == [0, 0, 0, 2]
+        assert slides[0]["answers"][0] == {"text": "Answer 0", "correct": True}
+        assert slides[3]["gf_type"] == 3
+
+        target = Seminar("Target", 10, source.user_id)
+        db.session.add(target)
+        db.session.commit()
+        assert import_deck(target, data) == 4
+        assert deck_of(target.id) == slides
+        # The seminar has a group forming slide now, a second one is refused
+        with pytest.raises(ValueError):
+            import_deck(target, data)
+
+@pytest.mark.parametrize("data", [
+    "not json",
+    json.dumps({"slides": []}),
+    json.dumps({"format": "interact-deck", "version": 1, "slides": [{"type": 7, "title": "x"}]}),
+    json.dumps({"format": "interact-deck", "version": 1, "slides": [{"type": 1, "title": "x" * 101}]}),
+    json.dumps({"format": "interact-deck", "version": 1, "slides": [{"type": 0, "title": "Question"}]}),
+])
+def test_invalid_decks(data):
+    from interact.lib.decks import read_deck
+    with pytest.raises(ValueError):
+        read_deck(data)
+
+def test_clone_in_fixed_statements(app, teacher):
+    """A 100-slide deck is copied with the same few statements as a small one."""
+    from interact import db
+    from interact.models import Seminar
+    from interact.lib.decks import clone_seminar, import_deck
+    with app.app_context():
+        source = db.session.get(Seminar, teacher["seminar_id"])
+        import_deck(source, {"format": "interact-deck", "version": 1, "slides": [
+            {"type": 0, "title": f"Question {i}", "answers": [{"text": "Yes", "correct": True}, {"text": "No"}]}
+            for i in range(96)
+        ]})
+        clone, statements = count_statements(db.engine, lambda: clone_seminar(source, "Copy"))
+        assert len(statements) <= 5, "\n".join(statements)
+        assert len(deck_of(clone.id)) == 100
+        assert deck_of(clone.id) == deck_of(source.id)
+        assert clone.user_id == source.user_id and clone.code != source.code and not clone.active
+
+def test_deck_views(app, teacher, teacher_client):
+    from interact import db
+    from interact.models import Seminar
+    seminar_id = teacher["seminar_id"]
+    response = teacher_client.get(f"/teachers/deck/{seminar_id}/export")
+    assert response.status_code == 200
+    deck = response.get_json()
+    deck["slides"] = [slide for slide in deck["slides"] if slide["type"] != 2] # one group forming slide per seminar
+
+    response = teacher_client.post(f"/teachers/deck/{seminar_id}/import",
+                                   data={"deck": (io.BytesIO(json.dumps(deck).encode()), "deck.json")})
+    assert response.status_code == 302
+    response = teacher_client.post(f"/teachers/deck/{seminar_id}/import",
+                                   data={"deck": (io.BytesIO(b"{}"), "deck.json")}, follow_redirects=True)
+    assert b"Cannot import the deck" in response.data
+    with app.app_context():
+        assert len(deck_of(seminar_id)) == 7
+
+    response = teacher_client.get(f"/teachers/clone/{seminar_id}")
+    assert response.status_code == 302
+    with app.app_context():
+        copy = db.session.scalars(db.select(Seminar).where(Seminar.name == "Test seminar (copy)")).first()
+        assert copy is not None and len(deck_of(copy.id)) == 7
@@ -0,0 +1,92 @@
+import time
+from sqlalchemy import event
+
+def make_user(app):
+    from interact import db
+    from interact.models import User
+    with app.app_context():
+        user = User(f"demo{User.query.count()}", "secret")
+        db.session.add(user)
+        db.session.commit()
+        return user.id, user.username
+
+def seminar_contents(seminar_id):
+    from interact import db
+    from interact.models import Slide, Answer, Student
+    slides = db.session.execute(db.select(Slide.slide_order, Slide.type, Slide.title)
+                                .where(Slide.seminar_id == seminar_id).order_by(Slide.slide_order)).all()
+    answers = db.session.execute(db.select(Slide.slide_order, Answer.text, Answer.correct).join(Slide, Answer.slide_id == Slide.id)
+                                 .where(Slide.seminar_id == seminar_id).order_by(Answer.id)).all()
+    students = db.session.execute(db.select(Student.name, Student.joined, Student.current_slide, Student.score,
+                                            Student.motivation, Student.preparation)
+                                  .where(Student.seminar_id == seminar_id).order_by(Student.id)).all()
+    return slides, answers, students
+
+def test_default_demo(app):
+    from interact.lib.demo import populate_for_demo
+    from interact.lib.counters import get_counters
+    user_id, _ = make_user(app)
+    with app.app_context():
+        seminar = populate_for_demo(user_id, 5, seed=1)
+        slides, answers, students = seminar_contents(seminar.id)
+        assert [type for _, type, _ in slides] == [1, 0, 0, 2, 1]
+        assert len(answers) == 6 and sum(correct for _, _, correct in answers) == 2
+        assert len(students) == 6 and len({name for name, *_ in students}) == 6
+        assert [current_slide for _, _, current_slide, *_ in students] == [4, 4, 4, 4, 4, 0]
+        assert all(0 <= score <= 2 and 0 <= motivation <= 5 for _, _, _, score, motivation, _ in students)
+        counters = get_counters(seminar.id)
+        assert (counters.nr_enrolled, counters.nr_joined, counters.nr_reached_gf) == (6, 5, 5)
+
+def test_same_seed_same_seminar(app):
+    from interact.lib.demo import populate_for_demo
+    user_id, _ = make_user(app)
+    with app.app_context():
+        first = populate_for_demo(user_id, 40, 50, 8, 4, "normal", seed=7)
+        second = populate_for_demo(user_id, 40, 50, 8, 4, "normal", seed=7)
+        assert seminar_contents(first.id) == seminar_contents(second.id)
+
+def test_large_seminar_in_one_transaction(app):
+    """3000 students and 50 slides: a fixed number of statements and a single commit, within seconds."""
+    from interact import db
+    from interact.lib.demo import populate_for_demo
+    from interact.lib.counters import get_counters
+    user_id, _ = make_user(app)
+    with app.app_context():
+        statements = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        commits = []
+        def count_commit(conn):
+            commits.append(conn)
+        event.listen(db.engine, "before_cursor_execute", count)
+        event.listen(db.engine, "commit", count_commit)
+        try:
+            start = time.perf_counter()
+            seminar = populate_for_demo(user_id, 2500, 3000, 50, 4, seed=3)
+            elapsed = time.perf_counter() - start
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+            event.remove(db.engine, "commit", count_commit)
+        assert elapsed < 5
+        assert len(commits) == 1
+        assert len(statements) <= 12, "\n".join(statements)
+        slides, answers, students = seminar_contents(seminar.id)
+        assert len(slides) == 50 and len(answers) == 47 * 4 and len(students) == 3000
+        assert get_counters(seminar.id).nr_reached_gf == 2500
+
+def test_demo_form_and_command(app, teacher_client):
+    from interact import db
+    from interact.models import Seminar, Student
+    response = teacher_client.post("/teachers/dashboard/demo", data={"nr_students": 30, "nr_students_at_gf": 10,
+                                   "nr_slides": 6, "nr_answers": 2, "distribution": "normal", "seed": 5})
+    assert response.status_code == 302
+    _, username = make_user(app)
+    result = app.test_cli_runner().invoke(args=["create-demo", username, "--students", "100", "--slides", "10",
+                                                "--name", "CLI demo"])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        seminar = db.session.scalars(db.select(Seminar).where(Seminar.name == "CLI demo")).one()
+        assert db.session.scalar(db.select(db.func.count(Student.id))
+                                 .where(Student.seminar_id == seminar.id, Student.reached_gf == True)) == 100
+    result = app.test_cli_runner().invoke(args=["create-demo", username, "--slides", "2"])
+    assert result.exit_code != 0
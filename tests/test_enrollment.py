@@ -0,0 +1,52 @@
+import io
+import pytest
+from sqlalchemy import event
+from interact import db
+from interact.models import Student
+from interact.lib.enrollment import read_roster, enroll_students
+
+def names_in(data):
+    return list(read_roster(io.BytesIO(data)))
+
+@pytest.mark.parametrize("data, expected", [
+    (b"Anna\nBram\n", ["Anna", "Bram"]), # no header: the first column
+    (b"nr,Name\n1,Anna\n2,Bram\n", ["Anna", "Bram"]),
+    (b"nr\tstudent\temail\n1\tAnna\ta@example.org\n2\tBram, jr.\tb@example.org\n", ["Anna", "Bram, jr."]),
+    (b"nr;naam\n1;Anna\n2;Bram\n", ["Anna", "Bram"]),
+    (b'name,email\n"de Vries, Anna",a@example.org\n', ["de Vries, Anna"]),
+    ("\ufeffName\r\nAnna\r\n\r\nBrám\r\n".encode("utf-8"), ["Anna", "Brám"]), # BOM, CRLF, blank line
+    (b"", []),
+])
+def test_read_roster(data, expected):
+    assert names_in(data) == expected
+
+def test_enroll_students(app, teacher, monkeypatch):
+    """Duplicates, blanks and enrolled names are skipped; all batches are written in one commit."""
+    from interact.lib.counters import get_counters
+    monkeypatch.setattr("interact.lib.enrollment.BATCH_SIZE", 3)
+    seminar_id = teacher["seminar_id"]
+    names = ["Student 1", "  Anna ", "Bram", "", "Anna", "Carla", "Student 20", "Daan", "x" * 60]
+    with app.app_context():
+        commits = []
+        def count_commit(conn):
+            commits.append(conn)
+        event.listen(db.engine, "commit", count_commit)
+        try:
+            assert enroll_students(seminar_id, iter(names)) == 5
+        finally:
+            event.remove(db.engine, "commit", count_commit)
+        assert len(commits) == 1
+        new_names = db.session.scalars(db.select(Student.name).where(Student.seminar_id == seminar_id,
+                                                                   Student.name.not_like("Student %"))).all()
+        assert sorted(new_names) == ["Anna", "Bram", "Carla", "Daan", "x" * 50]
+        assert get_counters(seminar_id).nr_enrolled == 25
+        assert enroll_students(seminar_id, names) == 0 # all enrolled already
+
+def test_enroll_roster_upload(app, teacher, teacher_client):
+    seminar_id = teacher["seminar_id"]
+    roster = io.BytesIO("\ufeffnr\tName\n1\tAnna\n2\tStudent 3\n\n3\tBram\n".encode("utf-8"))
+    response = teacher_client.post(f"/teachers/enroll/{seminar_id}", data={"names": "Carla\nAnna",
+                                   "roster": (roster, "roster.tsv")}, follow_redirects=True)
+    assert b"3 students enrolled in seminar" in response.data
+    with app.app_context():
+        assert Student.query.filter_by(seminar_id=seminar_id).count() == 23
@@ -0,0 +1,134 @@
+import multiprocessing
+import queue
+import threading
+import time
+from interact.lib import events as events_module
+from interact.lib.events import LocalEventBus, DatabaseEventBus, BrokerEventBus, Broker, event_stream, format_event
+
+NR_PROCESSES = 3
+TIMEOUT = 20
+
+def subscribe(seminar_id, ready, results):
+    """Runs in a separate process with EVENT_BUS = "database": waits for one event of the seminar."""
+    from interact import app
+    from interact.lib import events
+    last_id = events.bus.current_id()
+    ready.put(True)
+    received = events.bus.wait(seminar_id, last_id, TIMEOUT)
+    results.put([(name, data) for id, name, data in received])
+
+def publish(seminar_id):
+    """Runs in a separate process: publishes an event and exits before the poller writes it."""
+    from interact import app
+    from interact.lib import events
+    events.bus.interval = 60
+    events.bus.ensure_started()
+    time.sleep(0.2)
+    events.bus.wakeup = threading.Event() # the poller waits on the old one: only the flush at exit writes the event
+    events.bus.publish(seminar_id, "progress", {"id": 1, "current_slide": 2})
+
+def test_local_bus():
+    bus = LocalEventBus()
+    start = bus.current_id()
+    bus.publish(1, "gf_done")
+    bus.publish(2, "progress", {"id": 5})
+    assert bus.wait(2, start, 1) == [(start + 2, "progress", {"id": 5})]
+    assert bus.wait(3, start, 0.01) == []
+
+def test_history_of_quiet_seminars_is_dropped():
+    bus = LocalEventBus(max_seminars=2)
+    for seminar_id in (1, 2, 1, 3):
+        bus.publish(seminar_id, "progress")
+    assert list(bus.events) == [1, 3] # seminar 2 was quiet longest
+    assert bus.since(2, 0) == [] and len(bus.since(1, 0)) == 2
+
+def stream(monkeypatch, check=lambda: 0, change_event="changed", timeout=0.3, **kwargs):
+    """All messages of an event_stream on a fresh local bus, with a short timeout and check interval."""
+    monkeypatch.setattr(events_module, "STREAM_TIMEOUT", timeout)
+    monkeypatch.setattr(events_module, "CHECK_INTERVAL", 0.1)
+    return list(event_stream(1, check, change_event, **kwargs))
+
+def test_stream_replays_after_last_event_id(monkeypatch):
+    bus = LocalEventBus()
+    monkeypatch.setattr(events_module, "bus", bus)
+    for number in range(3):
+        bus.publish(1, "progress", {"number": number})
+    bus.publish(1, "other")
+    bus.publish(2, "progress", {"number": 9})
+    messages = stream(monkeypatch, last_event_id="1", names={"progress"})
+    assert messages[0] == f"retry: {events_module.RETRY_MS}\n\n"
+    assert messages[1:3] == [format_event("progress", {"number": 1}, 2), format_event("progress", {"number": 2}, 3)]
+    assert "other" not in "".join(messages) and '"number": 9' not in "".join(messages)
+    # Without (or with an invalid) Last-Event-ID only new events are sent
+    assert not any(message.startswith("id:") for message in stream(monkeypatch, last_event_id="x"))
+
+def test_stream_check_fallback(monkeypatch):
+    """A change seen by check() but not published on the bus is signalled with change_event, once."""
+    monkeypatch.setattr(events_module, "bus", LocalEventBus())
+    signatures = iter([1, 2, 2, 2, 2, 2, 2, 2])
+    messages = stream(monkeypatch, check=lambda: next(signatures), initial=1)
+    assert messages.count(format_event("changed", {})) == 1
+    # A result that differs from initial counts as a change on the first check
+    assert stream(monkeypatch, check=lambda: 5, initial=4)[1] == format_event("changed", {})
+
+def test_stream_timeout_and_keepalive(monkeypatch):
+    monkeypatch.setattr(events_module, "bus", LocalEventBus())
+    start = time.monotonic()
+    messages = stream(monkeypatch, timeout=0.35)
+    assert 0.3 < time.monotonic() - start < 2 # the stream ends by itself, for the browser to reconnect
+    assert messages.count(": keepalive\n\n") >= 2
+
+def test_database_bus_across_processes(app, teacher, monkeypatch):
+    seminar_id = teacher["seminar_id"]
+    monkeypatch.setenv("FLASK_EVENT_BUS", '"database"')
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Queue(), context.Queue()
+    subscribers = [context.Process(target=subscribe, args=(seminar_id, ready, results)) for _ in range(NR_PROCESSES)]
+    for process in subscribers:
+        process.start()
+    bus = DatabaseEventBus(app, interval=0.05)
+    start = bus.current_id()
+    try:
+        for _ in subscribers:
+            ready.get(timeout=TIMEOUT)
+        # This process publishes, every other process gets it
+        bus.publish(seminar_id, "gf_done")
+        for _ in subscribers:
+            assert results.get(timeout=TIMEOUT) == [("gf_done", {})]
+
+        # Another process publishes, this process gets it (with the same event id as everywhere)
+        publisher = context.Process(target=publish, args=(seminar_id,))
+        publisher.start()
+        publisher.join(TIMEOUT)
+        events = bus.wait(seminar_id, start + 1, TIMEOUT)
+        assert [(name, data) for id, name, data in events] == [("progress", {"id": 1, "current_slide": 2})]
+        assert events[0][0] > start + 1
+    finally:
+        bus.stop()
+        for process in subscribers:
+            process.join(TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+class QueueBroker(Broker):
+    """In-memory broker for a single process; a real one (e.g. Redis pub/sub) connects all processes."""
+    def __init__(self, config):
+        super().__init__(config)
+        self.messages = queue.Queue()
+        self.listening = threading.Event()
+
+    def publish(self, message):
+        self.messages.put(message)
+
+    def listen(self):
+        self.listening.set()
+        while True:
+            yield self.messages.get()
+
+def test_broker_bus():
+    broker = QueueBroker({})
+    bus = BrokerEventBus(broker)
+    start = bus.current_id()
+    broker.listening.wait(1)
+    bus.publish(7, "progress", {"id": 3})
+    assert bus.wait(7, start, TIMEOUT) == [(start + 1, "progress", {"id": 3})]
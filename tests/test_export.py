@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from interact import db
+from interact.models import Seminar, Student, Group
+from interact.lib.export import COLUMNS, export_chunks
+
+def set_up_students(app, teacher):
+    """Student 1 finished the seminar in group 1, student 2 joined and is at slide 2, the others have not joined."""
+    with app.app_context():
+        seminar = db.session.get(Seminar, teacher["seminar_id"])
+        group = Group(seminar.id, 1)
+        db.session.add(group)
+        db.session.flush()
+        first, second = Student.query.filter_by(seminar_id=seminar.id).order_by(Student.id).limit(2).all()
+        first.joined, first.current_slide, first.score, first.motivation, first.preparation = True, 5, 3, 4, 2
+        first.reached_gf, first.group_id = True, group.id
+        second.joined, second.current_slide, second.score = True, 2, 1
+        db.session.commit()
+        return first.id, second.id
+
+def test_export_formats(app, teacher, teacher_client, monkeypatch):
+    first_id, second_id = set_up_students(app, teacher)
+    monkeypatch.setattr("interact.lib.export.CHUNK_SIZE", 7)
+    seminar_id = teacher["seminar_id"]
+
+    response = teacher_client.get(f"/teachers/export/{seminar_id}")
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == f"attachment; filename=seminar-{seminar_id}.csv"
+    reader = csv.DictReader(io.StringIO(response.get_data(as_text=True)))
+    assert reader.fieldnames == COLUMNS
+    rows = list(reader)
+    assert len(rows) == 20 and [row["name"] for row in rows[:3]] == ["Student 1", "Student 2", "Student 3"]
+    assert rows[0] == {"seminar_id": str(seminar_id), "seminar": "Test seminar", "student_id": str(first_id),
+                       "name": "Student 1", "joined": "True", "current_slide": "5", "nr_slides": "4", "done": "True",
+                       "motivation": "4", "preparation": "2", "score": "3", "reached_gf": "True", "group": "1"}
+    assert rows[2]["joined"] == "False" and rows[2]["group"] == ""
+
+    response = teacher_client.get(f"/teachers/export/{seminar_id}?format=jsonl")
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 20
+    second = json.loads(lines[1])
+    assert list(second) == COLUMNS
+    assert (second["student_id"], second["joined"], second["current_slide"], second["done"], second["group"]) == \
+        (second_id, True, 2, False, None)
+    assert teacher_client.get(f"/teachers/export/{seminar_id}?format=xml").status_code == 400
+
+def test_export_streams_in_chunks(app, teacher, monkeypatch):
+    """The rows come in chunks of CHUNK_SIZE (the yield_per partitions), in student order, without gaps."""
+    monkeypatch.setattr("interact.lib.export.CHUNK_SIZE", 7)
+    with app.app_context():
+        user_id = db.session.get(Seminar, teacher["seminar_id"]).user_id
+        chunks = list(export_chunks(user_id, teacher["seminar_id"]))
+        assert [len(chunk) for chunk in chunks] == [7, 7, 6]
+        student_ids = [row["student_id"] for chunk in chunks for row in chunk]
+        assert student_ids == sorted(student_ids) and len(set(student_ids)) == 20
+        assert [row["student_id"] for chunk in export_chunks(user_id) for row in chunk] == student_ids # all seminars
@@ -0,0 +1,48 @@
+from interact import db
+from interact.models import Student, Slide, Answer
+
+def join(app, client, teacher):
+    seminar_id = teacher["seminar_id"]
+    with app.app_context():
+        student_id = Student.query.filter_by(seminar_id=seminar_id).first().id
+    client.post("/students/", data={"code": teacher["code"]})
+    client.post(f"/students/join/{seminar_id}", data={"name": student_id, "motivation": 3, "preparation": 2})
+
+def test_slide_not_modified(app, teacher, assert_max_queries):
+    client = app.test_client()
+    join(app, client, teacher)
+    response = client.get("/students/seminar")
+    assert response.status_code == 200 and response.headers["ETag"]
+    etag = response.headers["ETag"]
+
+    response = assert_max_queries(client, "GET", "/students/seminar", 1, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Editing the deck changes the slide and its ETag
+    with app.app_context():
+        slide = Slide.query.filter_by(seminar_id=teacher["seminar_id"], slide_order=1).first()
+        answer = Answer.query.filter_by(slide_id=slide.id).first()
+        answer.text = "Changed answer"
+        db.session.commit()
+    response = client.get("/students/seminar", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Changed answer" in response.get_data(as_text=True)
+    assert response.headers["ETag"] != etag
+
+def test_flashed_message_not_cached(app, teacher):
+    client = app.test_client()
+    join(app, client, teacher)
+    etag = client.get("/students/seminar").headers["ETag"]
+    with client.session_transaction() as session:
+        session["_flashes"] = [("message", "Hello")]
+    response = client.get("/students/seminar", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and "Hello" in response.get_data(as_text=True)
+    assert "ETag" not in response.headers
+
+def test_slide_preview_not_modified(app, teacher, teacher_client):
+    with app.app_context():
+        slide_id = Slide.query.filter_by(seminar_id=teacher["seminar_id"], slide_order=1).first().id
+    response = teacher_client.get(f"/teachers/slide-preview/{slide_id}")
+    assert response.status_code == 200 and "Answer 0" in response.get_data(as_text=True)
+    response = teacher_client.get(f"/teachers/slide-preview/{slide_id}", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
@@ -0,0 +1,56 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from interact import db
+from interact.models import Seminar, Slide, Group
+from interact.lib.group_forming import (GroupForming, claim_group_forming, form_groups, GF_RUNNING, GF_FAILED,
+                                        GF_CLAIM_TIMEOUT)
+
+def set_state(seminar_id, **values):
+    db.session.execute(db.update(Seminar).where(Seminar.id == seminar_id).values(**values))
+    db.session.commit()
+
+def test_one_of_concurrent_claimers_wins(app, teacher):
+    nr_claimers = 8
+    barrier = threading.Barrier(nr_claimers)
+    results = []
+
+    def claim():
+        with app.app_context():
+            barrier.wait()
+            results.append(claim_group_forming(teacher["seminar_id"]))
+            db.session.remove()
+
+    threads = [threading.Thread(target=claim) for _ in range(nr_claimers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * (nr_claimers - 1) + [True]
+    with app.app_context():
+        assert db.session.get(Seminar, teacher["seminar_id"]).gf_status == GF_RUNNING
+
+def test_abandoned_claim_is_taken_over(app, teacher):
+    seminar_id = teacher["seminar_id"]
+    with app.app_context():
+        set_state(seminar_id, gf_status=GF_RUNNING, gf_claimed_at=datetime.now() - timedelta(seconds=GF_CLAIM_TIMEOUT - 10))
+        assert not claim_group_forming(seminar_id) # still running
+        set_state(seminar_id, gf_claimed_at=datetime.now() - timedelta(seconds=GF_CLAIM_TIMEOUT + 10))
+        assert claim_group_forming(seminar_id)
+        assert not claim_group_forming(seminar_id) # the new claim is fresh
+
+def test_failure_leaves_no_groups(app, teacher, monkeypatch):
+    """A failed run rolls back its groups and marks the seminar failed, to be claimed again only when forced."""
+    seminar_id = teacher["seminar_id"]
+    def fail(self, method):
+        raise RuntimeError("no groups today")
+    monkeypatch.setattr(GroupForming, "divide", fail)
+    with app.app_context():
+        gf_slide = Slide.query.filter_by(seminar_id=seminar_id, type=2).first()
+        assert claim_group_forming(seminar_id)
+        with pytest.raises(RuntimeError):
+            form_groups(seminar_id, gf_slide)
+        assert db.session.get(Seminar, seminar_id).gf_status == GF_FAILED
+        assert Group.query.filter_by(seminar_id=seminar_id).count() == 0
+        assert not claim_group_forming(seminar_id)
+        assert claim_group_forming(seminar_id, forced=True)
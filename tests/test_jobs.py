@@ -0,0 +1,133 @@
+import time
+from interact import db
+from interact.models import Seminar, Slide, Student, Group, GroupFormingJob
+from interact.lib.group_forming import GroupForming, GF_DONE, GF_FAILED
+from interact.lib.jobs import submit_group_forming, JOB_DONE, JOB_FAILED
+from interact.lib.metrics import function_duration
+
+def gf_slide_id(teacher):
+    return Slide.query.filter_by(seminar_id=teacher["seminar_id"], type=2).first().id
+
+def wait_for_job(app, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            job = db.session.get(GroupFormingJob, job_id)
+            if job.finished_at is not None:
+                return job.status, job.nr_groups
+        time.sleep(0.1)
+    raise AssertionError(f"Group forming job {job_id} did not finish")
+
+def nr_timed(name):
+    series = function_duration.series.get((name,))
+    return 0 if series is None else series[2]
+
+def test_job_in_process(app, teacher):
+    app.config["GF_JOB_WORKERS"] = 0
+    try:
+        with app.app_context():
+            gf_slide = db.session.get(Slide, gf_slide_id(teacher))
+            job = submit_group_forming(teacher["seminar_id"], gf_slide, forced=True)
+            assert job.status == JOB_DONE
+            assert submit_group_forming(teacher["seminar_id"], gf_slide, forced=True) is None # only once
+            assert Group.query.filter_by(seminar_id=teacher["seminar_id"]).count() == 7 # 20 students, 3 per group
+    finally:
+        del app.config["GF_JOB_WORKERS"]
+
+def test_latest_job_of_the_session(app, teacher):
+    from interact.lib.jobs import latest_job
+    from interact.lib.sessions import end_session
+    app.config["GF_JOB_WORKERS"] = 0
+    try:
+        with app.app_context():
+            seminar = db.session.get(Seminar, teacher["seminar_id"])
+            job = submit_group_forming(seminar.id, db.session.get(Slide, gf_slide_id(teacher)), forced=True)
+            assert latest_job(seminar).id == job.id
+            end_session(seminar)
+            assert latest_job(seminar) is None
+    finally:
+        del app.config["GF_JOB_WORKERS"]
+
+def test_failed_job_waits_for_the_teacher(app, teacher, monkeypatch):
+    """A failed job is not resubmitted by the students' page visits, only by the teacher forcing group forming."""
+    def fail(self, method):
+        raise RuntimeError("no groups today")
+    app.config["GF_JOB_WORKERS"] = 0
+    try:
+        with app.app_context():
+            gf_slide = db.session.get(Slide, gf_slide_id(teacher))
+            monkeypatch.setattr(GroupForming, "divide", fail)
+            job = submit_group_forming(teacher["seminar_id"], gf_slide)
+            assert job.status == JOB_FAILED and "no groups today" in job.error
+            assert db.session.get(Seminar, teacher["seminar_id"]).gf_status == GF_FAILED
+            assert submit_group_forming(teacher["seminar_id"], gf_slide) is None
+            monkeypatch.undo()
+            assert submit_group_forming(teacher["seminar_id"], gf_slide, forced=True).status == JOB_DONE
+    finally:
+        del app.config["GF_JOB_WORKERS"]
+
+def test_jobs_in_process_pool(app, teacher):
+    """Group forming of several seminars runs in parallel in the pool; every student ends up in a group."""
+    seminar_ids = [teacher["seminar_id"]]
+    with app.app_context():
+        # Two more seminars with the same deck and students
+        for i in range(2):
+            seminar = Seminar(f"Parallel {i}", 20, db.session.get(Seminar, teacher["seminar_id"]).user_id)
+            db.session.add(seminar)
+            db.session.flush()
+            gf_slide = Slide(2, "Group forming", 1, seminar.id)
+            gf_slide.gf_type = 3
+            gf_slide.gf_nr_per_group = 4
+            db.session.add(gf_slide)
+            db.session.add_all([Student(f"Student {n}", seminar.id) for n in range(20)])
+            seminar_ids.append(seminar.id)
+        db.session.commit()
+
+        app.config["GF_JOB_WORKERS"] = 2
+        nr_form_groups = nr_timed("form_groups")
+        try:
+            job_ids = []
+            for seminar_id in seminar_ids:
+                gf_slide = Slide.query.filter_by(seminar_id=seminar_id, type=2).first()
+                job_ids.append(submit_group_forming(seminar_id, gf_slide, forced=True).id)
+        finally:
+            del app.config["GF_JOB_WORKERS"]
+
+    for job_id in job_ids:
+        status, nr_groups = wait_for_job(app, job_id)
+        assert status == JOB_DONE
+    # The timings of the pool processes are recorded here, for /admin/metrics
+    deadline = time.monotonic() + 10
+    while nr_timed("form_groups") < nr_form_groups + 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert nr_timed("form_groups") == nr_form_groups + 3
+    assert nr_timed("GroupForming.similarity_grouping") >= 3
+    with app.app_context():
+        for seminar_id in seminar_ids:
+            assert db.session.get(Seminar, seminar_id).gf_status == GF_DONE
+            assert Student.query.filter_by(seminar_id=seminar_id, group_id=None).count() == 0
+
+def test_pool_uses_the_app_configuration(tmp_path):
+    """Pool processes build their app from the configuration of the app that submits, not the default one."""
+    from interact import create_app
+    from interact.models import User
+    other = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'other.sqlite'}", "GF_JOB_WORKERS": 1})
+    with other.app_context():
+        db.create_all()
+        user = User("other", "secret")
+        db.session.add(user)
+        db.session.flush()
+        seminar = Seminar("Other database", 6, user.id)
+        db.session.add(seminar)
+        db.session.flush()
+        gf_slide = Slide(2, "Group forming", 1, seminar.id)
+        gf_slide.gf_type = 0
+        gf_slide.gf_nr_per_group = 2
+        db.session.add(gf_slide)
+        db.session.add_all([Student(f"Student {n}", seminar.id) for n in range(6)])
+        db.session.commit()
+        job = submit_group_forming(seminar.id, gf_slide, forced=True)
+    try:
+        assert wait_for_job(other, job.id) == (JOB_DONE, 3)
+    finally:
+        other.extensions["group_forming_pool"][1].shutdown()
@@ -0,0 +1,52 @@
+from werkzeug.security import generate_password_hash
+from interact import db
+from interact.models import User, Slide
+from interact.lib.metrics import Histogram, render_metrics
+
+def test_histogram_format():
+    histogram = Histogram("test_seconds", "Test.", ["endpoint"], [0.1, 1])
+    histogram.observe(0.05, 'a"b')
+    histogram.observe(0.5, 'a"b')
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{endpoint="a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{endpoint="a\\"b",le="1"} 2',
+        'test_seconds_bucket{endpoint="a\\"b",le="+Inf"} 2',
+        'test_seconds_sum{endpoint="a\\"b"} 0.55',
+        'test_seconds_count{endpoint="a\\"b"} 2',
+    ]
+
+def test_metrics_endpoint(app, teacher, teacher_client):
+    teacher_client.get(f"/teachers/dashboard/{teacher['seminar_id']}")
+    assert teacher_client.get("/admin/metrics").status_code == 403 # teachers are not allowed
+
+    with app.app_context():
+        db.session.add(User(f"admin-{teacher['username']}", generate_password_hash("secret"), "admin"))
+        db.session.commit()
+    admin_client = app.test_client()
+    admin_client.post("/auth/login", data={"username": f"admin-{teacher['username']}", "password": "secret"})
+    response = admin_client.get("/admin/metrics")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'interact_request_duration_seconds_count{endpoint="teachers.dashboard",method="GET",status="200"}' in text
+    assert 'interact_request_sql_statements_bucket{endpoint="teachers.dashboard",le="+Inf"}' in text
+    assert 'interact_requests_in_flight{endpoint="admin.metrics"} 1' in text
+
+def test_metrics_token(app):
+    app.config["METRICS_TOKEN"] = "scraper"
+    try:
+        client = app.test_client()
+        assert client.get("/admin/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+        assert client.get("/admin/metrics", headers={"Authorization": "Bearer scraper"}).status_code == 200
+    finally:
+        del app.config["METRICS_TOKEN"]
+
+def test_group_forming_timings(app, teacher):
+    from interact.lib.group_forming import activate_group_forming
+    with app.app_context():
+        gf_slide = Slide.query.filter_by(seminar_id=teacher["seminar_id"], type=2).first()
+        assert activate_group_forming(teacher["seminar_id"], gf_slide, forced=True)
+    text = render_metrics()
+    assert 'interact_function_duration_seconds_count{function="activate_group_forming"}' in text
+    assert 'interact_function_duration_seconds_count{function="GroupForming.similarity_grouping"}' in text
@@ -0,0 +1,47 @@
+import re
+from interact.models import Student
+
+# Maximum number of SQL statements per route. These do not depend on the number of students, so a higher
+# count usually means an N+1 query was introduced.
+TEACHER_ROUTES = [
+    ("/teachers/", 2),
+    ("/teachers/api/index", 2),
+    ("/teachers/dashboard/{seminar_id}", 7),
+    ("/teachers/dashboard/{seminar_id}/content", 7),
+    ("/teachers/api/dashboard/{seminar_id}", 7),
+    ("/teachers/edit/{seminar_id}", 3),
+    ("/teachers/export/{seminar_id}", 3),
+]
+
+def test_teacher_routes(teacher, teacher_client, assert_max_queries):
+    for url, max_queries in TEACHER_ROUTES:
+        response = assert_max_queries(teacher_client, "GET", url.format(**teacher), max_queries)
+        assert response.status_code == 200, url
+
+def test_student_routes(app, teacher, assert_max_queries):
+    seminar_id = teacher["seminar_id"]
+    with app.app_context():
+        student_id = Student.query.filter_by(seminar_id=seminar_id).first().id
+    client = app.test_client()
+    assert_max_queries(client, "POST", "/students/", 1, data={"code": teacher["code"]})
+    assert_max_queries(client, "GET", f"/students/join/{seminar_id}", 2)
+    assert_max_queries(client, "POST", f"/students/join/{seminar_id}", 8,
+                       data={"name": student_id, "motivation": 3, "preparation": 2})
+    for _ in range(3): # the question slides
+        response = assert_max_queries(client, "GET", "/students/seminar", 4)
+        answer = re.findall(r'name="answer" value="(\d+)"', response.get_data(as_text=True))[0]
+        assert_max_queries(client, "POST", "/students/seminar", 7, data={"answer": answer})
+    response = assert_max_queries(client, "GET", "/students/seminar", 8) # waiting for group forming
+    assert "Please wait" in response.get_data(as_text=True)
+
+def test_index_computes_missing_counters(app, teacher, teacher_client, assert_max_queries):
+    """A seminar without counters row shows its real counts on the index, and gets its row on the first visit."""
+    from interact import db
+    from interact.models import SeminarCounters
+    with app.app_context():
+        db.session.execute(db.delete(SeminarCounters).where(SeminarCounters.seminar_id == teacher["seminar_id"]))
+        db.session.commit()
+    response = teacher_client.get("/teachers/api/index")
+    [seminar] = response.get_json()["seminars"]
+    assert (seminar["nr_enrolled"], seminar["nr_joined"], seminar["nr_reached_gf"]) == (20, 0, 0)
+    assert_max_queries(teacher_client, "GET", "/teachers/api/index", 2)
@@ -0,0 +1,74 @@
+import re
+from sqlalchemy import event
+from interact import db
+from interact.models import Student, Slide, SeminarSession
+
+# Plan steps that read a whole table; SQLite reports "SCAN <table>" (without an index) for those.
+# Scans of subquery results, CTEs and constant rows are fine.
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)(?! USING (COVERING )?INDEX)(?!\s*\()")
+
+def full_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    tables = {table.name for table in db.metadata.sorted_tables}
+    return [row[-1] for row in rows if (m := FULL_SCAN.match(row[-1])) and m.group(1) in tables]
+
+def record_statements(app, actions):
+    """Runs actions() and returns the (statement, parameters) of every single statement it executed."""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith(("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")):
+            statements.append((statement, parameters))
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        actions()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+def assert_no_full_scans(app, statements):
+    problems = []
+    with app.app_context():
+        with db.engine.connect() as connection:
+            for statement, parameters in dict.fromkeys(statements):
+                for step in full_scans(connection, statement, parameters):
+                    problems.append(f"{step}\n    in: {statement}")
+    assert not problems, "Full table scans:\n" + "\n".join(problems)
+
+def test_student_query_plans(app, teacher):
+    seminar_id = teacher["seminar_id"]
+    with app.app_context():
+        student_id = Student.query.filter_by(seminar_id=seminar_id).first().id
+    client = app.test_client()
+
+    def student():
+        client.post("/students/", data={"code": teacher["code"]})
+        client.get(f"/students/join/{seminar_id}")
+        client.post(f"/students/join/{seminar_id}", data={"name": student_id, "motivation": 3, "preparation": 2})
+        for _ in range(3):
+            html = client.get("/students/seminar").get_data(as_text=True)
+            answer = re.findall(r'name="answer" value="(\d+)"', html)[0]
+            client.post("/students/seminar", data={"answer": answer})
+        client.get("/students/seminar") # waiting for group forming
+
+    assert_no_full_scans(app, [(s, tuple(p)) for s, p in record_statements(app, student)])
+
+def test_teacher_query_plans(app, teacher, teacher_client, monkeypatch):
+    monkeypatch.setitem(app.config, "GF_JOB_WORKERS", 0) # group forming in this process
+    seminar_id = teacher["seminar_id"]
+    with app.app_context():
+        slide_id = Slide.query.filter_by(seminar_id=seminar_id, slide_order=1).first().id
+
+    def teacher_actions():
+        for url in ["/teachers/", "/teachers/api/index", f"/teachers/dashboard/{seminar_id}",
+                    f"/teachers/api/dashboard/{seminar_id}", f"/teachers/edit/{seminar_id}",
+                    f"/teachers/slide-preview/{slide_id}", f"/teachers/export/{seminar_id}",
+                    f"/teachers/sessions/{seminar_id}"]:
+            teacher_client.get(url).get_data()
+        teacher_client.get(f"/teachers/seminar/{seminar_id}/slide/{slide_id}/down")
+        teacher_client.get(f"/teachers/force_gf/{seminar_id}")
+        teacher_client.get(f"/teachers/end_session/{seminar_id}")
+        teacher_client.get(f"/teachers/sessions/{seminar_id}/1")
+
+    assert_no_full_scans(app, [(s, tuple(p)) for s, p in record_statements(app, teacher_actions)])
@@ -0,0 +1,29 @@
+import random
+import time
+import numpy as np
+from interact.lib.refinement import LocalSearch
+
+def random_case(n, size, seed):
+    rng = random.Random(seed)
+    features = [(rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 10)) for _ in range(n)]
+    return features, [i // size for i in range(n)]
+
+def test_refinement_improves_and_keeps_sizes():
+    for homogeneous in (True, False):
+        features, labels = random_case(301, 4, 1)
+        search = LocalSearch(features, labels, homogeneous)
+        before = search.objective()
+        refined = search.refine(1000)
+        after = search.objective()
+        assert (after < before) if homogeneous else (after > before)
+        assert np.array_equal(np.bincount(refined), np.bincount(labels))
+        # The incrementally updated objective equals the one computed from scratch
+        assert abs(after - LocalSearch(features, refined, homogeneous).objective()) < 1e-6
+
+def test_refinement_respects_budget():
+    features, labels = random_case(5000, 3, 2)
+    search = LocalSearch(features, labels)
+    start = time.perf_counter()
+    search.refine(50)
+    assert time.perf_counter() - start < 0.5
+    assert search.nr_swaps > 0
@@ -0,0 +1,52 @@
+from interact import db
+from interact.models import Student, Slide, Response
+
+def first_question(teacher):
+    student_id = Student.query.filter_by(seminar_id=teacher["seminar_id"]).first().id
+    slide_id = Slide.query.filter_by(seminar_id=teacher["seminar_id"], type=0).first().id
+    return student_id, slide_id
+
+def nr_responses(student_id):
+    return db.session.scalar(db.select(db.func.count(Response.id)).where(Response.student_id == student_id))
+
+def test_buffer_per_app(app, teacher, tmp_path):
+    """Every app writes its own responses to its own database."""
+    from interact import create_app
+    from interact.lib.responses import buffers, response_buffer
+    other = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'other.sqlite'}"})
+    assert other.extensions["response_buffer"] is not app.extensions["response_buffer"]
+    assert {other.extensions["response_buffer"], app.extensions["response_buffer"]} <= set(buffers)
+    with app.app_context():
+        student_id, slide_id = first_question(teacher)
+        response_buffer.add(student_id, slide_id, None, False, 1)
+        assert response_buffer.flush() == 1
+        assert nr_responses(student_id) == 1
+        assert response_buffer._get_current_object() is app.extensions["response_buffer"]
+
+def test_failing_rows_are_dropped_alone(app, teacher):
+    """A response that cannot be written (here: to an unknown slide) does not take the rest of the batch with it."""
+    from interact.lib.responses import response_buffer
+    with app.app_context():
+        student_id, slide_id = first_question(teacher)
+        response_buffer.add(student_id, slide_id, None, False, 1)
+        response_buffer.add(student_id, 10**9, None, False, 1)
+        response_buffer.add(student_id, slide_id, None, True, 1)
+        assert response_buffer.flush() == 2
+        assert nr_responses(student_id) == 2
+        assert response_buffer.flush() == 0 # nothing left to retry
+
+def test_responses_of_an_ended_session_are_dropped(app, teacher):
+    """Responses buffered in another process when the session ends do not end up in the new session."""
+    from interact.models import Seminar
+    from interact.lib.responses import response_buffer
+    from interact.lib.sessions import end_session
+    with app.app_context():
+        student_id, slide_id = first_question(teacher)
+        response_buffer.add(student_id, slide_id, None, True, 1)
+        other_process = response_buffer.rows[:] # waiting in another worker, which end_session cannot flush
+        end_session(db.session.get(Seminar, teacher["seminar_id"]))
+        assert nr_responses(student_id) == 0
+        response_buffer.rows.extend(other_process)
+        response_buffer.add(student_id, slide_id, None, False, 2)
+        assert response_buffer.flush() == 1
+        assert db.session.scalars(db.select(Response.correct).where(Response.student_id == student_id)).all() == [False]
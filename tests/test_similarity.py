@@ -0,0 +1,60 @@
+import random
+from math import sqrt
+import pytest
+from interact.lib.similarity import SimilarityEngine
+
+def pairwise_order(features, nr_per_group, homogeneous=True):
+    """The original list-based similarity grouping (before SimilarityEngine), on student indices."""
+    n = len(features)
+    sim = [[0 for _ in range(n)] for _ in range(n)]
+    for i in range(n):
+        for j in range(i+1, n):
+            s = -sqrt(sum((a - b) ** 2 for a, b in zip(features[i], features[j])))
+            sim[i][j] = s
+            sim[j][i] = s
+    unassigned = set(range(n))
+    sizes = [nr_per_group] * (n // nr_per_group) + ([n % nr_per_group] if n % nr_per_group else [])
+    order = []
+    for sz in sizes:
+        if not unassigned:
+            break
+        pairs = [(i, j, sim[i][j]) for i in unassigned for j in unassigned if i < j]
+        if not pairs:
+            break
+        i0, j0, _ = max(pairs, key=(lambda x: x[2]) if homogeneous else (lambda x: -x[2]))
+        group_idxs = {i0, j0}
+        unassigned.remove(i0)
+        unassigned.remove(j0)
+        while len(group_idxs) < sz and unassigned:
+            scores = []
+            for u in unassigned:
+                values = [sim[u][g] for g in group_idxs]
+                scores.append((u, sum(values) / len(values)))
+            u_pick, _ = max(scores, key=(lambda x: x[1]) if homogeneous else (lambda x: -x[1]))
+            group_idxs.add(u_pick)
+            unassigned.remove(u_pick)
+        order += list(group_idxs)
+    return order + list(unassigned)
+
+def engine_order(features, nr_per_group, homogeneous=True, **kwargs):
+    n = len(features)
+    sizes = [nr_per_group] * (n // nr_per_group) + ([n % nr_per_group] if n % nr_per_group else [])
+    return SimilarityEngine(features, homogeneous, **kwargs).order(sizes)
+
+@pytest.mark.parametrize("homogeneous", [True, False])
+@pytest.mark.parametrize("n, nr_per_group, seed", [
+    (1, 3, 0), (2, 3, 1), (7, 3, 2), (20, 4, 3), (53, 5, 4), (100, 3, 5), (101, 4, 6),
+])
+def test_same_order_as_pairwise(n, nr_per_group, seed, homogeneous):
+    """Seeded random cohorts on the small scales of the app, so there are many ties, with and without a remainder group."""
+    rng = random.Random(seed)
+    features = [(rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 10)) for _ in range(n)]
+    expected = pairwise_order(features, nr_per_group, homogeneous)
+    assert engine_order(features, nr_per_group, homogeneous) == expected
+    # Also when the distances are computed in blocks of a few rows
+    assert engine_order(features, nr_per_group, homogeneous, block_bytes=1024) == expected
+
+def test_all_ties():
+    features = [(3, 3, 5)] * 10
+    for homogeneous in (True, False):
+        assert engine_order(features, 3, homogeneous) == pairwise_order(features, 3, homogeneous)